@@ -13,6 +13,10 @@ logger = logging.getLogger(__name__)
 # I think that multiple inheritence would be useful here, but I couldnt make it work
 # in a py2/3 compatible way.
 class FTP(GenericServer):
+    # All the transfers go through the one connection
+    CONCURRENT_DOWNLOADS = 1
+    RESUMABLE = True
+
     def __init__(self, address, user="", passwd="", server=None):
         if not user:
             user = ""
@@ -80,12 +84,17 @@ class FTP(GenericServer):
         return True
 
     def getfile(self, rel_path, full_path):
+        rest = None
+        if os.path.isfile(full_path) and os.path.getsize(full_path) > 0:
+            rest = os.path.getsize(full_path)
         try:
-            stat = self.ftp.retrbinary(
-                "RETR {}".format(rel_path), open(full_path, "wb").write
-            )
+            with open(full_path, "ab" if rest else "wb") as fd:
+                stat = self.ftp.retrbinary(
+                    "RETR {}".format(rel_path), fd.write, rest=rest
+                )
         except all_ftp_errors:
-            if os.path.isfile(full_path):
+            # Keep what was transferred so the download can be resumed
+            if os.path.isfile(full_path) and os.path.getsize(full_path) == 0:
                 os.remove(full_path)
             logger.warning("ERROR from ftp server, trying next server")
             return False
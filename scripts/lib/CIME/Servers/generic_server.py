@@ -12,6 +12,11 @@ logger = logging.getLogger(__name__)
 
 
 class GenericServer(object):
+    # The number of files that may be downloaded from the server at once
+    CONCURRENT_DOWNLOADS = 4
+    # True if getfile continues the download of a partial full_path
+    RESUMABLE = False
+
     def __init__(
         self, host=" ", user=" ", passwd=" ", acct=" ", timeout=_GLOBAL_DEFAULT_TIMEOUT
     ):
@@ -23,5 +28,6 @@ class GenericServer(object):
 
     def getfile(self, rel_path, full_path):
         """Get file from rel_path on server and place in location full_path on client
-        fail if full_path already exists on client, return True if successful"""
+        fail if full_path already exists on client, return True if successful.
+        If RESUMABLE, a partial full_path is completed instead."""
         raise NotImplementedError
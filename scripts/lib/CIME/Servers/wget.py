@@ -9,6 +9,8 @@ logger = logging.getLogger(__name__)
 
 
 class WGET(GenericServer):
+    RESUMABLE = True
+
     def __init__(self, address, user="", passwd=""):
         self._args = "--no-check-certificate "
         if user:
@@ -60,17 +62,17 @@ class WGET(GenericServer):
     def getfile(self, rel_path, full_path):
         full_url = os.path.join(self._server_loc, rel_path)
         stat, output, errput = run_cmd(
-            "wget {} {} -nc --output-document {}".format(
-                self._args, full_url, full_path
-            )
+            "wget {} {} -c --output-document {}".format(self._args, full_url, full_path)
         )
         if stat != 0:
             logging.warning(
                 "wget failed with output: {} and errput {}\n".format(output, errput)
             )
-            # wget puts an empty file if it fails.
+            # wget puts an empty file if it fails, keep a partial one so the
+            # download can be resumed.
             try:
-                os.remove(full_path)
+                if os.path.getsize(full_path) == 0:
+                    os.remove(full_path)
             except OSError:
                 pass
             return False
@@ -24,10 +24,11 @@ from CIME.hist_utils import (
     generate_baseline,
 )
 from CIME.provenance import save_test_time, get_test_success
+from CIME.cpl_log import get_cpl_log_summary
 from CIME.locked_files import LOCKED_DIR, lock_file, is_locked
 import CIME.build as build
 
-import glob, gzip, time, traceback, six, os
+import glob, time, traceback, os
 
 logger = logging.getLogger(__name__)
 
@@ -393,18 +394,21 @@ class SystemTestsCommon(object):
     def _coupler_log_indicates_run_complete(self):
         newestcpllogfiles = self._get_latest_cpl_logs()
         logger.debug("Latest Coupler log file(s) {}".format(newestcpllogfiles))
-        # Exception is raised if the file is not compressed
+        # Only a compressed log indicates a completed run
         allgood = len(newestcpllogfiles)
         for cpllog in newestcpllogfiles:
             try:
-                if six.b("SUCCESSFUL TERMINATION") in gzip.open(cpllog, "rb").read():
-                    allgood = allgood - 1
+                summary = get_cpl_log_summary(cpllog)
             except Exception as e:  # Probably want to be more specific here
-                msg = e.__str__()
-
                 logger.info(
-                    "{} is not compressed, assuming run failed {}".format(cpllog, msg)
+                    "{} is not readable, assuming run failed {}".format(cpllog, e)
                 )
+                continue
+
+            if summary["run_complete"]:
+                allgood = allgood - 1
+            elif not summary["compressed"]:
+                logger.info("{} is not compressed, assuming run failed".format(cpllog))
 
         return allgood == 0
 
@@ -485,19 +489,8 @@ class SystemTestsCommon(object):
         increases.
         """
         memlist = []
-        meminfo = re.compile(
-            r".*model date =\s+(\w+).*memory =\s+(\d+\.?\d+).*highwater"
-        )
         if cpllog is not None and os.path.isfile(cpllog):
-            if ".gz" == cpllog[-3:]:
-                fopen = gzip.open
-            else:
-                fopen = open
-            with fopen(cpllog, "rb") as f:
-                for line in f:
-                    m = meminfo.match(line.decode("utf-8"))
-                    if m:
-                        memlist.append((float(m.group(1)), float(m.group(2))))
+            memlist = list(get_cpl_log_summary(cpllog)["mem_usage"])
         # Remove the last mem record, it's sometimes artificially high
         if len(memlist) > 0:
             memlist.pop()
@@ -509,11 +502,7 @@ class SystemTestsCommon(object):
         increases.
         """
         if cpllog is not None and os.path.isfile(cpllog):
-            with gzip.open(cpllog, "rb") as f:
-                cpltext = f.read().decode("utf-8")
-                m = re.search(r"# simulated years / cmp-day =\s+(\d+\.\d+)\s", cpltext)
-                if m:
-                    return float(m.group(1))
+            return get_cpl_log_summary(cpllog)["throughput"]
         return None
 
     def _phase_modifying_call(self, phase, function):
@@ -12,6 +12,9 @@ logger = logging.getLogger(__name__)
 
 
 class Archive(ArchiveBase):
+
+    DISK_CACHEABLE = True
+
     def __init__(self, infile=None, files=None):
         """
         initialize an object
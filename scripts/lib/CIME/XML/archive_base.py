@@ -69,13 +69,18 @@ class ArchiveBase(GenericXML):
         return None
 
     def get_latest_hist_files(
-        self, casename, model, from_dir, suffix="", ref_case=None
+        self, casename, model, from_dir, suffix="", ref_case=None, dir_index=None
     ):
         """
         get the most recent history files in directory from_dir with suffix if provided
         """
         test_hists = self.get_all_hist_files(
-            casename, model, from_dir, suffix=suffix, ref_case=ref_case
+            casename,
+            model,
+            from_dir,
+            suffix=suffix,
+            ref_case=ref_case,
+            dir_index=dir_index,
         )
         ext_regexes = self.get_hist_file_ext_regexes(
             self.get_entry(self._get_compname(model))
@@ -90,10 +95,15 @@ class ArchiveBase(GenericXML):
             histlist.append(latest_files[key])
         return histlist
 
-    def get_all_hist_files(self, casename, model, from_dir, suffix="", ref_case=None):
+    def get_all_hist_files(
+        self, casename, model, from_dir, suffix="", ref_case=None, dir_index=None
+    ):
         """
         gets all history files in directory from_dir with suffix (if provided)
         ignores files with ref_case in the name if ref_case is provided
+
+        dir_index is an optional RunDirIndex of from_dir, pass one in when
+        looking up the files of several models to list from_dir only once
         """
         dmodel = self._get_compname(model)
         # remove when component name is changed
@@ -112,26 +122,34 @@ class ArchiveBase(GenericXML):
             has_suffix = False
 
         # Strip any trailing $ if suffix is present and add it back after the suffix
-        for ext in extensions:
-            if ext.endswith("$") and has_suffix:
-                ext = ext[:-1]
-            string = model + r"\d?_?(\d{4})?\." + ext
+        if has_suffix:
+            extensions = [ext[:-1] if ext.endswith("$") else ext for ext in extensions]
+
+        if extensions:
+            # A single regex matching any of the extensions
+            string = (
+                model
+                + r"\d?_?(\d{4})?\.(?:"
+                + "|".join("(?:{})".format(ext) for ext in extensions)
+                + ")"
+            )
             if has_suffix:
                 string += "." + suffix + "$"
 
             logger.debug("Regex is {}".format(string))
-            pfile = re.compile(string)
-            hist_files.extend(
-                [
-                    f
-                    for f in os.listdir(from_dir)
-                    if pfile.search(f)
-                    and (
-                        (f.startswith(casename) or f.startswith(model))
-                        and not f.endswith("cprnc.out")
-                    )
-                ]
-            )
+            if dir_index is None:
+                dir_index = RunDirIndex(from_dir)
+            else:
+                expect(
+                    dir_index.from_dir == from_dir,
+                    "Index of {} used for {}".format(dir_index.from_dir, from_dir),
+                )
+            hist_files = [
+                f
+                for f in dir_index.search(string)
+                if (f.startswith(casename) or f.startswith(model))
+                and not f.endswith("cprnc.out")
+            ]
 
         if ref_case:
             expect(
@@ -163,6 +181,50 @@ class ArchiveBase(GenericXML):
         return model
 
 
+class RunDirIndex(object):
+    """
+    The names of the files in a run directory, listed with a single os.scandir
+    pass. Lookups of the history files of many models reuse the listing, and
+    the names matching a regex are remembered.
+
+    Callers that add, remove or rename files in the directory while still
+    using the index need to tell it through add, remove and rename.
+    """
+
+    def __init__(self, from_dir):
+        self.from_dir = from_dir
+        with os.scandir(from_dir) as entries:
+            self._names = set(entry.name for entry in entries)
+        self._matches = {}  # regex string -> sorted list of matching names
+
+    def __contains__(self, name):
+        return name in self._names
+
+    def search(self, regex):
+        """
+        Return the sorted names that match regex, using re.search
+        """
+        if regex not in self._matches:
+            pattern = re.compile(regex)
+            self._matches[regex] = sorted(
+                name for name in self._names if pattern.search(name)
+            )
+
+        return self._matches[regex]
+
+    def add(self, name):
+        self._names.add(name)
+        self._matches = {}
+
+    def remove(self, name):
+        self._names.discard(name)
+        self._matches = {}
+
+    def rename(self, name, new_name):
+        self.remove(name)
+        self.add(new_name)
+
+
 def _get_extension(model, filepath, ext_regexes):
     r"""
     For a hist file for the given model, return what we call the "extension"
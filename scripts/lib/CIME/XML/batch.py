@@ -13,6 +13,9 @@ logger = logging.getLogger(__name__)
 
 
 class Batch(GenericXML):
+
+    DISK_CACHEABLE = True
+
     def __init__(
         self,
         batch_system=None,
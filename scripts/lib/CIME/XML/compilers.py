@@ -15,6 +15,9 @@ logger = logging.getLogger(__name__)
 
 
 class Compilers(GenericXML):
+
+    DISK_CACHEABLE = True
+
     def __init__(
         self,
         machobj,
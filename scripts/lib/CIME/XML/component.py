@@ -11,6 +11,9 @@ logger = logging.getLogger(__name__)
 
 
 class Component(EntryID):
+
+    DISK_CACHEABLE = True
+
     def __init__(self, infile, comp_class):
         """
         initialize a Component obect from the component xml file in infile
@@ -11,6 +11,9 @@ logger = logging.getLogger(__name__)
 
 
 class Compsets(GenericXML):
+
+    DISK_CACHEABLE = True
+
     def __init__(self, infile=None, files=None):
         if files is None:
             files = Files()
@@ -22,24 +25,37 @@ class Compsets(GenericXML):
         science support is used in cesm to determine if this compset and grid
         is scientifically supported.   science_support is returned as an array of grids for this compset
         """
-        nodes = self.get_children("compset")
-        alias = None
-        lname = None
-
-        science_support = []
-
-        for node in nodes:
-            alias = self.get_element_text("alias", root=node)
-            lname = self.get_element_text("lname", root=node)
-            if alias == name or lname == name:
-                science_support_nodes = self.get_children("science_support", root=node)
-                for snode in science_support_nodes:
-                    science_support.append(self.get(snode, "grid"))
-                logger.debug(
-                    "Found node match with alias: {} and lname: {}".format(alias, lname)
-                )
-                return (lname, alias, science_support)
-        return (None, None, [False])
+        match = self._get_compset_index().get(name)
+        if match is None:
+            return (None, None, [False])
+
+        lname, alias, science_support = match
+        logger.debug(
+            "Found node match with alias: {} and lname: {}".format(alias, lname)
+        )
+        return (lname, alias, list(science_support))
+
+    def _get_compset_index(self):
+        """
+        Return a dictionary mapping every compset alias and longname to the
+        (lname, alias, science_support) of the first compset that defines it.
+        """
+
+        def build():
+            index = {}
+            for node in self.get_children("compset"):
+                alias = self.get_element_text("alias", root=node)
+                lname = self.get_element_text("lname", root=node)
+                science_support = [
+                    self.get(snode, "grid")
+                    for snode in self.get_children("science_support", root=node)
+                ]
+                for key in (alias, lname):
+                    if key is not None:
+                        index.setdefault(key, (lname, alias, science_support))
+            return index
+
+        return self.get_lookup_index("compsets", build)
 
     def get_compset_var_settings(self, compset, grid):
         """
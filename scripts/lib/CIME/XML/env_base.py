@@ -21,8 +21,7 @@ class EnvBase(EntryID):
 
         EntryID.__init__(self, fullpath, schema=schema, read_only=read_only)
 
-        self._id_map = None
-        self._group_map = None
+        self._invalidate_index()
 
         if not os.path.isfile(fullpath):
             headerobj = Headers()
@@ -32,87 +31,124 @@ class EnvBase(EntryID):
             self._setup_cache()
 
     def _setup_cache(self):
+        self._build_index(strict=True)
+        self.lock()
+
+    def _build_index(self, strict=False):
+        """
+        Build the entry id index used by get_children and scan_children.
+
+        Entries are expected to be children of <group> elements or of the
+        <file> root with unique ids within a group. If the file does not
+        follow that layout the lookups fall back to the generic tree search,
+        unless strict is set in which case repeats are an error.
+        """
+        # the index is rebuilt when the structure of the tree changes,
+        # through this object or another one sharing the parsed file
+        self._index_count = self.structure_count
         self._id_map = {}  # map id directly to nodes
-        self._group_map = {}  # map group name to entry id dict
-
-        group_elems = self.get_children("group")
-        for group_elem in group_elems:
-            group_name = self.get(group_elem, "id")
-            expect(
-                group_name not in self._group_map,
-                "Repeat group '{}'".format(group_name),
-            )
-            group_map = {}
-            self._group_map[group_name] = group_map
-            entry_elems = self.get_children("entry", root=group_elem)
-            for entry_elem in entry_elems:
-                entry_id = self.get(entry_elem, "id")
+        self._group_map = {}  # map group element to entry id dict
+        self._file_map = {}  # map id to entries directly under the root
+
+        group_names = set()
+        num_indexed = 0
+        compliant = True
+        for child in self.root.xml_element:
+            if child.tag == "entry":
+                entry_id = child.get("id")
+                entry_elem = self._get_element(child)
+                self._file_map.setdefault(entry_id, []).append(entry_elem)
+                self._id_map.setdefault(entry_id, []).append(entry_elem)
+                num_indexed += 1
+            elif child.tag == "group":
+                group_name = child.get("id")
                 expect(
-                    entry_id not in group_map,
-                    "Repeat entry '{}' in group '{}'".format(entry_id, group_name),
+                    not strict or group_name not in group_names,
+                    "Repeat group '{}'".format(group_name),
                 )
-                group_map[entry_id] = entry_elem
-                if entry_id in self._id_map:
-                    self._id_map[entry_id].append(entry_elem)
-                else:
-                    self._id_map[entry_id] = [entry_elem]
+                compliant = compliant and group_name not in group_names
+                group_names.add(group_name)
+                group_map = {}
+                self._group_map[child] = group_map
+                for entry in child:
+                    if entry.tag != "entry":
+                        continue
+                    entry_id = entry.get("id")
+                    expect(
+                        not strict or entry_id not in group_map,
+                        "Repeat entry '{}' in group '{}'".format(entry_id, group_name),
+                    )
+                    compliant = compliant and entry_id not in group_map
+                    entry_elem = self._get_element(entry)
+                    group_map[entry_id] = entry_elem
+                    self._id_map.setdefault(entry_id, []).append(entry_elem)
+                    num_indexed += 1
 
-        self.lock()
+        if not compliant or num_indexed != sum(
+            1 for _ in self.root.xml_element.iter("entry")
+        ):
+            logger.debug("Cannot index entries of {}".format(self.filename))
+            self._id_map = None
+            self._group_map = None
+            self._file_map = None
+
+    def _invalidate_index(self):
+        self._index_count = None
+        self._id_map = None
+        self._group_map = None
+        self._file_map = None
+
+    def _get_index_for(self, name, attributes):
+        """
+        Returns the entry id to look up if the query can be answered from the
+        index, None otherwise.
+        """
+        if (
+            name != "entry"
+            or attributes is None
+            or len(attributes) != 1
+            or attributes.get("id") is None
+            or self.root is None
+        ):
+            return None
+
+        if self._index_count != self.structure_count:
+            self._build_index()
+
+        return None if self._id_map is None else attributes["id"]
 
     def change_file(self, newfile, copy=False):
         self.unlock()
+        self._invalidate_index()
         EntryID.change_file(self, newfile, copy=copy)
         self._setup_cache()
 
+    def read(self, infile, schema=None):
+        self._invalidate_index()
+        EntryID.read(self, infile, schema=schema)
+
     def get_children(self, name=None, attributes=None, root=None):
-        if (
-            self.locked
-            and name == "entry"
-            and attributes is not None
-            and attributes.keys() == ["id"]
-        ):
-            entry_id = attributes["id"]
-            if root is None or self.name(root) == "file":
-                if entry_id in self._id_map:
-                    return self._id_map[entry_id]
-                else:
-                    return []
-            else:
-                expect(
-                    self.name(root) == "group",
-                    "Unexpected elem '{}' for {}, attrs {}".format(
-                        self.name(root), self.filename, self.attrib(root)
-                    ),
-                )
-                group_id = self.get(root, "id")
-                if (
-                    group_id in self._group_map
-                    and entry_id in self._group_map[group_id]
-                ):
-                    return [self._group_map[group_id][entry_id]]
-                else:
-                    return []
+        entry_id = self._get_index_for(name, attributes)
+        if entry_id is not None:
+            if root is None or root.xml_element is self.root.xml_element:
+                return list(self._file_map.get(entry_id, []))
+            elif root.xml_element in self._group_map:
+                group_map = self._group_map[root.xml_element]
+                return [group_map[entry_id]] if entry_id in group_map else []
 
-        else:
-            # Non-compliant look up
-            return EntryID.get_children(
-                self, name=name, attributes=attributes, root=root
-            )
+        # Non-compliant look up
+        return EntryID.get_children(self, name=name, attributes=attributes, root=root)
 
     def scan_children(self, nodename, attributes=None, root=None):
-        if (
-            self.locked
-            and nodename == "entry"
-            and attributes is not None
-            and attributes.keys() == ["id"]
-        ):
-            return EnvBase.get_children(
-                self, name=nodename, attributes=attributes, root=root
-            )
-        else:
-            return EntryID.scan_children(
-                self, nodename, attributes=attributes, root=root
-            )
+        entry_id = self._get_index_for(nodename, attributes)
+        if entry_id is not None:
+            if root is None or root.xml_element is self.root.xml_element:
+                return list(self._id_map.get(entry_id, []))
+            elif root.xml_element in self._group_map:
+                group_map = self._group_map[root.xml_element]
+                return [group_map[entry_id]] if entry_id in group_map else []
+
+        return EntryID.scan_children(self, nodename, attributes=attributes, root=root)
 
     def set_components(self, components):
         if hasattr(self, "_components"):
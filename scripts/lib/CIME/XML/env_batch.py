@@ -16,14 +16,57 @@ from CIME.utils import (
 )
 from CIME.locked_files import lock_file, unlock_file
 from collections import OrderedDict
-import stat, re, math
+import stat, re, math, threading, time
 
 logger = logging.getLogger(__name__)
 
+# Parsed output of the bulk batch queries, command -> (time, jobs or None),
+# shared by all the EnvBatch objects of the process
+_BATCH_QUERIES = {}
+_BATCH_QUERIES_LOCK = threading.Lock()
+
+
+def _parse_batch_query(output):
+    """
+    Parse the output of a batch query listing many jobs. Returns the header
+    lines and the lines of each job by job id. A job line starts with its id,
+    the host part of the id is not used.
+
+    >>> header, jobs = _parse_batch_query('''
+    ...   JOBID PARTITION     NAME  USER ST  TIME NODES
+    ...  123456     debug case.run  jdoe  R  1:02     1
+    ... 123457.host debug st_archive jdoe PD 0:00    1
+    ... ''')
+    >>> header
+    ['  JOBID PARTITION     NAME  USER ST  TIME NODES']
+    >>> sorted(jobs)
+    ['123456', '123457']
+    >>> jobs['123457']
+    ['123457.host debug st_archive jdoe PD 0:00    1']
+    """
+    header = []
+    jobs = {}
+    for line in output.splitlines():
+        fields = line.split()
+        if not fields:
+            continue
+        elif fields[0][0].isdigit():
+            jobs.setdefault(fields[0].split(".")[0], []).append(line)
+        elif not jobs:
+            header.append(line)
+
+    return header, jobs
+
+
 # pragma pylint: disable=attribute-defined-outside-init
 
 
 class EnvBatch(EnvBase):
+    # Seconds the jobs listed by one batch query are used for the status of
+    # every job, instead of querying the batch system for each job
+    BATCH_QUERY_TTL = 30
+    DISABLE_BATCH_QUERY_CACHING = "CIME_NO_BATCH_QUERY_CACHE" in os.environ
+
     def __init__(self, case_root=None, infile="env_batch.xml", read_only=False):
         """
         initialize an object interface to file env_batch.xml in the case directory
@@ -221,7 +264,11 @@ class EnvBatch(EnvBase):
         overrides["mpirun"] = case.get_mpirun_cmd(job=job, overrides=overrides)
         return overrides
 
-    def make_batch_script(self, input_template, job, case, outfile=None):
+    def make_batch_script(self, input_template, job, case, outfile=None, values=None):
+        """
+        Write the batch script of job from input_template. values is an
+        optional dict of values looked up in case, see transform_vars.
+        """
         expect(
             os.path.exists(input_template),
             "input file '{}' does not exist".format(input_template),
@@ -240,13 +287,16 @@ class EnvBatch(EnvBase):
         overrides["job_id"] = ext + "." + case.get_value("CASE").replace("%", "")
 
         overrides["batchdirectives"] = self.get_batch_directives(
-            case, job, overrides=overrides
+            case, job, overrides=overrides, values=values
         )
+        with open(input_template, "r") as fd:
+            template = fd.read()
         output_text = transform_vars(
-            open(input_template, "r").read(),
+            template,
             case=case,
             subgroup=job,
             overrides=overrides,
+            values=values,
         )
         output_name = get_batch_script_for_job(job) if outfile is None else outfile
         logger.info("Creating file {}".format(output_name))
@@ -471,8 +521,13 @@ class EnvBatch(EnvBase):
         )
         return result
 
-    def get_batch_directives(self, case, job, overrides=None, output_format="default"):
-        """ """
+    def get_batch_directives(
+        self, case, job, overrides=None, output_format="default", values=None
+    ):
+        """
+        Returns the batch directives of job, one per line. values is an
+        optional dict of values looked up in case, see transform_vars.
+        """
         result = []
         directive_prefix = None
 
@@ -533,6 +588,7 @@ class EnvBatch(EnvBase):
                                     subgroup=job,
                                     default=default,
                                     overrides=overrides,
+                                    values=values,
                                 )
                             else:
                                 directive = transform_vars(directive, default=default)
@@ -1202,24 +1258,78 @@ class EnvBatch(EnvBase):
 
         return nodes
 
-    def get_status(self, jobid):
+    def _get_batch_query(self):
+        # as get_value, the last batch_query of the batch_system elements
         batch_query = self.get_optional_child("batch_query")
         if batch_query is None:
-            logger.warning("Batch queries not supported on this platform")
-        else:
-            cmd = self.text(batch_query) + " "
-            if self.has(batch_query, "per_job_arg"):
-                cmd += self.get(batch_query, "per_job_arg") + " "
+            for bsnode in self.get_children("batch_system"):
+                node = self.get_optional_child("batch_query", root=bsnode)
+                if node is not None:
+                    batch_query = node
+        return batch_query
 
-            cmd += jobid
+    def _query_batch_jobs(self, batch_query):
+        """
+        Returns the header and job lines of the batch query with its list_args
+        listing all jobs, as _parse_batch_query, or None if the query failed.
+        The query is run at most once every BATCH_QUERY_TTL seconds.
+        """
+        cmd = "{} {}".format(
+            self.text(batch_query),
+            self.get_resolved_value(self.get(batch_query, "list_args")),
+        )
 
-            status, out, err = run_cmd(cmd)
-            if status != 0:
-                logger.warning(
-                    "Batch query command '{}' failed with error '{}'".format(cmd, err)
-                )
-            else:
-                return out.strip()
+        with _BATCH_QUERIES_LOCK:
+            query_time, jobs = _BATCH_QUERIES.get(cmd, (None, None))
+            if query_time is None or time.time() - query_time > self.BATCH_QUERY_TTL:
+                status, out, err = run_cmd(cmd)
+                if status != 0:
+                    logger.warning(
+                        "Batch query command '{}' failed with error '{}'".format(
+                            cmd, err
+                        )
+                    )
+                    jobs = None
+                else:
+                    jobs = _parse_batch_query(out)
+                _BATCH_QUERIES[cmd] = (time.time(), jobs)
+
+        return jobs
+
+    def get_status(self, jobid):
+        """
+        Returns the batch query output for jobid, or None if the job is not
+        known to the batch system
+        """
+        batch_query = self._get_batch_query()
+        if batch_query is None:
+            logger.warning("Batch queries not supported on this platform")
+            return None
+
+        if self.has(batch_query, "list_args") and not self.DISABLE_BATCH_QUERY_CACHING:
+            jobs = self._query_batch_jobs(batch_query)
+            if jobs is not None:
+                header, job_lines = jobs
+                lines = job_lines.get(str(jobid).split(".")[0])
+                if lines:
+                    return "\n".join(header + lines)
+
+        # the job on its own, also if the listing does not show it, e.g. when
+        # the listing is in a format _parse_batch_query does not understand
+        cmd = self.text(batch_query) + " "
+        if self.has(batch_query, "per_job_arg"):
+            cmd += self.get(batch_query, "per_job_arg") + " "
+
+        cmd += jobid
+
+        status, out, err = run_cmd(cmd)
+        if status != 0:
+            logger.warning(
+                "Batch query command '{}' failed with error '{}'".format(cmd, err)
+            )
+            return None
+
+        return out.strip()
 
     def cancel_job(self, jobid):
         batch_cancel = self.get_optional_child("batch_cancel")
@@ -1279,6 +1389,8 @@ class EnvBatch(EnvBase):
         env_workflow = case.get_env("workflow")
         logger.info("Creating batch scripts")
         jobs = env_workflow.get_jobs()
+        # the values looked up in case while writing all the scripts
+        values = {}
         for job in jobs:
             template = case.get_resolved_value(
                 env_workflow.get_value("template", subgroup=job)
@@ -1294,7 +1406,7 @@ class EnvBatch(EnvBase):
                         job, input_batch_script
                     )
                 )
-                self.make_batch_script(input_batch_script, job, case)
+                self.make_batch_script(input_batch_script, job, case, values=values)
             else:
                 logger.warning(
                     "Input template file {} for job {} does not exist or cannot be read.".format(
@@ -5,14 +5,24 @@ from CIME.XML.standard_module_setup import *
 
 from CIME.XML.env_base import EnvBase
 from CIME.utils import transform_vars, get_cime_root
-import string, resource
+import string, resource, json, hashlib, tempfile
 from collections import OrderedDict
 
 logger = logging.getLogger(__name__)
 
+# Environment changes made by loading modules, saved in the case directory by
+# load_env and removed by case.setup --reset
+ENV_CACHE_FILENAME = ".env_mach_specific.cache.json"
+
+# Environment variables holding the state of the module system, the result of
+# loading modules depends on them
+_MODULE_STATE_VARS = ("LOADEDMODULES", "_LMFILES_", "MODULEPATH", "MODULESHOME")
+
 # Is not of type EntryID but can use functions from EntryID (e.g
 # get_type) otherwise need to implement own functions and make GenericXML parent class
 class EnvMachSpecific(EnvBase):
+    DISABLE_ENV_CACHING = "CIME_NO_ENV_CACHE" in os.environ
+
     # pylint: disable=unused-argument
     def __init__(
         self,
@@ -137,8 +147,12 @@ class EnvMachSpecific(EnvBase):
         # in the environment_variables block
         modules_to_load = self._get_modules_for_case(case)
         if modules_to_load is not None:
-            self._load_modules(
-                modules_to_load, force_method=force_method, verbose=verbose
+            self._load_modules_cached(
+                case,
+                modules_to_load,
+                force_method=force_method,
+                job=job,
+                verbose=verbose,
             )
 
         envs_to_set = self._get_envs_for_case(case, job=job)
@@ -162,6 +176,104 @@ class EnvMachSpecific(EnvBase):
                 limits = (int(val), limits[1])
                 resource.setrlimit(attr, limits)
 
+    def _get_env_cache_key(self, case, modules_to_load, module_system, job):
+        init_path = self.get_module_system_init_path(
+            "python" if module_system == "module" else "sh"
+        )
+        try:
+            init_mtime = os.path.getmtime(init_path) if init_path else None
+        except OSError:
+            init_mtime = None
+
+        key = {
+            "machine": case.get_value("MACH"),
+            "compiler": case.get_value("COMPILER"),
+            "mpilib": case.get_value("MPILIB"),
+            "debug": case.get_value("DEBUG"),
+            "job": job,
+            "module_system": module_system,
+            "modules": modules_to_load,
+            "init_path": init_path,
+            "init_mtime": init_mtime,
+            "module_state": [os.environ.get(var) for var in _MODULE_STATE_VARS],
+        }
+        return hashlib.sha256(
+            json.dumps(key, sort_keys=True, default=str).encode("utf-8")
+        ).hexdigest()
+
+    def _load_modules_cached(
+        self, case, modules_to_load, force_method=None, job=None, verbose=False
+    ):
+        """
+        Load the modules, replaying the environment changes saved by an earlier
+        load with the same key if the variables it changed still have the
+        values they had before that load.
+        """
+        module_system = (
+            self.get_module_system_type() if force_method is None else force_method
+        )
+        # Without a real case there is nowhere to keep the cache
+        caseroot = (
+            None
+            if self._unit_testing or self._standalone_configure
+            else case.get_value("CASEROOT")
+        )
+        if (
+            self.DISABLE_ENV_CACHING
+            or module_system == "none"
+            or not caseroot
+            or not os.path.isdir(caseroot)
+        ):
+            self._load_modules(
+                modules_to_load, force_method=force_method, verbose=verbose
+            )
+            return
+
+        cache_file = os.path.join(caseroot, ENV_CACHE_FILENAME)
+        key = self._get_env_cache_key(case, modules_to_load, module_system, job)
+        cache = {}
+        if os.path.isfile(cache_file):
+            try:
+                with open(cache_file, "r") as fd:
+                    cache = json.load(fd)
+            except (OSError, IOError, ValueError) as e:
+                logger.debug("Ignoring env cache {}: {}".format(cache_file, e))
+
+        entry = cache.get(key)
+        if entry is not None and all(
+            os.environ.get(name) == value for name, value in entry["before"].items()
+        ):
+            logger_func = logger.warning if verbose else logger.debug
+            logger_func("Loading module environment from {}".format(cache_file))
+            for name, value in entry["set"].items():
+                os.environ[name] = value
+            for name in entry["unset"]:
+                os.environ.pop(name, None)
+            return
+
+        old_env = dict(os.environ)
+        self._load_modules(modules_to_load, force_method=force_method, verbose=verbose)
+        new_env = dict(os.environ)
+        changed = set(old_env) ^ set(new_env)
+        changed.update(
+            name
+            for name in old_env
+            if name in new_env and old_env[name] != new_env[name]
+        )
+        cache[key] = {
+            "before": {name: old_env.get(name) for name in changed},
+            "set": {name: new_env[name] for name in changed if name in new_env},
+            "unset": sorted(name for name in changed if name not in new_env),
+        }
+
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=caseroot, prefix=ENV_CACHE_FILENAME)
+            with os.fdopen(fd, "w") as tmp_fd:
+                json.dump(cache, tmp_fd)
+            os.replace(tmp_path, cache_file)
+        except (OSError, IOError) as e:
+            logger.debug("Could not write env cache {}: {}".format(cache_file, e))
+
     def _load_modules(self, modules_to_load, force_method=None, verbose=False):
         module_system = (
             self.get_module_system_type() if force_method is None else force_method
@@ -11,6 +11,9 @@ logger = logging.getLogger(__name__)
 
 
 class Files(EntryID):
+
+    DISK_CACHEABLE = True
+
     def __init__(self, comp_interface=None):
         """
         initialize an object
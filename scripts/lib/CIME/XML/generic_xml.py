@@ -3,13 +3,20 @@ Common interface to XML files, this is an abstract class and is expected to
 be used by other XML interface modules and not directly.
 """
 from CIME.XML.standard_module_setup import *
-from CIME.utils import safe_copy, get_src_root
+from CIME.utils import safe_copy, get_src_root, get_umask
 
 import xml.etree.ElementTree as ET
 
 # pylint: disable=import-error
 from distutils.spawn import find_executable
 import getpass
+import hashlib
+import itertools
+import json
+import stat
+import tempfile
+import time
+import weakref
 import six
 from copy import deepcopy
 from collections import namedtuple
@@ -20,6 +27,8 @@ logger = logging.getLogger(__name__)
 class _Element(
     object
 ):  # private class, don't want users constructing directly or calling methods on it
+    __slots__ = ("xml_element",)
+
     def __init__(self, xml_element):
         self.xml_element = xml_element
 
@@ -38,11 +47,280 @@ class _Element(
         return _Element(deepcopy(self.xml_element))
 
 
+_XML_SPACE = "{http://www.w3.org/XML/1998/namespace}space"
+
+
+def _is_blank(text):
+    return text is not None and text.strip(" \t\n\r") == ""
+
+
+def _normalize_newlines(text):
+    # An XML parser turns \r\n and lone \r into \n
+    return text.replace("\r\n", "\n").replace("\r", "\n")
+
+
+_NONASCII_RE = re.compile("[^\x00-\x7f]")
+
+
+def _escape_nonascii(text):
+    return _NONASCII_RE.sub(lambda match: "&#x{:X};".format(ord(match.group())), text)
+
+
+def _escape_text(text):
+    text = text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+    return _escape_nonascii(text)
+
+
+def _escape_attrib(text):
+    text = text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+    text = text.replace('"', "&quot;").replace("\n", "&#10;")
+    text = text.replace("\r", "&#13;").replace("\t", "&#9;")
+    return _escape_nonascii(text)
+
+
+# Characters ElementTree writes as entity or character references
+_ESCAPED_CHAR_RE = re.compile("([&<>]|[^\x00-\x7f])")
+
+# Serialized elements by content, see _format_cached. Elements at these levels
+# are cached: the groups and entries of env files, the entries of config files.
+_FORMAT_CACHE = {}
+_FORMAT_CACHE_LEVELS = (1, 2)
+_FORMAT_CACHE_SIZE = 20000
+
+
+def _element_content(elem, preserve):
+    """
+    Returns the list of children of elem as xmllint would see them after
+    parsing with blanks removed, text is represented by strings.
+
+    This follows the libxml2 heuristics for ignorable white space when it
+    reads the ElementTree serialization of elem: blank text is dropped unless
+    the element already has text starting with white space, it follows or
+    starts with text, or it is the only content of the element.
+    """
+    content = []
+    mixed = preserve
+
+    def add_text(text):
+        if content and isinstance(content[-1], str):
+            content[-1] += text
+        else:
+            content.append(text)
+
+    texts = [elem.text]
+    for child in elem:
+        texts.extend((child, child.tail))
+
+    for text in texts:
+        if ET.iselement(text):
+            content.append(text)
+            continue
+        elif not text:
+            continue
+
+        tokens = [token for token in _ESCAPED_CHAR_RE.split(text) if token]
+        for idx, token in enumerate(tokens):
+            if mixed or _ESCAPED_CHAR_RE.match(token) or token[0] not in " \t\n\r":
+                add_text(token)
+            elif not _is_blank(token) or idx < len(tokens) - 1:
+                add_text(token)
+                mixed = True
+            elif (
+                (not content and len(elem) == 0)
+                or (content and isinstance(content[-1], str))
+                or (content and isinstance(content[0], str))
+            ):
+                add_text(token)
+                mixed = True
+
+    return content
+
+
+def _format_element(
+    elem, out, qnames, namespaces, level, format_, preserve, cache=False
+):
+    indent = "  " * level
+    tag = elem.tag
+    if tag is ET.Comment:
+        # comments are written as is, non ascii characters as decimal references
+        text = _normalize_newlines(elem.text or "")
+        out.append(
+            "<!--{}-->".format(text.encode("us-ascii", "xmlcharrefreplace").decode())
+        )
+        return
+    elif tag is ET.ProcessingInstruction:
+        out.append("<?{}?>".format(_normalize_newlines(elem.text or "")))
+        return
+
+    out.append("<" + qnames[tag])
+    if namespaces:
+        for uri, prefix in sorted(namespaces.items(), key=lambda x: x[1]):
+            out.append(
+                ' xmlns{}="{}"'.format(
+                    ":" + prefix if prefix else "", _escape_attrib(uri)
+                )
+            )
+    for key, value in elem.items():
+        if key == _XML_SPACE:
+            preserve = value == "preserve"
+        out.append(' {}="{}"'.format(qnames[key], _escape_attrib(value)))
+
+    content = _element_content(elem, preserve)
+    if not content:
+        out.append("/>")
+        return
+
+    out.append(">")
+    if format_ and any(isinstance(item, str) for item in content):
+        format_ = False
+    if format_:
+        out.append("\n")
+
+    for item in content:
+        if isinstance(item, str):
+            out.append(_escape_text(_normalize_newlines(item)))
+        else:
+            if format_:
+                out.append(indent + "  ")
+            if cache and level + 1 in _FORMAT_CACHE_LEVELS:
+                _format_cached(item, out, qnames, level + 1, format_, preserve)
+            else:
+                _format_element(
+                    item, out, qnames, None, level + 1, format_, preserve, cache
+                )
+            if format_:
+                out.append("\n")
+
+    if format_:
+        out.append(indent)
+    out.append("</{}>".format(qnames[tag]))
+
+
+def _format_cached(elem, out, qnames, level, format_, preserve):
+    """
+    _format_element for an element of a tree without namespaces, reusing the
+    serialization of an element with the same content. An env file written
+    again after an xmlchange only serializes the entries that changed, and
+    cases created from the same compset share most of their entries.
+    """
+    # The child counts make the preorder walk describe a single tree
+    key = (
+        tuple((e.tag, tuple(e.items()), e.text, e.tail, len(e)) for e in elem.iter()),
+        level,
+        format_,
+        preserve,
+    )
+    text = _FORMAT_CACHE.get(key)
+    if text is None:
+        elem_out = []
+        _format_element(elem, elem_out, qnames, None, level, format_, preserve, True)
+        text = "".join(elem_out)
+        if len(_FORMAT_CACHE) >= _FORMAT_CACHE_SIZE:
+            _FORMAT_CACHE.clear()
+        _FORMAT_CACHE[key] = text
+    out.append(text)
+
+
+def format_xml(xml_element):
+    """
+    Returns xml_element serialized as the string xmllint --format would
+    produce for it: two space indentation, blank text dropped and elements
+    with mixed content left on a single line.
+
+    >>> xml_element = ET.fromstring('<a x="1"><b>text</b>  <c/><d>mixed <e/></d></a>')
+    >>> print(format_xml(xml_element), end="")
+    <?xml version="1.0"?>
+    <a x="1">
+      <b>text</b>
+      <c/>
+      <d>mixed <e/></d>
+    </a>
+    """
+    # pylint: disable=protected-access
+    qnames, namespaces = ET._namespaces(xml_element)
+    out = ['<?xml version="1.0"?>\n']
+    # Prefixes of namespaces depend on the whole tree, do not cache with them
+    _format_element(
+        xml_element, out, qnames, namespaces, 0, True, False, cache=not namespaces
+    )
+    out.append("\n")
+    return "".join(out)
+
+
+def _replace_file(path, text):
+    """
+    Write text to file path unless the file already has that content, returns
+    True if the file was written. The file is replaced atomically so readers
+    never see a partially written file.
+    """
+    path = os.path.realpath(path)
+    data = text.encode("utf-8")
+    try:
+        path_stat = os.stat(path)
+    except OSError:
+        mode = 0o666 & ~get_umask()
+    else:
+        if path_stat.st_size == len(data):
+            with open(path, "rb") as fd:
+                if fd.read() == data:
+                    return False
+        mode = stat.S_IMODE(path_stat.st_mode)
+
+    try:
+        fd, tmp_path = tempfile.mkstemp(
+            dir=os.path.dirname(path),
+            prefix=".{}.".format(os.path.basename(path)),
+            suffix=".tmp",
+        )
+    except OSError:
+        # A writable file in a directory that is not, write the file in place
+        with open(path, "wb") as fout:
+            fout.write(data)
+        return True
+
+    try:
+        with os.fdopen(fd, "wb") as fout:
+            fout.write(data)
+        os.chmod(tmp_path, mode)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return True
+
+
+_REFERENCE_VAR_RE = re.compile(r"\${?(\w+)}?")
+_ENV_REF_RE = re.compile(r"\$ENV\{(\w+)\}")
+_SHELL_REF_RE = re.compile(r"\$SHELL\{([^}]+)\}")
+_MATH_RE = re.compile(r"\s[+-/*]\s")
+
+
 class GenericXML(object):
 
     _FILEMAP = {}
     DISABLE_CACHING = False
+    # Classes for config files that are read often set DISK_CACHEABLE, their
+    # parsed contents are kept in DISK_CACHE_DIR across processes.
+    DISK_CACHEABLE = False
+    DISABLE_DISK_CACHING = "CIME_NO_XML_DISK_CACHE" in os.environ
+    DISK_CACHE_DIR = os.path.join(
+        os.environ.get("HOME", os.path.expanduser("~")), ".cime", "xml_cache"
+    )
+    # Number of entries kept in DISK_CACHE_DIR, see _prune_disk_cache
+    DISK_CACHE_SIZE = 500
+    _pruned_disk_caches = set()
+    _included_files = None
+    _resolving_dependencies = None
+    USE_XMLLINT = "CIME_USE_XMLLINT" in os.environ
     CacheEntry = namedtuple("CacheEntry", ["tree", "root", "modtime"])
+    # parsed root element -> {name: lookup table}, see get_lookup_index
+    _LOOKUP_INDEXES = weakref.WeakKeyDictionary()
+    # parsed root element -> its change counts, see change_count and
+    # structure_count
+    _CHANGE_COUNTS = weakref.WeakKeyDictionary()
+    _STRUCTURE_COUNTS = weakref.WeakKeyDictionary()
+    _change_counter = itertools.count(1)
 
     @classmethod
     def invalidate(cls, filename):
@@ -67,6 +345,8 @@ class GenericXML(object):
         self.read_only = read_only
         self.filename = infile
         self.needsrewrite = False
+        # ElementTree node -> its _Element, see _get_element
+        self._elements = {}
         if infile is None:
             return
 
@@ -104,6 +384,51 @@ class GenericXML(object):
 
             self._FILEMAP[infile] = self.CacheEntry(self.tree, self.root, 0.0)
 
+    @property
+    def change_count(self):
+        """
+        A number that changes whenever the content of the tree changes,
+        through this object or any other object sharing the parsed file, and
+        when another file is read.
+        """
+        if self.root is None:
+            return 0
+        if self.root.xml_element not in self._CHANGE_COUNTS:
+            self._changed(structure=True)
+        return self._CHANGE_COUNTS[self.root.xml_element]
+
+    @property
+    def structure_count(self):
+        """
+        Like change_count, but only changes when elements are added, removed
+        or renamed or their id attribute changes.
+        """
+        if self.root is None:
+            return 0
+        if self.root.xml_element not in self._STRUCTURE_COUNTS:
+            self._changed(structure=True)
+        return self._STRUCTURE_COUNTS[self.root.xml_element]
+
+    def _changed(self, structure=False):
+        if self.root is not None:
+            # unique across trees, so reading another file changes it too
+            count = next(self._change_counter)
+            self._CHANGE_COUNTS[self.root.xml_element] = count
+            if structure:
+                self._STRUCTURE_COUNTS[self.root.xml_element] = count
+
+    def get_lookup_index(self, name, build):
+        """
+        Return the lookup table `name` of this file, calling build() to create
+        it on first use. Tables are shared by all objects reading the same
+        parsed file and are dropped when the file is parsed again, so they may
+        only be derived from files that are not modified in memory.
+        """
+        indexes = self._LOOKUP_INDEXES.setdefault(self.root.xml_element, {})
+        if name not in indexes:
+            indexes[name] = build()
+        return indexes[name]
+
     def read(self, infile, schema=None):
         """
         Read and parse an xml file into the object
@@ -121,10 +446,25 @@ class GenericXML(object):
                     ),
                 )
                 self.tree, self.root, _ = self._FILEMAP[infile]
+                self._elements = {}
                 cached_read = True
 
+        use_disk_cache = (
+            not cached_read
+            and self.tree is None
+            and self.DISK_CACHEABLE
+            and not self.DISABLE_DISK_CACHING
+        )
+        if use_disk_cache and self._read_disk_cache(infile, schema):
+            cached_read = True
+            self._FILEMAP[infile] = self.CacheEntry(
+                self.tree, self.root, os.path.getmtime(infile)
+            )
+
         if not cached_read:
             logger.debug("read: {}".format(infile))
+            if use_disk_cache:
+                self._included_files = []
             file_open = (
                 (lambda x: open(x, "r", encoding="utf-8"))
                 if six.PY3
@@ -142,6 +482,104 @@ class GenericXML(object):
                 self.tree, self.root, os.path.getmtime(infile)
             )
 
+            if use_disk_cache:
+                self._write_disk_cache(infile, schema, self._included_files)
+                self._included_files = None
+
+    def _get_disk_cache_path(self, infile, schema):
+        key = json.dumps([os.path.abspath(infile), schema and os.path.abspath(schema)])
+        return os.path.join(
+            self.DISK_CACHE_DIR,
+            hashlib.sha256(key.encode("utf-8")).hexdigest() + ".xml",
+        )
+
+    @staticmethod
+    def _get_file_stamps(paths):
+        stamps = []
+        for path in paths:
+            stat = os.stat(path)
+            stamps.append([os.path.abspath(path), stat.st_mtime_ns, stat.st_size])
+        return stamps
+
+    def _read_disk_cache(self, infile, schema):
+        """
+        Read the parsed, include-expanded and validated contents of infile
+        from the disk cache. Returns False if there is no up to date entry.
+        """
+        cache_path = self._get_disk_cache_path(infile, schema)
+        try:
+            with open(cache_path, "rb") as fd:
+                stamps = json.loads(fd.readline().decode("utf-8"))
+                paths = [stamp[0] for stamp in stamps]
+                if self._get_file_stamps(paths) != stamps:
+                    return False
+                root = ET.fromstring(fd.read())
+        except (OSError, ValueError, ET.ParseError) as e:
+            logger.debug("read (disk cache miss): {} {}".format(infile, e))
+            return False
+
+        logger.debug("read (disk cached): {}".format(infile))
+        try:
+            # the least recently read entries are pruned first
+            os.utime(cache_path)
+        except OSError:
+            pass
+        self.tree = ET.ElementTree(root)
+        self.root = _Element(root)
+        self._elements = {}
+        return True
+
+    def _write_disk_cache(self, infile, schema, included_files):
+        paths = [infile] + included_files + ([schema] if schema else [])
+        cache_path = self._get_disk_cache_path(infile, schema)
+        try:
+            stamps = self._get_file_stamps(paths)
+            if not os.path.isdir(self.DISK_CACHE_DIR):
+                os.makedirs(self.DISK_CACHE_DIR)
+            if self.DISK_CACHE_DIR not in GenericXML._pruned_disk_caches:
+                GenericXML._pruned_disk_caches.add(self.DISK_CACHE_DIR)
+                self._prune_disk_cache()
+            fd, tmp_path = tempfile.mkstemp(dir=self.DISK_CACHE_DIR, suffix=".tmp")
+            with os.fdopen(fd, "wb") as cache_fd:
+                cache_fd.write(json.dumps(stamps).encode("utf-8") + b"\n")
+                cache_fd.write(ET.tostring(self.tree.getroot()))
+            # atomic so that concurrent readers never see a partial entry
+            os.replace(tmp_path, cache_path)
+        except OSError as e:
+            logger.debug("Could not write disk cache for {}: {}".format(infile, e))
+
+    def _prune_disk_cache(self):
+        """
+        Remove the disk cache entries for files that no longer exist and the
+        least recently used entries beyond DISK_CACHE_SIZE. This is done by
+        the first write to the cache of a process.
+        """
+        entries = []
+        for name in os.listdir(self.DISK_CACHE_DIR):
+            cache_path = os.path.join(self.DISK_CACHE_DIR, name)
+            try:
+                if name.endswith(".xml"):
+                    with open(cache_path, "rb") as fd:
+                        stamps = json.loads(fd.readline().decode("utf-8"))
+                    if all(os.path.exists(stamp[0]) for stamp in stamps):
+                        entries.append((os.path.getmtime(cache_path), cache_path))
+                        continue
+                elif time.time() - os.path.getmtime(cache_path) < 3600:
+                    # may be an entry being written
+                    continue
+
+                logger.debug("Removing stale disk cache entry {}".format(cache_path))
+                os.remove(cache_path)
+            except (OSError, ValueError, IndexError, TypeError) as e:
+                logger.debug("Could not prune {}: {}".format(cache_path, e))
+
+        entries.sort(reverse=True)
+        for _, cache_path in entries[self.DISK_CACHE_SIZE :]:
+            try:
+                os.remove(cache_path)
+            except OSError:
+                pass
+
     def read_fd(self, fd):
         expect(
             self.read_only or not self.filename or not self.needsrewrite,
@@ -161,6 +599,7 @@ class GenericXML(object):
         else:
             self.tree = ET.parse(fd)
             self.root = _Element(self.tree.getroot())
+            self._elements = {}
         include_elems = self.scan_children("xi:include")
         # First remove all includes found from the list
         for elem in include_elems:
@@ -175,6 +614,8 @@ class GenericXML(object):
                 )
             )
             logger.debug("Include file {}".format(path))
+            if self._included_files is not None:
+                self._included_files.append(path)
             self.read(path)
 
     def lock(self):
@@ -195,6 +636,7 @@ class GenericXML(object):
             safe_copy(self.filename, newfile)
 
         self.tree = None
+        self._elements = {}
         self.filename = newfile
         self.read(newfile)
 
@@ -202,6 +644,16 @@ class GenericXML(object):
     # API for individual node operations
     #
 
+    def _get_element(self, xml_element):
+        """
+        Return the _Element wrapping xml_element, the same object is returned
+        every time for a given node so lookups do not allocate new wrappers.
+        """
+        node = self._elements.get(xml_element)
+        if node is None:
+            node = self._elements[xml_element] = _Element(xml_element)
+        return node
+
     def get(self, node, attrib_name, default=None):
         return node.xml_element.get(attrib_name, default=default)
 
@@ -224,6 +676,7 @@ class GenericXML(object):
                     ),
                 )
             self.needsrewrite = True
+            self._changed(structure=attrib_name == "id")
             return node.xml_element.set(attrib_name, value)
 
     def pop(self, node, attrib_name):
@@ -241,6 +694,7 @@ class GenericXML(object):
                 ),
             )
         self.needsrewrite = True
+        self._changed(structure=attrib_name == "id")
         return node.xml_element.attrib.pop(attrib_name)
 
     def attrib(self, node):
@@ -256,6 +710,7 @@ class GenericXML(object):
         )
         if node.xml_element.tag != name:
             self.needsrewrite = True
+            self._changed(structure=True)
             node.xml_element.tag = name
 
     def set_text(self, node, text):
@@ -268,6 +723,7 @@ class GenericXML(object):
         if node.xml_element.text != text:
             node.xml_element.text = text
             self.needsrewrite = True
+            self._changed()
 
     def name(self, node):
         return node.xml_element.tag
@@ -288,6 +744,7 @@ class GenericXML(object):
             ),
         )
         self.needsrewrite = True
+        self._changed(structure=True)
         root = root if root is not None else self.root
         if position is not None:
             root.xml_element.insert(position, node.xml_element)
@@ -307,8 +764,11 @@ class GenericXML(object):
             ),
         )
         self.needsrewrite = True
+        self._changed(structure=True)
         root = root if root is not None else self.root
         root.xml_element.remove(node.xml_element)
+        for xml_element in node.xml_element.iter():
+            self._elements.pop(xml_element, None)
 
     def make_child(self, name, attributes=None, root=None, text=None):
         expect(
@@ -319,10 +779,13 @@ class GenericXML(object):
         )
         root = root if root is not None else self.root
         self.needsrewrite = True
+        self._changed(structure=True)
         if attributes is None:
-            node = _Element(ET.SubElement(root.xml_element, name))
+            node = self._get_element(ET.SubElement(root.xml_element, name))
         else:
-            node = _Element(ET.SubElement(root.xml_element, name, attrib=attributes))
+            node = self._get_element(
+                ET.SubElement(root.xml_element, name, attrib=attributes)
+            )
 
         if text:
             self.set_text(node, text)
@@ -338,6 +801,7 @@ class GenericXML(object):
         )
         root = root if root is not None else self.root
         self.needsrewrite = True
+        self._changed(structure=True)
         et_comment = ET.Comment(text)
         node = _Element(et_comment)
         root.xml_element.append(node.xml_element)
@@ -350,33 +814,40 @@ class GenericXML(object):
         You can specify attributes={key:None} if you want to select children
         with the key attribute but you don't care what its value is.
         """
+        return list(self.iter_children(name=name, attributes=attributes, root=root))
+
+    def iter_children(self, name=None, attributes=None, root=None):
+        """
+        Generator version of get_children, yields the matching children one at
+        a time. Use it for read-only loops that may stop early, the tree must
+        not be modified while iterating.
+
+        Unlike get_children this is not overridden by subclasses, so it always
+        does the plain tree search.
+        """
         root = root if root is not None else self.root
-        children = []
+        elements = self._elements
         for child in root.xml_element:
-            if name is not None:
-                if child.tag != name:
-                    continue
+            if name is not None and child.tag != name:
+                continue
 
             if attributes is not None:
-                if child.attrib is None:
+                attrib = child.attrib
+                match = True
+                for key, value in attributes.items():
+                    if key not in attrib or (
+                        value is not None and attrib[key] != value
+                    ):
+                        match = False
+                        break
+
+                if not match:
                     continue
-                else:
-                    match = True
-                    for key, value in attributes.items():
-                        if key not in child.attrib:
-                            match = False
-                            break
-                        elif value is not None:
-                            if child.attrib[key] != value:
-                                match = False
-                                break
-
-                    if not match:
-                        continue
-
-            children.append(_Element(child))
 
-        return children
+            node = elements.get(child)
+            if node is None:
+                node = elements[child] = _Element(child)
+            yield node
 
     def get_child(self, name=None, attributes=None, root=None, err_msg=None):
         child = self.get_optional_child(
@@ -478,12 +949,12 @@ class GenericXML(object):
             + (outfile if isinstance(outfile, six.string_types) else str(outfile))
         )
 
-        xmlstr = self.get_raw_record()
-
-        # xmllint provides a better format option for the output file
-        xmllint = find_executable("xmllint")
+        # xmllint is only used on request, format_xml produces the same output
+        # without starting a subprocess for every file
+        xmllint = find_executable("xmllint") if self.USE_XMLLINT else None
 
         if xmllint is not None:
+            xmlstr = self.get_raw_record()
             if isinstance(outfile, six.string_types):
                 run_cmd_no_fail(
                     "{} --format --output {} -".format(xmllint, outfile),
@@ -495,8 +966,12 @@ class GenericXML(object):
                 )
 
         else:
-            with open(outfile, "w") as xmlout:
-                xmlout.write(xmlstr)
+            xmlstr = self.get_formatted_record()
+            if isinstance(outfile, six.string_types):
+                if not _replace_file(outfile, xmlstr):
+                    logger.debug("write: {} is unchanged".format(outfile))
+            else:
+                outfile.write(xmlstr)
 
         self._FILEMAP[self.filename] = self.CacheEntry(
             self.tree, self.root, os.path.getmtime(self.filename)
@@ -576,9 +1051,8 @@ class GenericXML(object):
                 if not nodes:
                     nodes = newnodes
                 else:
-                    for node in nodes[:]:
-                        if node not in newnodes:
-                            nodes.remove(node)
+                    newnodes = set(newnodes)
+                    nodes = [node for node in nodes if node in newnodes]
                 if not nodes:
                     return []
 
@@ -588,7 +1062,7 @@ class GenericXML(object):
 
         logger.debug("Returning {} nodes ({})".format(len(nodes), nodes))
 
-        return [_Element(node) for node in nodes]
+        return [self._get_element(node) for node in nodes]
 
     def get_value(
         self, item, attribute=None, resolved=True, subgroup=None
@@ -618,12 +1092,17 @@ class GenericXML(object):
 
         return value if valnodes else None
 
-    def get_resolved_value(self, raw_value, allow_unresolved_envvars=False):
+    def get_resolved_value(
+        self, raw_value, allow_unresolved_envvars=False, dependencies=None
+    ):
         """
         A value in the xml file may contain references to other xml
         variables or to environment variables. These are refered to in
         the perl style with $name and $ENV{name}.
 
+        If dependencies is a set, the names of the variables referenced
+        while resolving are added to it, environment variables as $ENV{name}.
+
         >>> obj = GenericXML()
         >>> os.environ["FOO"] = "BAR"
         >>> os.environ["BAZ"] = "BARF"
@@ -635,12 +1114,13 @@ class GenericXML(object):
         '0001-01-01'
         >>> obj.get_resolved_value("$SHELL{echo hi}") == 'hi'
         True
+        >>> dependencies = set()
+        >>> obj.get_resolved_value("$ENV{FOO}/$CASEROOT", dependencies=dependencies)
+        'BAR/$CASEROOT'
+        >>> sorted(dependencies)
+        ['$ENV{FOO}', 'CASEROOT']
         """
         logger.debug("raw_value {}".format(raw_value))
-        reference_re = re.compile(r"\${?(\w+)}?")
-        env_ref_re = re.compile(r"\$ENV\{(\w+)\}")
-        shell_ref_re = re.compile(r"\$SHELL\{([^}]+)\}")
-        math_re = re.compile(r"\s[+-/*]\s")
         item_data = raw_value
 
         if item_data is None:
@@ -649,23 +1129,39 @@ class GenericXML(object):
         if not isinstance(item_data, six.string_types):
             return item_data
 
-        for m in env_ref_re.finditer(item_data):
+        if dependencies is None:
+            # values resolved through get_value while we are resolving
+            dependencies = self._resolving_dependencies
+        elif self._resolving_dependencies is None:
+            self._resolving_dependencies = dependencies
+            try:
+                return self.get_resolved_value(
+                    raw_value, allow_unresolved_envvars=allow_unresolved_envvars
+                )
+            finally:
+                self._resolving_dependencies = None
+
+        for m in _ENV_REF_RE.finditer(item_data):
             logger.debug("look for {} in env".format(item_data))
             env_var = m.groups()[0]
             env_var_exists = env_var in os.environ
+            if dependencies is not None:
+                dependencies.add(m.group())
             if not allow_unresolved_envvars:
                 expect(env_var_exists, "Undefined env var '{}'".format(env_var))
             if env_var_exists:
                 item_data = item_data.replace(m.group(), os.environ[env_var])
 
-        for s in shell_ref_re.finditer(item_data):
+        for s in _SHELL_REF_RE.finditer(item_data):
             logger.debug("execute {} in shell".format(item_data))
             shell_cmd = s.groups()[0]
             item_data = item_data.replace(s.group(), run_cmd_no_fail(shell_cmd))
 
-        for m in reference_re.finditer(item_data):
+        for m in _REFERENCE_VAR_RE.finditer(item_data):
             var = m.groups()[0]
             logger.debug("find: {}".format(var))
+            if dependencies is not None:
+                dependencies.add(var)
             # The overridden versions of this method do not simply return None
             # so the pylint should not be flagging this
             ref = self.get_value(var)  # pylint: disable=assignment-from-none
@@ -684,7 +1180,7 @@ class GenericXML(object):
             elif var == "USER":
                 item_data = item_data.replace(m.group(), getpass.getuser())
 
-        if math_re.search(item_data):
+        if _MATH_RE.search(item_data):
             try:
                 tmp = eval(item_data)
             except Exception:
@@ -728,6 +1224,11 @@ class GenericXML(object):
             )
         return xmlstr
 
+    def get_formatted_record(self, root=None):
+        if root is None:
+            root = self.root
+        return format_xml(root.xml_element)
+
     def get_id(self):
         xmlid = self.get(self.root, "id")
         if xmlid is not None:
@@ -18,6 +18,9 @@ GRID_SEP = ":"
 
 
 class Grids(GenericXML):
+
+    DISK_CACHEABLE = True
+
     def __init__(self, infile=None, files=None, comp_interface=None):
         if files is None:
             files = Files(comp_interface=comp_interface)
@@ -95,73 +98,44 @@ class Grids(GenericXML):
 
         Returns a grid long name given the alias ('name' argument)
         """
+        key = (name, compset, atmnlev, lndnlev)
+        resolved = self.get_lookup_index("resolved_grids", dict)
+        if key in resolved:
+            return resolved[key]
+
         model_grid = {}
         for comp_gridname in self._comp_gridnames:
             model_grid[comp_gridname] = None
 
+        grid_defaults, model_gridnodes = self._get_model_grid_index()
+
         # (1) set array of component grid defaults that match current compset
-        grids_node = self.get_child("grids")
-        grid_defaults_node = self.get_child("model_grid_defaults", root=grids_node)
-        for grid_node in self.get_children("grid", root=grid_defaults_node):
-            name_attrib = self.get(grid_node, "name")
-            compset_attrib = self.get(grid_node, "compset")
-            compset_match = re.search(compset_attrib, compset)
-            if compset_match is not None:
-                model_grid[name_attrib] = self.text(grid_node)
+        for name_attrib, compset_re, text in grid_defaults:
+            if compset_re.search(compset) is not None:
+                model_grid[name_attrib] = text
 
         # (2)loop over all of the "model grid" nodes and determine is there an alias match with the
         # input grid name -  if there is an alias match determine if the "compset" and "not_compset"
         # regular expression attributes match the match the input compset
 
-        model_gridnodes = self.get_children("model_grid", root=grids_node)
         model_gridnode = None
-        foundalias = False
-        for node in model_gridnodes:
-            alias = self.get(node, "alias")
-            if alias == name:
-                foundalias = True
-                foundcompset = False
-                compset_attrib = self.get(node, "compset")
-                not_compset_attrib = self.get(node, "not_compset")
-                if compset_attrib and not_compset_attrib:
-                    compset_match = re.search(compset_attrib, compset)
-                    not_compset_match = re.search(not_compset_attrib, compset)
-                    if compset_match is not None and not_compset_match is None:
-                        foundcompset = True
-                        model_gridnode = node
-                        logger.debug(
-                            "Found match for {} with compset_match {} and not_compset_match {}".format(
-                                alias, compset_attrib, not_compset_attrib
-                            )
-                        )
-                        break
-                elif compset_attrib:
-                    compset_match = re.search(compset_attrib, compset)
-                    if compset_match is not None:
-                        foundcompset = True
-                        model_gridnode = node
-                        logger.debug(
-                            "Found match for {} with compset_match {}".format(
-                                alias, compset_attrib
-                            )
-                        )
-                        break
-                elif not_compset_attrib:
-                    not_compset_match = re.search(not_compset_attrib, compset)
-                    if not_compset_match is None:
-                        foundcompset = True
-                        model_gridnode = node
-                        logger.debug(
-                            "Found match for {} with not_compset_match {}".format(
-                                alias, not_compset_attrib
-                            )
-                        )
-                        break
-                else:
-                    foundcompset = True
-                    model_gridnode = node
-                    logger.debug("Found match for {}".format(alias))
-                    break
+        foundalias = name in model_gridnodes
+        foundcompset = False
+        for node, compset_re, not_compset_re in model_gridnodes.get(name, []):
+            if compset_re is not None and compset_re.search(compset) is None:
+                continue
+            if not_compset_re is not None and not_compset_re.search(compset):
+                continue
+            foundcompset = True
+            model_gridnode = node
+            logger.debug(
+                "Found match for {} with compset_match {} and not_compset_match {}".format(
+                    name,
+                    compset_re and compset_re.pattern,
+                    not_compset_re and not_compset_re.pattern,
+                )
+            )
+            break
         expect(foundalias, "no alias {} defined".format(name))
         # if no match is found in config_grids.xml - exit
         expect(
@@ -211,8 +185,44 @@ class Grids(GenericXML):
 
             else:
                 lname += "null"
+        resolved[key] = lname
         return lname
 
+    def _get_model_grid_index(self):
+        """
+        Return the model_grid_defaults of config_grids.xml as a list of
+        (grid name, compiled compset regex, grid) and the model_grid nodes as a
+        dictionary mapping each alias to a list of (node, compiled compset
+        regex, compiled not_compset regex), where a missing regex is None.
+        """
+
+        def build():
+            grids_node = self.get_child("grids")
+            grid_defaults_node = self.get_child("model_grid_defaults", root=grids_node)
+            grid_defaults = [
+                (
+                    self.get(grid_node, "name"),
+                    re.compile(self.get(grid_node, "compset")),
+                    self.text(grid_node),
+                )
+                for grid_node in self.iter_children("grid", root=grid_defaults_node)
+            ]
+
+            model_gridnodes = {}
+            for node in self.iter_children("model_grid", root=grids_node):
+                compset_attrib = self.get(node, "compset")
+                not_compset_attrib = self.get(node, "not_compset")
+                model_gridnodes.setdefault(self.get(node, "alias"), []).append(
+                    (
+                        node,
+                        re.compile(compset_attrib) if compset_attrib else None,
+                        re.compile(not_compset_attrib) if not_compset_attrib else None,
+                    )
+                )
+            return grid_defaults, model_gridnodes
+
+        return self.get_lookup_index("model_grids", build)
+
     def _get_domains(self, component_grids, atmlevregex, lndlevregex, driver):
         """determine domains dictionary for config_grids.xml v2 schema"""
         domains = {}
@@ -480,7 +490,7 @@ class Grids(GenericXML):
         - gridvalue: name of grid for compname
         - other_gridvalue: name of grid for other_compname
         """
-        gridmaps_roots = self.get_children("gridmaps")
+        gridmaps_roots = self.iter_children("gridmaps")
         gridmap_nodes = []
         for root in gridmaps_roots:
             gmdriver = self.get(root, "driver")
@@ -512,7 +522,7 @@ class Grids(GenericXML):
                 len(self.attrib(gridmap_node)) == 2,
                 " Bad attribute count in gridmap node %s" % self.attrib(gridmap_node),
             )
-            map_nodes = self.get_children("map", root=gridmap_node)
+            map_nodes = self.iter_children("map", root=gridmap_node)
             for map_node in map_nodes:
                 name = self.get(map_node, "name")
                 value = self.text(map_node)
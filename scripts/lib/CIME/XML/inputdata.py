@@ -10,6 +10,9 @@ logger = logging.getLogger(__name__)
 
 
 class Inputdata(GenericXML):
+
+    DISK_CACHEABLE = True
+
     def __init__(self, infile=None, files=None):
         """
         initialize a files object given input pes specification file
@@ -12,6 +12,9 @@ logger = logging.getLogger(__name__)
 
 
 class Machines(GenericXML):
+
+    DISK_CACHEABLE = True
+
     def __init__(self, infile=None, files=None, machine=None, extra_machines_dir=None):
         """
         initialize an object
@@ -118,7 +121,7 @@ class Machines(GenericXML):
         """
         Return the names of all the child nodes for the target machine
         """
-        nodes = self.get_children(root=self.machine_node)
+        nodes = self.iter_children(root=self.machine_node)
         node_names = []
         for node in nodes:
             node_names.append(self.name(node))
@@ -136,7 +139,7 @@ class Machines(GenericXML):
         Return a list of machines defined for a given CIME_MODEL
         """
         machines = []
-        nodes = self.get_children("machine")
+        nodes = self.iter_children("machine")
         for node in nodes:
             mach = self.get(node, "MACH")
             machines.append(mach)
@@ -180,7 +183,7 @@ class Machines(GenericXML):
         """
 
         machine = None
-        nodes = self.get_children("machine")
+        nodes = self.iter_children("machine")
 
         for node in nodes:
             machtocheck = self.get(node, "MACH")
@@ -76,6 +76,8 @@ class NamelistDefinition(EntryID):
     - validate
     """
 
+    DISK_CACHEABLE = True
+
     def __init__(self, infile, files=None):
         """Construct a `NamelistDefinition` from an XML file."""
 
@@ -95,6 +97,10 @@ class NamelistDefinition(EntryID):
         self._entry_types = {}
         self._group_names = CaseInsensitiveDict({})
         self._nodes = {}
+        # id -> node of every entry in the file, built on first use
+        self._entry_index = None
+        # entry xml element -> precompiled value matcher, see _get_value_matcher
+        self._value_matchers = {}
 
     def set_node_values(self, name, node):
         self._entry_nodes.append(node)
@@ -173,6 +179,103 @@ class NamelistDefinition(EntryID):
     def get_entry_nodes(self):
         return self._entry_nodes
 
+    def _get_entry_node(self, vid):
+        """Return the entry node with id `vid`, or None if there is none."""
+        node = self._nodes.get(vid)
+        if node is None:
+            if self._entry_index is None:
+                self._entry_index = {}
+                for entry in self.get_children("entry"):
+                    self._entry_index.setdefault(self.get(entry, "id"), entry)
+            node = self._entry_index.get(vid)
+        return node
+
+    def get_node_element_info(self, vid, element_name):
+        node = self._get_entry_node(vid)
+        if node is None:
+            return None
+        else:
+            return self._get_node_element_info(node, element_name)
+
+    def _get_value_matcher(self, node):
+        """Return the precompiled form of the <value> elements of entry `node`.
+
+        This is a tuple of the match type ("first" or "last") and a list with,
+        for each <value> element, its text and a list of (attribute name,
+        attribute value, compiled attribute regex) tuples. The attribute
+        regexes are only compiled once per entry instead of once per lookup.
+        """
+        matcher = self._value_matchers.get(node.xml_element)
+        if matcher is None:
+            values_node = self.get_optional_child("values", root=node)
+            if values_node is not None:
+                match_type = self.get(values_node, "match", default="first")
+            else:
+                match_type = "first"
+                values_node = node
+
+            candidates = []
+            for vnode in self.get_children("value", root=values_node):
+                conditions = []
+                for attribute, pattern in vnode.xml_element.attrib.items():
+                    try:
+                        regex = re.compile(pattern)
+                    except re.error:
+                        # reported by re.search if this value is ever matched
+                        regex = None
+                    conditions.append((attribute, pattern, regex))
+                candidates.append((self.text(vnode), conditions))
+
+            matcher = (match_type, candidates)
+            self._value_matchers[node.xml_element] = matcher
+
+        return matcher
+
+    def _get_value_match(
+        self, node, attributes=None, exact_match=False, replacement_for_none=None
+    ):
+        """Same as the `EntryID` version, using the precompiled value matcher."""
+        match_type, candidates = self._get_value_matcher(node)
+
+        max_score = -1
+        text = None
+        for candidate_text, conditions in candidates:
+            score = 0
+            if attributes:
+                for attribute, pattern, regex in conditions:
+                    # If some attribute is specified that we don't know about,
+                    # or the values don't match, it's not a match we want.
+                    if attribute not in attributes:
+                        score = -1
+                    elif exact_match:
+                        if attributes[attribute] != pattern:
+                            score = -1
+                    elif regex is None:
+                        if not re.search(pattern, attributes[attribute]):
+                            score = -1
+                    elif not regex.search(attributes[attribute]):
+                        score = -1
+                    if score < 0:
+                        break
+                    score += 1
+
+            # take the first or last best match in case of a tie
+            if score > max_score or (match_type == "last" and score == max_score >= 0):
+                max_score = score
+                text = candidate_text
+
+        if max_score < 0:
+            return None
+
+        expect(
+            match_type in ("first", "last"),
+            "match attribute can only have a value of 'last' or 'first', value is %s"
+            % match_type,
+        )
+        if text is None:
+            text = replacement_for_none
+        return text
+
     def get_per_stream_entries(self):
         entries = []
         nodes = self.get_children("entry")
@@ -381,7 +484,7 @@ class NamelistDefinition(EntryID):
         case insensitve match"""
 
         expect(
-            name in self._entry_ids,
+            name in self._nodes,
             (variable_template + " is not in the namelist definition.").format(
                 str(name)
             ),
@@ -389,7 +492,7 @@ class NamelistDefinition(EntryID):
 
     def _user_modifiable_in_variable_definition(self, name):
         # Is name user modifiable?
-        node = self.get_optional_child("entry", attributes={"id": name})
+        node = self._get_entry_node(name)
         user_modifiable_only_by_xml = self.get(node, "modify_via_xml")
         if user_modifiable_only_by_xml is not None:
             expect(
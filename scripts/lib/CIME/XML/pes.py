@@ -10,6 +10,9 @@ logger = logging.getLogger(__name__)
 
 
 class Pes(GenericXML):
+
+    DISK_CACHEABLE = True
+
     def __init__(self, infile, files=None):
         """
         initialize a files object given input pes specification file
@@ -27,13 +30,10 @@ class Pes(GenericXML):
         opes_pstrid = {}
         oother_settings = {}
         other_settings = {}
-        o_grid_nodes = []
         comments = None
         # Get any override nodes
-        overrides = self.get_optional_child("overrides")
         ocomments = None
-        if overrides is not None:
-            o_grid_nodes = self.get_children("grid", root=overrides)
+        if self.get_optional_child("overrides") is not None:
             (
                 opes_ntasks,
                 opes_nthrds,
@@ -41,17 +41,7 @@ class Pes(GenericXML):
                 opes_pstrid,
                 oother_settings,
                 ocomments,
-            ) = self._find_matches(
-                o_grid_nodes, grid, compset, machine, pesize_opts, True
-            )
-
-        # Get all the nodes
-        grid_nodes = self.get_children("grid")
-        if o_grid_nodes:
-            gn_set = set(grid_nodes)
-            ogn_set = set(o_grid_nodes)
-            gn_set.difference_update(ogn_set)
-            grid_nodes = list(gn_set)
+            ) = self._find_matches(grid, compset, machine, pesize_opts, True)
 
         (
             pes_ntasks,
@@ -60,7 +50,7 @@ class Pes(GenericXML):
             pes_pstrid,
             other_settings,
             comments,
-        ) = self._find_matches(grid_nodes, grid, compset, machine, pesize_opts, False)
+        ) = self._find_matches(grid, compset, machine, pesize_opts, False)
         pes_ntasks.update(opes_ntasks)
         pes_nthrds.update(opes_nthrds)
         pes_rootpe.update(opes_rootpe)
@@ -89,9 +79,76 @@ class Pes(GenericXML):
 
         return pes_ntasks, pes_nthrds, pes_rootpe, pes_pstrid, other_settings, comments
 
-    def _find_matches(
-        self, grid_nodes, grid, compset, machine, pesize_opts, override=False
-    ):
+    def _get_pes_table(self, override):
+        """
+        Return the grid nodes of the overrides (if override) or of the default
+        pe layouts as a list of (grid name, compiled grid regex, mach list),
+        where mach list is a list of (machine name, compiled machine regex,
+        pes list) and pes list a list of (pes node, pesize, compset, compiled
+        compset regex). A regex is None where its attribute is "any".
+        """
+
+        def compile_match(match):
+            return None if match == "any" else re.compile(match)
+
+        def build():
+            root = self.get_child("overrides") if override else None
+            table = []
+            for grid_node in self.get_children("grid", root=root):
+                mach_list = []
+                for mach_node in self.get_children("mach", root=grid_node):
+                    pes_list = []
+                    for pes_node in self.get_children("pes", root=mach_node):
+                        compset_match = self.get(pes_node, "compset")
+                        pes_list.append(
+                            (
+                                pes_node,
+                                self.get(pes_node, "pesize"),
+                                compset_match,
+                                compile_match(compset_match),
+                            )
+                        )
+                    mach_match = self.get(mach_node, "name")
+                    mach_list.append((mach_match, compile_match(mach_match), pes_list))
+                grid_match = self.get(grid_node, "name")
+                table.append((grid_match, compile_match(grid_match), mach_list))
+            return table
+
+        return self.get_lookup_index("overrides" if override else "pes", build)
+
+    def _get_pes_candidates(self, grid, compset, machine, pesize_opts, override):
+        """
+        Return (pes node, grid name, machine name, compset, pesize) for every
+        pes node matching the arguments, in file order.
+        """
+        candidates = self.get_lookup_index("candidates", dict)
+        key = (grid, compset, machine, pesize_opts, override)
+        if key not in candidates:
+            result = []
+            for grid_match, grid_re, mach_list in self._get_pes_table(override):
+                if grid_re is not None and not grid_re.search(grid):
+                    continue
+                for mach_match, mach_re, pes_list in mach_list:
+                    if mach_re is not None and not mach_re.search(machine):
+                        continue
+                    for pes_node, pesize_match, compset_match, compset_re in pes_list:
+                        if (
+                            pesize_match == "any"
+                            or (pesize_opts is not None and pesize_match == pesize_opts)
+                        ) and (compset_re is None or compset_re.search(compset)):
+                            result.append(
+                                (
+                                    pes_node,
+                                    grid_match,
+                                    mach_match,
+                                    compset_match,
+                                    pesize_match,
+                                )
+                            )
+            candidates[key] = result
+        return candidates[key]
+
+    def _find_matches(self, grid, compset, machine, pesize_opts, override=False):
         grid_choice = None
         mach_choice = None
         compset_choice = None
@@ -106,98 +163,71 @@ class Pes(GenericXML):
         )
         pe_select = None
         comment = None
-        for grid_node in grid_nodes:
-            grid_match = self.get(grid_node, "name")
-            if grid_match == "any" or re.search(grid_match, grid):
-                mach_nodes = self.get_children("mach", root=grid_node)
-                for mach_node in mach_nodes:
-                    mach_match = self.get(mach_node, "name")
-                    if mach_match == "any" or re.search(mach_match, machine):
-                        pes_nodes = self.get_children("pes", root=mach_node)
-                        for pes_node in pes_nodes:
-                            pesize_match = self.get(pes_node, "pesize")
-                            compset_match = self.get(pes_node, "compset")
-                            if (
-                                pesize_match == "any"
-                                or (
-                                    pesize_opts is not None
-                                    and pesize_match == pesize_opts
-                                )
-                            ) and (
-                                compset_match == "any"
-                                or re.search(compset_match, compset)
-                            ):
-
-                                points = (
-                                    int(grid_match != "any") * 3
-                                    + int(mach_match != "any") * 7
-                                    + int(compset_match != "any") * 2
-                                    + int(pesize_match != "any")
-                                )
-                                if override and points > 0:
-                                    for node in self.get_children(root=pes_node):
-                                        vid = self.name(node)
-                                        logger.info("vid is {}".format(vid))
-                                        if "comment" in vid:
-                                            comment = self.text(node)
-                                        elif "ntasks" in vid:
-                                            for child in self.get_children(root=node):
-                                                pes_ntasks[
-                                                    self.name(child).upper()
-                                                ] = int(self.text(child))
-                                        elif "nthrds" in vid:
-                                            for child in self.get_children(root=node):
-                                                pes_nthrds[
-                                                    self.name(child).upper()
-                                                ] = int(self.text(child))
-                                        elif "rootpe" in vid:
-                                            for child in self.get_children(root=node):
-                                                pes_rootpe[
-                                                    self.name(child).upper()
-                                                ] = int(self.text(child))
-                                        elif "pstrid" in vid:
-                                            for child in self.get_children(root=node):
-                                                pes_pstrid[
-                                                    self.name(child).upper()
-                                                ] = int(self.text(child))
-                                        # if the value is already upper case its something else we are trying to set
-                                        elif vid == self.name(node):
-                                            other_settings[vid] = self.text(node)
-
-                                else:
-                                    if points > max_points:
-                                        pe_select = pes_node
-                                        max_points = points
-                                        mach_choice = mach_match
-                                        grid_choice = grid_match
-                                        compset_choice = compset_match
-                                        pesize_choice = pesize_match
-                                    elif points == max_points:
-                                        logger.warning(
-                                            "mach_choice {} mach_match {}".format(
-                                                mach_choice, mach_match
-                                            )
-                                        )
-                                        logger.warning(
-                                            "grid_choice {} grid_match {}".format(
-                                                grid_choice, grid_match
-                                            )
-                                        )
-                                        logger.warning(
-                                            "compset_choice {} compset_match {}".format(
-                                                compset_choice, compset_match
-                                            )
-                                        )
-                                        logger.warning(
-                                            "pesize_choice {} pesize_match {}".format(
-                                                pesize_choice, pesize_match
-                                            )
-                                        )
-                                        logger.warning("points = {:d}".format(points))
-                                        expect(
-                                            False,
-                                            "More than one PE layout matches given PE specs",
-                                        )
+        for (
+            pes_node,
+            grid_match,
+            mach_match,
+            compset_match,
+            pesize_match,
+        ) in self._get_pes_candidates(grid, compset, machine, pesize_opts, override):
+            points = (
+                int(grid_match != "any") * 3
+                + int(mach_match != "any") * 7
+                + int(compset_match != "any") * 2
+                + int(pesize_match != "any")
+            )
+            if override and points > 0:
+                for node in self.get_children(root=pes_node):
+                    vid = self.name(node)
+                    logger.info("vid is {}".format(vid))
+                    if "comment" in vid:
+                        comment = self.text(node)
+                    elif "ntasks" in vid:
+                        for child in self.get_children(root=node):
+                            pes_ntasks[self.name(child).upper()] = int(self.text(child))
+                    elif "nthrds" in vid:
+                        for child in self.get_children(root=node):
+                            pes_nthrds[self.name(child).upper()] = int(self.text(child))
+                    elif "rootpe" in vid:
+                        for child in self.get_children(root=node):
+                            pes_rootpe[self.name(child).upper()] = int(self.text(child))
+                    elif "pstrid" in vid:
+                        for child in self.get_children(root=node):
+                            pes_pstrid[self.name(child).upper()] = int(self.text(child))
+                    # if the value is already upper case its something else we are trying to set
+                    elif vid == self.name(node):
+                        other_settings[vid] = self.text(node)
+
+            else:
+                if points > max_points:
+                    pe_select = pes_node
+                    max_points = points
+                    mach_choice = mach_match
+                    grid_choice = grid_match
+                    compset_choice = compset_match
+                    pesize_choice = pesize_match
+                elif points == max_points:
+                    logger.warning(
+                        "mach_choice {} mach_match {}".format(mach_choice, mach_match)
+                    )
+                    logger.warning(
+                        "grid_choice {} grid_match {}".format(grid_choice, grid_match)
+                    )
+                    logger.warning(
+                        "compset_choice {} compset_match {}".format(
+                            compset_choice, compset_match
+                        )
+                    )
+                    logger.warning(
+                        "pesize_choice {} pesize_match {}".format(
+                            pesize_choice, pesize_match
+                        )
+                    )
+                    logger.warning("points = {:d}".format(points))
+                    expect(
+                        False,
+                        "More than one PE layout matches given PE specs",
+                    )
         if not override:
             for node in self.get_children(root=pe_select):
                 vid = self.name(node)
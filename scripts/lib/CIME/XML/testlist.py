@@ -44,6 +44,9 @@ logger = logging.getLogger(__name__)
 
 
 class Testlist(GenericXML):
+
+    DISK_CACHEABLE = True
+
     def __init__(self, infile, files=None):
         """
         initialize an object
@@ -10,6 +10,9 @@ logger = logging.getLogger(__name__)
 
 
 class Tests(GenericXML):
+
+    DISK_CACHEABLE = True
+
     def __init__(self, infile=None, files=None):
         """
         initialize an object interface to file config_tests.xml
@@ -11,6 +11,9 @@ logger = logging.getLogger(__name__)
 
 
 class Workflow(GenericXML):
+
+    DISK_CACHEABLE = True
+
     def __init__(self, infile=None, files=None):
         """
         initialize an object
@@ -1,7 +1,8 @@
 """
 functions for building CIME models
 """
-import glob, shutil, time, threading, subprocess
+import glob, shutil, time, threading, subprocess, queue, functools
+import hashlib, json, tempfile
 from pathlib import Path
 from CIME.XML.standard_module_setup import *
 from CIME.utils import (
@@ -10,8 +11,8 @@ from CIME.utils import (
     stringify_bool,
     run_and_log_case_status,
     get_timestamp,
-    run_sub_or_cmd,
     run_cmd,
+    run_cmd_no_fail,
     get_batch_script_for_job,
     gzip_existing_file,
     safe_copy,
@@ -22,6 +23,7 @@ from CIME.utils import (
 from CIME.provenance import save_build_provenance as save_build_provenance_sub
 from CIME.locked_files import lock_file, unlock_file
 from CIME.XML.files import Files
+from CIME.nccompare import NATIVE_CPRNC
 
 logger = logging.getLogger(__name__)
 
@@ -216,6 +218,18 @@ def get_standard_makefile_args(case, shared_lib=False):
     return make_args
 
 
+def get_gmake_j(case):
+    """
+    Return the number of make jobs a build may use. When targets are built
+    concurrently each one is given its share of GMAKE_J through the
+    CIME_GMAKE_J environment variable.
+    """
+    if "CIME_GMAKE_J" in os.environ:
+        return int(os.environ["CIME_GMAKE_J"])
+
+    return case.get_value("GMAKE_J")
+
+
 def _get_compset_comps(case):
     comps = []
     driver = case.get_value("COMP_INTERFACE")
@@ -289,6 +303,128 @@ def uses_kokkos(case):
     )
 
 
+class _BuildScheduler(object):
+    """
+    Build targets concurrently in dependency order, dividing a budget of make
+    job slots between the targets that are being built at the same time.
+
+    >>> order = []
+    >>> scheduler = _BuildScheduler(4)
+    >>> scheduler.add_target("csm_share", lambda jobs: order.append(("csm_share", jobs)), deps=["pio", "mct"])
+    >>> scheduler.add_target("pio", lambda jobs: order.append(("pio", jobs)))
+    >>> scheduler.add_target("mct", lambda jobs: order.append(("mct", jobs)))
+    >>> _ = scheduler.run()
+    >>> sorted(order[:2]), order[2]
+    ([('mct', 2), ('pio', 2)], ('csm_share', 4))
+    """
+
+    def __init__(self, max_jobs):
+        self._max_jobs = max(1, max_jobs)
+        self._targets = {}  # name -> (func, deps, logfile, exclusive)
+
+    def add_target(self, name, func, deps=(), logfile=None, exclusive=False):
+        """
+        Add target name, built by calling func with the number of make jobs it
+        may use. Dependencies on targets that are never added are ignored.
+        Exclusive targets are built while no other target is being built.
+        """
+        self._targets[name] = (func, list(deps), logfile, exclusive)
+
+    def _run_target(self, name, jobs, results):
+        func, _, logfile, _ = self._targets[name]
+        t1 = time.time()
+        error = None
+        try:
+            func(jobs)
+        except Exception as e:  # pylint: disable=broad-except
+            error = str(e)
+
+        walltime = time.time() - t1
+        if logfile is not None and os.path.exists(logfile):
+            with open(logfile, "a") as fd:
+                fd.write(
+                    "\n{} built in {:f} seconds using {:d} make jobs\n".format(
+                        name, walltime, jobs
+                    )
+                )
+
+        results.put((name, walltime, error))
+
+    def run(self):
+        """
+        Build all targets, return a dict of target name to wall time. Raises
+        after all buildable targets have finished if any of them failed.
+        """
+        pending = [
+            (name, [dep for dep in deps if dep in self._targets])
+            for name, (_, deps, _, _) in self._targets.items()
+        ]
+        results = queue.Queue()
+        in_flight = {}  # name -> jobs
+        built = set()
+        errors = []
+        walltimes = {}
+        while pending or in_flight:
+            skipped = True
+            while skipped:
+                skipped = False
+                for name, deps in list(pending):
+                    if any(dep in walltimes and dep not in built for dep in deps):
+                        pending.remove((name, deps))
+                        walltimes[name] = 0.0
+                        errors.append(
+                            "BUILD FAIL: {} not built, a dependency failed".format(name)
+                        )
+                        skipped = True
+
+            ready = [item for item in pending if all(dep in built for dep in item[1])]
+            if any(self._targets[name][3] for name in in_flight):
+                ready = []
+            else:
+                shared = [item for item in ready if not self._targets[item[0]][3]]
+                ready = shared if shared or in_flight else ready[:1]
+            jobs_avail = self._max_jobs - sum(in_flight.values())
+            num_to_start = min(len(ready), jobs_avail)
+            for idx, item in enumerate(ready[:num_to_start]):
+                name = item[0]
+                jobs = jobs_avail // num_to_start
+                if idx < jobs_avail % num_to_start:
+                    jobs += 1
+                pending.remove(item)
+                in_flight[name] = jobs
+                logger.debug(
+                    "Starting build of {} with {:d} make jobs".format(name, jobs)
+                )
+                threading.Thread(
+                    target=self._run_target, args=(name, jobs, results)
+                ).start()
+
+            if not in_flight:
+                expect(
+                    not pending,
+                    "Circular build dependency between {}".format(
+                        ", ".join(item[0] for item in pending)
+                    ),
+                )
+                break
+
+            name, walltime, error = results.get()
+            jobs = in_flight.pop(name)
+            walltimes[name] = walltime
+            if error is None:
+                built.add(name)
+                logger.info(
+                    "{} built in {:f} seconds using {:d} make jobs".format(
+                        name, walltime, jobs
+                    )
+                )
+            else:
+                errors.append(error)
+
+        expect(not errors, "\n".join(errors))
+        return walltimes
+
+
 ###############################################################################
 def _build_model(
     build_threaded,
@@ -301,11 +437,13 @@ def _build_model(
     compiler,
     buildlist,
     comp_interface,
+    gmake_j,
 ):
     ###############################################################################
     logs = []
 
     thread_bad_results = []
+    scheduler = _BuildScheduler(gmake_j)
     for model, comp, nthrds, _, config_dir in complist:
         if buildlist is not None and model.lower() not in buildlist:
             continue
@@ -343,9 +481,10 @@ def _build_model(
         # build the component library
         # thread_bad_results captures error output from thread (expected to be empty)
         # logs is a list of log files to be compressed and added to the case logs/bld directory
-        t = threading.Thread(
-            target=_build_model_thread,
-            args=(
+        scheduler.add_target(
+            model,
+            functools.partial(
+                _build_model_thread,
                 config_dir,
                 model,
                 comp,
@@ -358,14 +497,13 @@ def _build_model(
                 smp,
                 compiler,
             ),
+            logfile=file_build,
         )
-        t.start()
 
         logs.append(file_build)
 
-    # Wait for threads to finish
-    while threading.active_count() > 1:
-        time.sleep(1)
+    # component libraries only depend on the sharedlibs, which are already built
+    scheduler.run()
 
     expect(not thread_bad_results, "\n".join(thread_bad_results))
 
@@ -689,6 +827,240 @@ ERROR env_build HAS CHANGED
     return sharedpath
 
 
+# Sharedlibs that a sharedlib needs to be built before it, any library not
+# listed here is built after all libraries that precede it in the build list
+_SHAREDLIB_DEPENDENCIES = {
+    "cprnc": [],
+    "mpi-serial": [],
+    "kokkos": [],
+    "gptl": ["mpi-serial"],
+    "mct": ["mpi-serial"],
+    "pio": ["mpi-serial", "gptl"],
+    "csm_share": ["mpi-serial", "gptl", "mct", "pio"],
+    "csm_share_cpl7": ["csm_share"],
+    "CDEPS": ["csm_share"],
+}
+
+
+# Sharedlibs that are always rebuilt: the pio build script updates the case,
+# the cprnc build leaves the executable in its build directory, the kokkos
+# install refers to the install path of the case and csm_share installs below
+# the cached directories, in $COMP_INTERFACE/$ESMFDIR/$NINST_VALUE
+_UNCACHED_SHAREDLIBS = ("pio", "cprnc", "kokkos", "csm_share", "csm_share_cpl7")
+
+# The subdirectories of the sharedlib install path that are cached. The build
+# directories are not, their Makefiles and dependency files refer to the case
+# that built them.
+_SHAREDLIB_CACHE_DIRS = ("lib", "include", "bin")
+
+# Case specific paths that do not affect the sharedlib build results
+_CASE_PATH_VARS = (
+    "CASEROOT",
+    "CASETOOLS",
+    "EXEROOT",
+    "INCROOT",
+    "LIBROOT",
+    "SHAREDLIBROOT",
+)
+
+
+def _get_git_state(repo):
+    """
+    Return a string identifying the HEAD and local changes of the git
+    repository repo, None if it is not one.
+    """
+    stat, head, _ = run_cmd("git rev-parse HEAD", from_dir=repo)
+    if stat != 0:
+        return None
+
+    stat, changes, _ = run_cmd("git status --porcelain && git diff HEAD", from_dir=repo)
+    if stat != 0:
+        return None
+
+    changes_hash = hashlib.sha256(changes.encode("utf-8"))
+
+    # git diff does not show the content of untracked files
+    stat, untracked, _ = run_cmd(
+        "git ls-files --others --exclude-standard", from_dir=repo
+    )
+    if stat != 0:
+        return None
+
+    for path in untracked.splitlines():
+        # nested repositories are listed as directories
+        if os.path.isfile(os.path.join(repo, path)):
+            with open(os.path.join(repo, path), "rb") as fd:
+                changes_hash.update(path.encode("utf-8") + b"\0" + fd.read())
+
+    return "{} {}".format(head, changes_hash.hexdigest())
+
+
+def _get_source_tree_state(srcroots, skip_dirs=()):
+    """
+    Return a dict identifying the version controlled state of srcroots and of
+    all the repositories below them, such as the externals checked out by
+    manage_externals that the parent repository ignores. Returns None if a
+    srcroot is not in a git repository or if it contains a checkout that is
+    not git, whose state cannot be determined. Directories in skip_dirs are
+    not searched.
+    """
+    srcroots = [os.path.realpath(srcroot) for srcroot in srcroots]
+    skip_dirs = set(os.path.realpath(skip_dir) for skip_dir in skip_dirs if skip_dir)
+    state = {}
+    for idx, srcroot in enumerate(srcroots):
+        # a root inside another one is searched with it
+        if srcroot in srcroots[:idx] or any(
+            srcroot.startswith(other + os.sep) for other in srcroots
+        ):
+            continue
+        state["{}:.".format(idx)] = _get_git_state(srcroot)
+        if state["{}:.".format(idx)] is None:
+            return None
+
+        for dirpath, dirnames, filenames in os.walk(srcroot):
+            if ".svn" in dirnames:
+                return None
+            if dirpath != srcroot and (".git" in dirnames or ".git" in filenames):
+                # relative paths so that identical source trees share entries
+                repo = "{}:{}".format(idx, os.path.relpath(dirpath, srcroot))
+                state[repo] = _get_git_state(dirpath)
+                if state[repo] is None:
+                    return None
+
+            dirnames[:] = [
+                dirname
+                for dirname in dirnames
+                if dirname != ".git" and os.path.join(dirpath, dirname) not in skip_dirs
+            ]
+
+    return state
+
+
+def _get_sharedlib_cache_base_key(case, caseroot):
+    """
+    Return the part of the sharedlib cache key that is the same for all of the
+    sharedlibs of case: the build settings, the compiler macros and machine
+    environment and the state of the source trees. Returns None if the
+    state of a source tree cannot be determined.
+    """
+    key = {
+        "CIME_MODEL": case.get_value("MODEL"),
+        "SMP": stringify_bool(case.get_build_threaded()),
+    }
+    for var in _CMD_ARGS_FOR_BUILD:
+        if var not in _CASE_PATH_VARS:
+            key[var] = str(case.get_value(var))
+
+    macro_files = [
+        os.path.join(caseroot, "Macros.make"),
+        os.path.join(caseroot, "Macros.cmake"),
+        os.path.join(caseroot, "env_mach_specific.xml"),
+    ]
+    macro_files.extend(sorted(glob.glob(os.path.join(caseroot, "cmake_macros", "*"))))
+    for macro_file in macro_files:
+        if os.path.isfile(macro_file):
+            with open(macro_file, "rb") as fd:
+                key[os.path.basename(macro_file)] = hashlib.sha256(
+                    fd.read()
+                ).hexdigest()
+
+    # The case directories may be inside the source tree
+    key["source state"] = _get_source_tree_state(
+        [case.get_value("SRCROOT"), case.get_value("CIMEROOT")],
+        skip_dirs=[caseroot] + [case.get_value(var) for var in _CASE_PATH_VARS],
+    )
+    if key["source state"] is None:
+        return None
+
+    return key
+
+
+def _get_sharedlib_cache_entry(cache_dir, base_key, lib, build_script):
+    with open(build_script, "rb") as fd:
+        script_hash = hashlib.sha256(fd.read()).hexdigest()
+
+    key = json.dumps([base_key, lib, script_hash], sort_keys=True)
+    return os.path.join(
+        cache_dir, "{}-{}".format(lib, hashlib.sha256(key.encode("utf-8")).hexdigest())
+    )
+
+
+def _get_dir_stamps(roots):
+    stamps = {}
+    for root in roots:
+        for dirpath, _, filenames in os.walk(root):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                stat = os.stat(path)
+                stamps[path] = (stat.st_mtime_ns, stat.st_size)
+
+    return stamps
+
+
+def _is_sharedlib_cached(cache_entry):
+    # an empty entry is never used
+    return os.path.isdir(cache_entry) and bool(os.listdir(cache_entry))
+
+
+def _is_clean_build_dir(full_lib_path):
+    """
+    Return True if nothing has been built in full_lib_path. The mpi-serial
+    build directory, which is inside the mct one, is not considered.
+    """
+    for dirpath, dirnames, filenames in os.walk(full_lib_path):
+        if filenames:
+            return False
+        if dirpath == full_lib_path and "mpi-serial" in dirnames:
+            dirnames.remove("mpi-serial")
+
+    return True
+
+
+def _get_sharedlib_cache_roots(installpath):
+    return [os.path.join(installpath, subdir) for subdir in _SHAREDLIB_CACHE_DIRS]
+
+
+def _store_sharedlib(cache_entry, installpath, stamps):
+    """
+    Store all files in the cached directories of installpath that are new or
+    changed since stamps were taken in cache_entry. Nothing is stored if there
+    are no such files.
+    """
+    cache_dir = os.path.dirname(cache_entry)
+    if not os.path.isdir(cache_dir):
+        os.makedirs(cache_dir)
+
+    tmp_entry = tempfile.mkdtemp(dir=cache_dir)
+    for path, stamp in _get_dir_stamps(_get_sharedlib_cache_roots(installpath)).items():
+        if stamps.get(path) != stamp:
+            dest = os.path.join(tmp_entry, os.path.relpath(path, installpath))
+            if not os.path.isdir(os.path.dirname(dest)):
+                os.makedirs(os.path.dirname(dest))
+            shutil.copy2(path, dest)
+
+    if not os.listdir(tmp_entry):
+        logger.debug("Not storing empty sharedlib cache entry {}".format(cache_entry))
+        shutil.rmtree(tmp_entry, ignore_errors=True)
+        return
+
+    try:
+        os.rename(tmp_entry, cache_entry)
+    except OSError:
+        # Another build stored the same entry first
+        shutil.rmtree(tmp_entry, ignore_errors=True)
+
+
+def _restore_sharedlib(cache_entry, installpath):
+    for dirpath, _, filenames in os.walk(cache_entry):
+        dest_dir = os.path.join(installpath, os.path.relpath(dirpath, cache_entry))
+        if not os.path.isdir(dest_dir):
+            os.makedirs(dest_dir)
+        for filename in filenames:
+            shutil.copy2(
+                os.path.join(dirpath, filename), os.path.join(dest_dir, filename)
+            )
+
+
 ###############################################################################
 def _build_libraries(
     case,
@@ -753,7 +1125,9 @@ def _build_libraries(
     if case.get_value("TEST"):
         cprnc_loc = case.get_value("CCSM_CPRNC")
         full_lib_path = os.path.join(sharedlibroot, compiler, "cprnc")
-        if not cprnc_loc or not os.path.exists(cprnc_loc):
+        if cprnc_loc != NATIVE_CPRNC and (
+            not cprnc_loc or not os.path.exists(cprnc_loc)
+        ):
             case.set_value("CCSM_CPRNC", os.path.join(full_lib_path, "cprnc"))
             if not os.path.isdir(full_lib_path):
                 os.makedirs(full_lib_path)
@@ -764,7 +1138,19 @@ def _build_libraries(
     # generate Makefile macro
     generate_makefile_macro(case, caseroot)
 
-    for lib in libs:
+    # Built sharedlibs are reused across cases if CIME_SHAREDLIB_CACHE is set
+    cache_dir = os.environ.get("CIME_SHAREDLIB_CACHE")
+    cache_base_key = None
+    if cache_dir:
+        cache_base_key = _get_sharedlib_cache_base_key(case, caseroot)
+        if cache_base_key is None:
+            logger.warning(
+                "Not using sharedlib cache, source tree state could not be determined"
+            )
+
+    scheduler = _BuildScheduler(case.get_value("GMAKE_J"))
+    thread_bad_results = []
+    for idx, lib in enumerate(libs):
         if buildlist is not None and lib not in buildlist:
             continue
 
@@ -793,23 +1179,33 @@ def _build_libraries(
             os.path.exists(my_file),
             "Build script {} for component {} not found.".format(my_file, lib),
         )
-        logger.info("Building {} with output to file {}".format(lib, file_build))
 
-        run_sub_or_cmd(
-            my_file,
-            [full_lib_path, os.path.join(exeroot, sharedpath), caseroot],
-            "buildlib",
-            [full_lib_path, os.path.join(exeroot, sharedpath), case],
+        cache_entry = None
+        if cache_base_key is not None and lib not in _UNCACHED_SHAREDLIBS:
+            cache_entry = _get_sharedlib_cache_entry(
+                cache_dir, cache_base_key, lib, my_file
+            )
+
+        # A sharedlib that will be stored in the cache is built on its own so
+        # that only its files are picked up
+        scheduler.add_target(
+            lib,
+            functools.partial(
+                _build_sharedlib,
+                lib,
+                my_file,
+                full_lib_path,
+                os.path.join(exeroot, sharedpath),
+                caseroot,
+                file_build,
+                compiler,
+                cache_entry,
+            ),
+            deps=_SHAREDLIB_DEPENDENCIES.get(lib, libs[:idx]),
             logfile=file_build,
+            exclusive=cache_entry is not None and not _is_sharedlib_cached(cache_entry),
         )
-
-        analyze_build_log(lib, file_build, compiler)
         logs.append(file_build)
-        if lib == "pio":
-            bldlog = open(file_build, "r")
-            for line in bldlog:
-                if re.search("Current setting for", line):
-                    logger.warning(line)
 
     # clm not a shared lib for E3SM
     if get_model() != "e3sm" and (buildlist is None or "lnd" in buildlist):
@@ -834,27 +1230,88 @@ def _build_libraries(
             smp = "SMP" in os.environ and os.environ["SMP"] == "TRUE"
             # thread_bad_results captures error output from thread (expected to be empty)
             # logs is a list of log files to be compressed and added to the case logs/bld directory
-            thread_bad_results = []
-            _build_model_thread(
-                config_lnd_dir,
+            scheduler.add_target(
                 "lnd",
-                comp_lnd,
-                caseroot,
-                libroot,
-                bldroot,
-                incroot,
-                file_build,
-                thread_bad_results,
-                smp,
-                compiler,
+                functools.partial(
+                    _build_model_thread,
+                    config_lnd_dir,
+                    "lnd",
+                    comp_lnd,
+                    caseroot,
+                    libroot,
+                    bldroot,
+                    incroot,
+                    file_build,
+                    thread_bad_results,
+                    smp,
+                    compiler,
+                ),
+                deps=libs,
+                logfile=file_build,
             )
             logs.append(file_build)
-            expect(not thread_bad_results, "\n".join(thread_bad_results))
 
-    case.flush()  # python sharedlib subs may have made XML modifications
+    # The sharedlib builds run as separate processes and may modify the case
+    case.flush()
+    try:
+        scheduler.run()
+    finally:
+        case.read_xml()
+
+    expect(not thread_bad_results, "\n".join(thread_bad_results))
+
     return logs
 
 
+###############################################################################
+def _build_sharedlib(
+    lib,
+    build_script,
+    full_lib_path,
+    installpath,
+    caseroot,
+    file_build,
+    compiler,
+    cache_entry,
+    gmake_j,
+):
+    ###############################################################################
+    if cache_entry is not None and _is_sharedlib_cached(cache_entry):
+        logger.info("Restoring {} from sharedlib cache {}".format(lib, cache_entry))
+        _restore_sharedlib(cache_entry, installpath)
+        with open(file_build, "w") as fd:
+            fd.write("{} restored from sharedlib cache {}\n".format(lib, cache_entry))
+        return
+
+    # An incremental build may not install all the files of the library, e.g.
+    # copyifnewer skips unchanged modules, only a full build is stored
+    store = cache_entry is not None and _is_clean_build_dir(full_lib_path)
+    if store:
+        stamps = _get_dir_stamps(_get_sharedlib_cache_roots(installpath))
+
+    logger.info("Building {} with output to file {}".format(lib, file_build))
+    with open(file_build, "w") as fd:
+        stat = run_cmd(
+            "CIME_GMAKE_J={:d} {} {} {} {}".format(
+                gmake_j, build_script, full_lib_path, installpath, caseroot
+            ),
+            arg_stdout=fd,
+            arg_stderr=subprocess.STDOUT,
+        )[0]
+
+    analyze_build_log(lib, file_build, compiler)
+    expect(stat == 0, "BUILD FAIL: {} failed, cat {}".format(build_script, file_build))
+
+    if lib == "pio":
+        with open(file_build, "r") as bldlog:
+            for line in bldlog:
+                if re.search("Current setting for", line):
+                    logger.warning(line)
+
+    if store:
+        _store_sharedlib(cache_entry, installpath, stamps)
+
+
 ###############################################################################
 def _build_model_thread(
     config_dir,
@@ -868,10 +1325,10 @@ def _build_model_thread(
     thread_bad_results,
     smp,
     compiler,
+    gmake_j=None,
 ):
     ###############################################################################
     logger.info("Building {} with output to {}".format(compclass, file_build))
-    t1 = time.time()
     cmd = os.path.join(caseroot, "SourceMods", "src." + compname, "buildlib")
     if os.path.isfile(cmd):
         logger.warning("WARNING: using local buildlib script for {}".format(compname))
@@ -889,6 +1346,8 @@ def _build_model_thread(
     )
     if get_model() != "ufs":
         compile_cmd = "SMP={} {}".format(stringify_bool(smp), compile_cmd)
+    if gmake_j is not None:
+        compile_cmd = "CIME_GMAKE_J={:d} {}".format(gmake_j, compile_cmd)
 
     if is_python_executable(cmd):
         logging_options = get_logging_options()
@@ -910,9 +1369,6 @@ def _build_model_thread(
     for mod_file in glob.glob(os.path.join(bldroot, "*_[Cc][Oo][Mm][Pp]_*.mod")):
         safe_copy(mod_file, incroot)
 
-    t2 = time.time()
-    logger.info("{} built in {:f} seconds".format(compname, (t2 - t1)))
-
 
 ###############################################################################
 def _create_build_metadata_for_component(config_dir, libroot, bldroot, case):
@@ -1205,6 +1661,7 @@ def _case_build_impl(
                     compiler,
                     buildlist,
                     comp_interface,
+                    case.get_value("GMAKE_J"),
                 )
             )
 
@@ -10,7 +10,7 @@ from CIME.utils import (
     get_model,
     safe_copy,
 )
-from CIME.build import get_standard_makefile_args
+from CIME.build import get_standard_makefile_args, get_gmake_j
 from CIME.XML.files import Files
 
 import sys, os, argparse
@@ -93,7 +93,7 @@ def run_gmake(case, compclass, compname, libroot, bldroot, libname="", user_cppd
     ###############################################################################
     gmake_args = get_standard_makefile_args(case)
 
-    gmake_j = case.get_value("GMAKE_J")
+    gmake_j = get_gmake_j(case)
     gmake = case.get_value("GMAKE")
 
     complib = ""
@@ -6,7 +6,7 @@ All interaction with and between the module files in XML/ takes place
 through the Case module.
 """
 from copy import deepcopy
-import glob, os, shutil, math, six, time, hashlib, socket, getpass
+import glob, os, shutil, math, six, time, hashlib, socket, getpass, json, tempfile
 from CIME.XML.standard_module_setup import *
 
 # pylint: disable=import-error,redefined-builtin
@@ -42,6 +42,90 @@ from CIME.aprun import get_aprun_cmd_for_case
 
 logger = logging.getLogger(__name__)
 
+# variable references in values, as resolved by GenericXML.get_resolved_value
+_REFERENCE_VAR_RE = re.compile(r"\${?(\w+)}?")
+
+# attributes set by Case.initialize_derived_attributes
+_DERIVED_ATTRIBUTES = (
+    "thread_count",
+    "total_tasks",
+    "tasks_per_node",
+    "ngpus_per_node",
+    "num_nodes",
+    "spare_nodes",
+    "tasks_per_numa",
+    "cores_per_task",
+    "srun_binding",
+    "async_io",
+    "iotasks",
+)
+
+
+class _LazyEnvFile(object):
+    """
+    Stands in for an env file object of a case and creates it, reading the
+    file, the first time one of its attributes is used.
+
+    lazy_names is the set of entry ids and element names in the file, or None
+    if they are not known. See Case._get_env_files.
+    """
+
+    def __init__(self, filename, load, names=None):
+        object.__setattr__(self, "lazy_filename", filename)
+        object.__setattr__(self, "lazy_load", load)
+        object.__setattr__(self, "lazy_names", names)
+        object.__setattr__(self, "lazy_obj", None)
+
+    def get_lazy_obj(self):
+        if self.lazy_obj is None:
+            object.__setattr__(self, "lazy_obj", self.lazy_load())
+            object.__setattr__(self, "lazy_load", None)
+        return self.lazy_obj
+
+    def __getattr__(self, name):
+        if name.startswith("lazy_"):
+            raise AttributeError(name)
+        return getattr(self.get_lazy_obj(), name)
+
+    def __setattr__(self, name, value):
+        setattr(self.get_lazy_obj(), name, value)
+
+    def __delattr__(self, name):
+        delattr(self.get_lazy_obj(), name)
+
+    def __iter__(self):
+        return iter(self.get_lazy_obj())
+
+    def __deepcopy__(self, memo):
+        return deepcopy(self.get_lazy_obj(), memo)
+
+
+def _is_loaded(env_file):
+    return not isinstance(env_file, _LazyEnvFile) or env_file.lazy_obj is not None
+
+
+def _get_filename(env_file):
+    if _is_loaded(env_file):
+        return env_file.filename
+    return env_file.lazy_filename
+
+
+def _get_file_stamp(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def _get_env_names(env_file):
+    names = set()
+    for elem in env_file.root.xml_element.iter():
+        names.add(elem.tag)
+        if "id" in elem.attrib:
+            names.add(elem.attrib["id"])
+    return names
+
 
 class Case(object):
     """
@@ -72,6 +156,12 @@ class Case(object):
     are listed in the following imports
     """
 
+    # Env files other than env_case.xml are only read when first needed. The
+    # names defined in each file are kept in ENV_NAMES_FILE in the case
+    # directory so that lookups can skip files that cannot define a variable.
+    DISABLE_LAZY_ENV_FILES = "CIME_NO_LAZY_ENV_FILES" in os.environ
+    ENV_NAMES_FILE = ".env_names.json"
+
     from CIME.case.case_setup import case_setup
     from CIME.case.case_clone import create_clone, _copy_user_modified_to_clone
     from CIME.case.case_test import case_test
@@ -119,6 +209,9 @@ class Case(object):
         self._env_generic_files = []
         self._files = []
         self._comp_interface = None
+        self._lookup_components = []
+        self._env_names = {}
+        self._reset_resolved_cache()
 
         self.read_xml()
 
@@ -147,7 +240,24 @@ class Case(object):
         # these are user_mods as defined in the compset
         # Command Line user_mods are handled seperately
 
-        # Derived attributes
+        # check if case has been configured and if so initialize derived
+        # attributes when one of them is first used
+        self._derived_attributes_pending = self.get_value("CASEROOT") is not None
+        if not self._derived_attributes_pending:
+            self._set_derived_attribute_defaults()
+
+    def __getattr__(self, name):
+        if name in _DERIVED_ATTRIBUTES and self.__dict__.get(
+            "_derived_attributes_pending"
+        ):
+            self.initialize_derived_attributes()
+            if name in self.__dict__:
+                return self.__dict__[name]
+        raise AttributeError(
+            "'{}' object has no attribute '{}'".format(type(self).__name__, name)
+        )
+
+    def _set_derived_attribute_defaults(self):
         self.thread_count = None
         self.total_tasks = None
         self.tasks_per_node = None
@@ -160,9 +270,18 @@ class Case(object):
         self.async_io = False
         self.iotasks = 0
 
-        # check if case has been configured and if so initialize derived
-        if self.get_value("CASEROOT") is not None:
-            self.initialize_derived_attributes()
+    @property
+    def _comp_interface(self):
+        # read from env_build.xml on first use, see read_xml
+        if self._comp_interface_file is not None:
+            env_build, self._comp_interface_file = self._comp_interface_file, None
+            self._comp_interface_value = env_build.get_value("COMP_INTERFACE")
+        return self._comp_interface_value
+
+    @_comp_interface.setter
+    def _comp_interface(self, value):
+        self._comp_interface_file = None
+        self._comp_interface_value = value
 
     def check_if_comp_var(self, vid):
         for env_file in self._env_entryid_files:
@@ -177,6 +296,10 @@ class Case(object):
         These are derived variables which can be used in the config_* files
         for variable substitution using the {{ var }} syntax
         """
+        if self._derived_attributes_pending:
+            self._derived_attributes_pending = False
+            self._set_derived_attribute_defaults()
+
         set_model(self.get_value("MODEL"))
         env_mach_pes = self.get_env("mach_pes")
         env_mach_spec = self.get_env("mach_specific")
@@ -259,62 +382,164 @@ class Case(object):
     def read_xml(self):
         for env_file in self._files:
             expect(
-                not env_file.needsrewrite,
+                not _is_loaded(env_file) or not env_file.needsrewrite,
                 "Potential loss of unflushed changes in {}".format(env_file.filename),
             )
 
+        caseroot = self._caseroot
+        read_only = self._force_read_only
+        self._env_names = self._read_env_names()
+
         self._env_entryid_files = []
         self._env_entryid_files.append(
-            EnvCase(self._caseroot, components=None, read_only=self._force_read_only)
+            EnvCase(caseroot, components=None, read_only=read_only)
         )
         components = self._env_entryid_files[0].get_values("COMP_CLASSES")
+        self._lookup_components = components
         self._env_entryid_files.append(
-            EnvRun(
-                self._caseroot, components=components, read_only=self._force_read_only
+            self._lazy_env_file(
+                "env_run.xml",
+                lambda: EnvRun(caseroot, components=components, read_only=read_only),
             )
         )
         self._env_entryid_files.append(
-            EnvBuild(
-                self._caseroot, components=components, read_only=self._force_read_only
+            self._lazy_env_file(
+                "env_build.xml",
+                lambda: EnvBuild(caseroot, components=components, read_only=read_only),
             )
         )
-        self._comp_interface = self._env_entryid_files[-1].get_value("COMP_INTERFACE")
+        self._comp_interface = None
+        self._comp_interface_file = self._env_entryid_files[-1]
 
         self._env_entryid_files.append(
-            EnvMachPes(
-                self._caseroot,
-                components=components,
-                read_only=self._force_read_only,
-                comp_interface=self._comp_interface,
+            self._lazy_env_file(
+                "env_mach_pes.xml",
+                lambda: EnvMachPes(
+                    caseroot,
+                    components=components,
+                    read_only=read_only,
+                    comp_interface=self._comp_interface,
+                ),
             )
         )
         self._env_entryid_files.append(
-            EnvBatch(self._caseroot, read_only=self._force_read_only)
+            self._lazy_env_file(
+                "env_batch.xml", lambda: EnvBatch(caseroot, read_only=read_only)
+            )
         )
         self._env_entryid_files.append(
-            EnvWorkflow(self._caseroot, read_only=self._force_read_only)
+            self._lazy_env_file(
+                "env_workflow.xml", lambda: EnvWorkflow(caseroot, read_only=read_only)
+            )
         )
 
-        if os.path.isfile(os.path.join(self._caseroot, "env_test.xml")):
+        if os.path.isfile(os.path.join(caseroot, "env_test.xml")):
             self._env_entryid_files.append(
-                EnvTest(
-                    self._caseroot,
-                    components=components,
-                    read_only=self._force_read_only,
+                self._lazy_env_file(
+                    "env_test.xml",
+                    lambda: EnvTest(
+                        caseroot, components=components, read_only=read_only
+                    ),
                 )
             )
         self._env_generic_files = []
         self._env_generic_files.append(
-            EnvMachSpecific(
-                self._caseroot,
-                read_only=self._force_read_only,
-                comp_interface=self._comp_interface,
+            self._lazy_env_file(
+                "env_mach_specific.xml",
+                lambda: EnvMachSpecific(
+                    caseroot,
+                    read_only=read_only,
+                    comp_interface=self._comp_interface,
+                ),
             )
         )
         self._env_generic_files.append(
-            EnvArchive(self._caseroot, read_only=self._force_read_only)
+            self._lazy_env_file(
+                "env_archive.xml", lambda: EnvArchive(caseroot, read_only=read_only)
+            )
         )
         self._files = self._env_entryid_files + self._env_generic_files
+        self._reset_resolved_cache()
+
+    def _lazy_env_file(self, basename, load):
+        """
+        Returns a _LazyEnvFile for env file basename of the case that calls
+        load to create the env object. The names defined in the file are
+        added to ENV_NAMES_FILE when it is read.
+        """
+        path = os.path.join(self._caseroot, basename)
+        if self.DISABLE_LAZY_ENV_FILES or not os.path.isfile(path):
+            return load()
+
+        def load_and_record_names():
+            stamp = _get_file_stamp(path)
+            env_file = load()
+            entry = self._env_names.get(basename)
+            if stamp is not None and (entry is None or entry["stamp"] != stamp):
+                self._env_names[basename] = {
+                    "stamp": stamp,
+                    "names": sorted(_get_env_names(env_file)),
+                }
+                self._write_env_names()
+            return env_file
+
+        entry = self._env_names.get(basename)
+        names = None
+        if entry is not None and entry["stamp"] == _get_file_stamp(path):
+            names = set(entry["names"])
+        return _LazyEnvFile(path, load_and_record_names, names=names)
+
+    def _read_env_names(self):
+        path = os.path.join(self._caseroot, self.ENV_NAMES_FILE)
+        try:
+            with open(path) as fd:
+                env_names = json.load(fd)
+        except (OSError, ValueError):
+            return {}
+
+        return env_names if isinstance(env_names, dict) else {}
+
+    def _write_env_names(self):
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self._caseroot, suffix=".tmp")
+            with os.fdopen(fd, "w") as env_names_fd:
+                json.dump(self._env_names, env_names_fd)
+            os.replace(tmp_path, os.path.join(self._caseroot, self.ENV_NAMES_FILE))
+        except OSError as e:
+            logger.debug("Could not write {}: {}".format(self.ENV_NAMES_FILE, e))
+
+    def _get_lookup_keys(self, item):
+        """
+        Returns the names an env file has to define to answer a query for
+        variable item: item itself and item without a component suffix or
+        prefix, following EnvBase.check_if_comp_var.
+        """
+        keys = {item}
+        for comp in self._lookup_components:
+            if item.endswith("_" + comp):
+                keys.add(item.replace("_" + comp, "", 1))
+            elif item.startswith(comp + "_"):
+                keys.add(item.replace(comp + "_", "", 1))
+            elif "_" + comp + "_" in item:
+                keys.add(item.replace(comp + "_", "", 1))
+        # EnvMachPes derives NINST_MAX and missing NINST_<comp> from NINST
+        if item.startswith("NINST"):
+            keys.add("NINST")
+        return keys
+
+    def _get_env_files(self, env_files, item):
+        """
+        Yields the objects of env_files in order, skipping the files that are
+        not read yet and do not define any of the lookup keys of item.
+        """
+        keys = None
+        for env_file in env_files:
+            if not _is_loaded(env_file) and env_file.lazy_names is not None:
+                if keys is None:
+                    keys = self._get_lookup_keys(item)
+                if keys.isdisjoint(env_file.lazy_names):
+                    continue
+            yield env_file
 
     def get_case_root(self):
         """Returns the root directory for this case."""
@@ -323,7 +548,7 @@ class Case(object):
     def get_env(self, short_name, allow_missing=False):
         full_name = "env_{}.xml".format(short_name)
         for env_file in self._files:
-            if os.path.basename(env_file.filename) == full_name:
+            if os.path.basename(_get_filename(env_file)) == full_name:
                 return env_file
         if allow_missing:
             return None
@@ -335,7 +560,8 @@ class Case(object):
             env_file.check_timestamp()
         else:
             for env_file in self._files:
-                env_file.check_timestamp()
+                if _is_loaded(env_file):
+                    env_file.check_timestamp()
 
     def copy(self, newcasename, newcaseroot, newcimeroot=None, newsrcroot=None):
         newcase = deepcopy(self)
@@ -369,10 +595,12 @@ class Case(object):
             return
 
         for env_file in self._files:
-            env_file.write(force_write=flushall)
+            # files that were never read have nothing to write
+            if _is_loaded(env_file):
+                env_file.write(force_write=flushall)
 
     def get_values(self, item, attribute=None, resolved=True, subgroup=None):
-        for env_file in self._files:
+        for env_file in self._get_env_files(self._files, item):
             # Wait and resolve in self rather than in env_file
             results = env_file.get_values(
                 item, attribute, resolved=False, subgroup=subgroup
@@ -402,7 +630,7 @@ class Case(object):
 
     def get_value(self, item, attribute=None, resolved=True, subgroup=None):
         result = None
-        for env_file in self._files:
+        for env_file in self._get_env_files(self._files, item):
             # Wait and resolve in self rather than in env_file
             result = env_file.get_value(
                 item, attribute, resolved=False, subgroup=subgroup
@@ -470,7 +698,7 @@ class Case(object):
 
     def get_type_info(self, item):
         result = None
-        for env_file in self._env_entryid_files:
+        for env_file in self._get_env_files(self._env_entryid_files, item):
             result = env_file.get_type_info(item)
             if result is not None:
                 return result
@@ -478,24 +706,125 @@ class Case(object):
         return result
 
     def get_resolved_value(self, item, recurse=0, allow_unresolved_envvars=False):
+        num_unresolved = item.count("$") if item else 0
+        if num_unresolved == 0 or recurse > 0:
+            return self._get_resolved_value(
+                item, recurse=recurse, allow_unresolved_envvars=allow_unresolved_envvars
+            )
+
+        self._check_resolved_cache()
+        key = (item, allow_unresolved_envvars)
+        if key in self._resolved_cache:
+            value, env_values = self._resolved_cache[key]
+            if all(os.environ.get(var) == val for var, val in env_values.items()):
+                return value
+
+        dependencies = set()
+        value = self._get_resolved_value(
+            item,
+            allow_unresolved_envvars=allow_unresolved_envvars,
+            dependencies=dependencies,
+        )
+
+        env_values = {}
+        for dependency in dependencies:
+            if dependency.startswith("$ENV{"):
+                env_var = dependency[5:-1]
+                env_values[env_var] = os.environ.get(env_var)
+            else:
+                base_vid = self._get_resolved_base_vid(dependency)
+                self._resolved_dependents.setdefault(base_vid, set()).add(key)
+
+        self._resolved_cache[key] = (value, env_values)
+
+        return value
+
+    def _get_resolved_value(
+        self, item, recurse=0, allow_unresolved_envvars=False, dependencies=None
+    ):
         num_unresolved = item.count("$") if item else 0
         recurse_limit = 10
         if num_unresolved > 0 and recurse < recurse_limit:
             for env_file in self._env_entryid_files:
+                if not _is_loaded(env_file) and env_file.lazy_names is not None:
+                    if all(
+                        self._get_lookup_keys(var).isdisjoint(env_file.lazy_names)
+                        for var in _REFERENCE_VAR_RE.findall(item)
+                    ):
+                        continue
                 item = env_file.get_resolved_value(
-                    item, allow_unresolved_envvars=allow_unresolved_envvars
+                    item,
+                    allow_unresolved_envvars=allow_unresolved_envvars,
+                    dependencies=dependencies,
                 )
             if "$" not in item:
                 return item
             else:
-                item = self.get_resolved_value(
+                item = self._get_resolved_value(
                     item,
                     recurse=recurse + 1,
                     allow_unresolved_envvars=allow_unresolved_envvars,
+                    dependencies=dependencies,
                 )
 
         return item
 
+    def _get_resolved_base_vid(self, vid):
+        """
+        Variables are tracked by their name without component suffix so
+        that setting NTASKS invalidates values referencing NTASKS_ATM.
+        """
+        if vid not in self._resolved_base_vids:
+            base_vid = vid
+            # Only files that are read can be changed. The cache is reset
+            # whenever another file is read, see _get_resolved_cache_state.
+            for env_file in self._env_entryid_files:
+                if _is_loaded(env_file):
+                    new_vid, _, iscompvar = env_file.check_if_comp_var(vid)
+                    if iscompvar:
+                        base_vid = new_vid
+                        break
+            self._resolved_base_vids[vid] = base_vid
+        return self._resolved_base_vids[vid]
+
+    def _get_resolved_cache_state(self):
+        return tuple(
+            (id(env_file), env_file.change_count if _is_loaded(env_file) else None)
+            for env_file in self._env_entryid_files
+        )
+
+    def _reset_resolved_cache(self):
+        # (raw value, allow_unresolved_envvars) -> (resolved value, env var values)
+        self._resolved_cache = {}
+        # variable name -> keys of cached values that reference it
+        self._resolved_dependents = {}
+        self._resolved_base_vids = {}
+        self._resolved_cache_state = self._get_resolved_cache_state()
+
+    def _check_resolved_cache(self):
+        """
+        Drop all resolved values if the env files were changed without
+        going through set_value, e.g. by calling methods on an env object or
+        through another Case of the same caseroot, which shares the parsed
+        env files.
+        """
+        if self._resolved_cache_state != self._get_resolved_cache_state():
+            self._reset_resolved_cache()
+
+    def _invalidate_resolved_value(self, item):
+        state = self._get_resolved_cache_state()
+        if [(i, count is None) for i, count in state] != [
+            (i, count is None) for i, count in self._resolved_cache_state
+        ]:
+            # an env file was read while setting item
+            self._reset_resolved_cache()
+            return
+
+        base_vid = self._get_resolved_base_vid(item)
+        for key in self._resolved_dependents.pop(base_vid, ()):
+            self._resolved_cache.pop(key, None)
+        self._resolved_cache_state = self._get_resolved_cache_state()
+
     def set_value(
         self,
         item,
@@ -521,10 +850,12 @@ class Case(object):
             self._caseroot = value
         result = None
 
-        for env_file in self._files:
+        self._check_resolved_cache()
+        for env_file in self._get_env_files(self._files, item):
             result = env_file.set_value(item, value, subgroup, ignore_type)
             if result is not None:
                 logger.debug("Will rewrite file {} {}".format(env_file.filename, item))
+                self._invalidate_resolved_value(item)
                 return (result, env_file.filename) if return_file else result
 
         if len(self._files) == 1:
@@ -549,10 +880,12 @@ class Case(object):
         )
 
         result = None
-        for env_file in self._env_entryid_files:
+        self._check_resolved_cache()
+        for env_file in self._get_env_files(self._env_entryid_files, item):
             result = env_file.set_valid_values(item, valid_values)
             if result is not None:
                 logger.debug("Will rewrite file {} {}".format(env_file.filename, item))
+                self._invalidate_resolved_value(item)
                 return result
 
     def set_lookup_value(self, item, value):
@@ -2098,7 +2431,7 @@ directory, NOT in this subdirectory."""
         components = self.get_value("COMP_CLASSES")
         new_env_file = None
         for env_file in self._files:
-            if os.path.basename(env_file.filename) == ftype:
+            if os.path.basename(_get_filename(env_file)) == ftype:
                 if ftype == "env_run.xml":
                     new_env_file = EnvRun(infile=xmlfile, components=components)
                 elif ftype == "env_build.xml":
@@ -2140,6 +2473,7 @@ directory, NOT in this subdirectory."""
             new_env_file is not None, "No match found for file type {}".format(ftype)
         )
         self._files = [new_env_file]
+        self._reset_resolved_cache()
 
     def update_env(self, new_object, env_file, blow_away=False):
         """
@@ -2161,6 +2495,7 @@ directory, NOT in this subdirectory."""
             self._env_generic_files.append(new_object)
         self._files.remove(old_object)
         self._files.append(new_object)
+        self._reset_resolved_cache()
 
     def get_latest_cpl_log(self, coupler_log_path=None, cplname="cpl"):
         """
@@ -8,6 +8,7 @@ import os
 from CIME.XML.standard_module_setup import *
 
 from CIME.XML.machines import Machines
+from CIME.XML.env_mach_specific import ENV_CACHE_FILENAME
 from CIME.BuildTools.configure import (
     configure,
     generate_env_mach_specific,
@@ -306,6 +307,7 @@ def _case_setup_impl(
             "Macros.make",
             "Macros.cmake",
             "cmake_macros",
+            ENV_CACHE_FILENAME,
         ]
         for file_to_clean in files_to_clean:
             if os.path.exists(file_to_clean) and not (keep and file_to_clean in keep):
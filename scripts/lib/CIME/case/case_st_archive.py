@@ -4,7 +4,7 @@ case_st_archive, restore_from_archive, archive_last_restarts
 are members of class Case from file case.py
 """
 
-import shutil, glob, re, os
+import shutil, glob, re, os, errno, fnmatch, time
 
 from CIME.XML.standard_module_setup import *
 from CIME.utils import (
@@ -17,11 +17,16 @@ from CIME.utils import (
 from CIME.utils import batch_jobid
 from CIME.date import get_file_date
 from CIME.XML.archive import Archive
+from CIME.XML.archive_base import RunDirIndex
 from CIME.XML.files import Files
 from os.path import isdir, join
+from multiprocessing.dummy import Pool as ThreadPool
 
 logger = logging.getLogger(__name__)
 
+# Threads copying files to the archive, moves within a filesystem are renames
+ARCHIVE_THREADS = 8
+
 ###############################################################################
 def _get_archive_fn_desc(archive_fn):
     ###############################################################################
@@ -37,8 +42,89 @@ def _get_archive_file_fn(copy_only):
     return safe_copy if copy_only else shutil.move
 
 
+class _ArchivePlan(object):
+    """
+    The files to archive from a run directory. The archiving functions add
+    files to the plan as they go, using rundir_index to find them, and the
+    files are archived all at once by run.
+    """
+
+    def __init__(self, rundir):
+        self.rundir_index = RunDirIndex(rundir)
+        self._copies = []  # (srcfile, destfile)
+        self._moves = []  # (srcfile, destfile)
+
+    def add(self, srcfile, destfile, archive_fn):
+        """
+        Archive srcfile to destfile with archive_fn, shutil.move or safe_copy.
+        A moved file is removed from rundir_index right away.
+        """
+        if archive_fn is shutil.move:
+            self._moves.append((srcfile, destfile))
+            if os.path.dirname(srcfile) == self.rundir_index.from_dir:
+                self.rundir_index.remove(os.path.basename(srcfile))
+        else:
+            self._copies.append((srcfile, destfile))
+
+    def run(self):
+        """
+        Copy, then move, the files of the plan. Moves within a filesystem are
+        renames, copies and moves to another filesystem are done by
+        ARCHIVE_THREADS threads.
+        """
+        start_time = time.time()
+        num_bytes = sum(os.path.getsize(srcfile) for srcfile, _ in self._copies)
+        # Files that are copied may also be moved, so copy first
+        _run_in_pool(safe_copy, self._copies)
+
+        dest_devs = {}
+        slow_moves = []
+        num_renames = 0
+        for srcfile, destfile in self._moves:
+            src_stat = os.stat(srcfile)
+            num_bytes += src_stat.st_size
+            destdir = os.path.dirname(destfile)
+            if destdir not in dest_devs:
+                dest_devs[destdir] = os.stat(destdir).st_dev
+            if src_stat.st_dev == dest_devs[destdir]:
+                try:
+                    os.rename(srcfile, destfile)
+                    num_renames += 1
+                    continue
+                except OSError as e:
+                    if e.errno != errno.EXDEV:
+                        raise
+            slow_moves.append((srcfile, destfile))
+        _run_in_pool(shutil.move, slow_moves)
+
+        num_files = len(self._copies) + len(self._moves)
+        logger.info(
+            "Archived {:d} files ({:d} renamed), {:d} bytes in {:.1f} seconds".format(
+                num_files, num_renames, num_bytes, time.time() - start_time
+            )
+        )
+        self._copies = []
+        self._moves = []
+
+
+def _run_in_pool(function, args_list):
+    """
+    Call function with each args of args_list, using up to ARCHIVE_THREADS threads
+    """
+    if len(args_list) <= 1:
+        for args in args_list:
+            function(*args)
+    else:
+        pool = ThreadPool(min(ARCHIVE_THREADS, len(args_list)))
+        try:
+            pool.starmap(function, args_list)
+        finally:
+            pool.close()
+            pool.join()
+
+
 ###############################################################################
-def _get_datenames(casename, rundir):
+def _get_datenames(casename, rundir, rundir_index=None):
     ###############################################################################
     """
     Returns the date objects specifying the times of each file
@@ -46,10 +132,12 @@ def _get_datenames(casename, rundir):
     Not doc-testable due to filesystem dependence
     """
     expect(isdir(rundir), "Cannot open directory {} ".format(rundir))
+    if rundir_index is None:
+        rundir_index = RunDirIndex(rundir)
 
-    files = sorted(glob.glob(os.path.join(rundir, casename + ".cpl.r.*.nc")))
+    files = _glob_index(rundir_index, casename + ".cpl.r.*.nc")
     if not files:
-        files = sorted(glob.glob(os.path.join(rundir, casename + ".cpl_0001.r.*.nc")))
+        files = _glob_index(rundir_index, casename + ".cpl_0001.r.*.nc")
 
     logger.debug("  cpl files : {} ".format(files))
 
@@ -67,6 +155,19 @@ def _get_datenames(casename, rundir):
     return datenames
 
 
+def _glob_index(rundir_index, pattern):
+    """
+    Returns the sorted paths of the files of rundir_index matching the glob
+    pattern, like sorted(glob.glob(os.path.join(rundir, pattern)))
+    """
+    regex = "^" + fnmatch.translate(pattern)
+    return [
+        os.path.join(rundir_index.from_dir, name)
+        for name in rundir_index.search(regex)
+        if not name.startswith(".")
+    ]
+
+
 def _datetime_str(_date):
     """
     Returns the standard format associated with filenames.
@@ -158,7 +259,7 @@ def _get_component_archive_entries(components, archive):
 def _archive_rpointer_files(
     casename,
     ninst_strings,
-    rundir,
+    archive_plan,
     save_interim_restart_files,
     archive,
     archive_entry,
@@ -170,10 +271,12 @@ def _archive_rpointer_files(
 
     if datename_is_last:
         # Copy of all rpointer files for latest restart date
-        rpointers = glob.glob(os.path.join(rundir, "rpointer.*"))
+        rpointers = _glob_index(archive_plan.rundir_index, "rpointer.*")
         for rpointer in rpointers:
-            safe_copy(
-                rpointer, os.path.join(archive_restdir, os.path.basename(rpointer))
+            archive_plan.add(
+                rpointer,
+                os.path.join(archive_restdir, os.path.basename(rpointer)),
+                safe_copy,
             )
     else:
         # Generate rpointer file(s) for interim restarts for the one datename and each
@@ -225,7 +328,9 @@ def _archive_rpointer_files(
 
 
 ###############################################################################
-def _archive_log_files(dout_s_root, rundir, archive_incomplete, archive_file_fn):
+def _archive_log_files(
+    dout_s_root, rundir, archive_incomplete, archive_file_fn, archive_plan
+):
     ###############################################################################
     """
     Find all completed log files, or all log files if archive_incomplete is True, and archive them.
@@ -242,7 +347,7 @@ def _archive_log_files(dout_s_root, rundir, archive_incomplete, archive_file_fn)
     else:
         log_search = "*.log.*"
 
-    logfiles = glob.glob(os.path.join(rundir, log_search))
+    logfiles = _glob_index(archive_plan.rundir_index, log_search)
     for logfile in logfiles:
         srcfile = join(rundir, os.path.basename(logfile))
         destfile = join(archive_logdir, os.path.basename(logfile))
@@ -251,7 +356,7 @@ def _archive_log_files(dout_s_root, rundir, archive_incomplete, archive_file_fn)
                 _get_archive_fn_desc(archive_file_fn), srcfile, destfile
             )
         )
-        archive_file_fn(srcfile, destfile)
+        archive_plan.add(srcfile, destfile, archive_file_fn)
 
 
 ###############################################################################
@@ -265,10 +370,12 @@ def _archive_history_files(
     dout_s_root,
     casename,
     rundir,
+    archive_plan,
 ):
     ###############################################################################
     """
-    perform short term archiving on history files in rundir
+    perform short term archiving on history files in rundir, the files are
+    added to archive_plan
 
     Not doc-testable due to case and file system dependence
     """
@@ -283,6 +390,7 @@ def _archive_history_files(
     if compname == "drv":
         compname = "cpl"
 
+    rundir_index = archive_plan.rundir_index
     if compname == "nemo":
         archive_rblddir = os.path.join(dout_s_root, compclass, "rebuild")
         if not os.path.exists(archive_rblddir):
@@ -290,8 +398,7 @@ def _archive_history_files(
             logger.debug("created directory {}".format(archive_rblddir))
 
         sfxrbld = r"mesh_mask_" + r"[0-9]*"
-        pfile = re.compile(sfxrbld)
-        rbldfiles = [f for f in os.listdir(rundir) if pfile.search(f)]
+        rbldfiles = list(rundir_index.search(sfxrbld))
         logger.debug("rbldfiles = {} ".format(rbldfiles))
 
         if rbldfiles:
@@ -303,11 +410,10 @@ def _archive_history_files(
                         _get_archive_fn_desc(archive_file_fn), srcfile, destfile
                     )
                 )
-                archive_file_fn(srcfile, destfile)
+                archive_plan.add(srcfile, destfile, archive_file_fn)
 
         sfxhst = casename + r"_[0-9][mdy]_" + r"[0-9]*"
-        pfile = re.compile(sfxhst)
-        hstfiles = [f for f in os.listdir(rundir) if pfile.search(f)]
+        hstfiles = list(rundir_index.search(sfxhst))
         logger.debug("hstfiles = {} ".format(hstfiles))
 
         if hstfiles:
@@ -319,13 +425,15 @@ def _archive_history_files(
                         _get_archive_fn_desc(archive_file_fn), srcfile, destfile
                     )
                 )
-                archive_file_fn(srcfile, destfile)
+                archive_plan.add(srcfile, destfile, archive_file_fn)
 
     # determine ninst and ninst_string
 
     # archive history files - the only history files that kept in the
     # run directory are those that are needed for restarts
-    histfiles = archive.get_all_hist_files(casename, compname, rundir)
+    histfiles = archive.get_all_hist_files(
+        casename, compname, rundir, dir_index=rundir_index
+    )
 
     if histfiles:
         for histfile in histfiles:
@@ -339,14 +447,14 @@ def _archive_history_files(
                 destfile = join(archive_histdir, histfile)
                 if histfile in histfiles_savein_rundir:
                     logger.info("copying {} to {} ".format(srcfile, destfile))
-                    safe_copy(srcfile, destfile)
+                    archive_plan.add(srcfile, destfile, safe_copy)
                 else:
                     logger.info(
                         "{} {} to {} ".format(
                             _get_archive_fn_desc(archive_file_fn), srcfile, destfile
                         )
                     )
-                    archive_file_fn(srcfile, destfile)
+                    archive_plan.add(srcfile, destfile, archive_file_fn)
 
 
 ###############################################################################
@@ -417,13 +525,15 @@ def _archive_restarts_date(
     last_date,
     archive_restdir,
     archive_file_fn,
+    archive_plan,
     components=None,
     link_to_last_restart_files=False,
     testonly=False,
 ):
     ###############################################################################
     """
-    Archive restart files for a single date
+    Archive restart files for a single date, the files are added to
+    archive_plan
 
     Returns a dictionary of histfiles that need saving in the run
     directory, indexed by compname
@@ -463,6 +573,7 @@ def _archive_restarts_date(
                 last_date,
                 archive_restdir,
                 archive_file_fn,
+                archive_plan,
                 link_to_last_restart_files=link_to_last_restart_files,
                 testonly=testonly,
             )
@@ -485,12 +596,14 @@ def _archive_restarts_date_comp(
     last_date,
     archive_restdir,
     archive_file_fn,
+    archive_plan,
     link_to_last_restart_files=False,
     testonly=False,
 ):
     ###############################################################################
     """
-    Archive restart files for a single date and single component
+    Archive restart files for a single date and single component, the files
+    are added to archive_plan
 
     If link_to_last_restart_files is True, then make a symlink to the
     last set of restart files (i.e., the set with datename_is_last
@@ -507,7 +620,7 @@ def _archive_restarts_date_comp(
     _archive_rpointer_files(
         casename,
         _get_ninst_info(case, compclass)[1],
-        rundir,
+        archive_plan,
         case.get_value("DOUT_S_SAVE_INTERIM_RESTART_FILES"),
         archive,
         archive_entry,
@@ -520,12 +633,10 @@ def _archive_restarts_date_comp(
     # copy latest restart files to archive restart directory
     histfiles_savein_rundir = []
 
-    # determine function to use for last set of restart files
+    # last set of restart files are linked right away or copied with the plan
     if link_to_last_restart_files:
-        last_restart_file_fn = symlink_force
         last_restart_file_fn_msg = "linking"
     else:
-        last_restart_file_fn = safe_copy
         last_restart_file_fn_msg = "copying"
 
     # the compname is drv but the files are named cpl
@@ -536,6 +647,7 @@ def _archive_restarts_date_comp(
     if compname == "ww3dev":
         compname = "ww3"
 
+    rundir_index = archive_plan.rundir_index
     # get file_extension suffixes
     for suffix in archive.get_rest_file_extensions(archive_entry):
         #        logger.debug("suffix is {} ninst {}".format(suffix, ninst))
@@ -550,16 +662,13 @@ def _archive_restarts_date_comp(
                 + r"\."
                 + "_".join(datename_str.rsplit("-", 1))
             )
-            pfile = re.compile(pattern)
-            restfiles = [f for f in os.listdir(rundir) if pfile.search(f)]
+            restfiles = rundir_index.search(pattern)
         elif compname == "nemo":
             pattern = r"_*_" + suffix + r"[0-9]*"
-            pfile = re.compile(pattern)
-            restfiles = [f for f in os.listdir(rundir) if pfile.search(f)]
+            restfiles = rundir_index.search(pattern)
         else:
             pattern = r"^{}\.{}[\d_]*\.".format(casename, compname)
-            pfile = re.compile(pattern)
-            files = [f for f in os.listdir(rundir) if pfile.search(f)]
+            files = rundir_index.search(pattern)
             pattern = (
                 r"_?"
                 + r"\d*"
@@ -600,7 +709,10 @@ def _archive_restarts_date_comp(
             if datename_is_last:
                 srcfile = os.path.join(rundir, rfile)
                 destfile = os.path.join(archive_restdir, rfile)
-                last_restart_file_fn(srcfile, destfile)
+                if link_to_last_restart_files:
+                    symlink_force(srcfile, destfile)
+                else:
+                    archive_plan.add(srcfile, destfile, safe_copy)
                 logger.info(
                     "{} file {} to {}".format(
                         last_restart_file_fn_msg, srcfile, destfile
@@ -616,7 +728,7 @@ def _archive_restarts_date_comp(
                         ),
                     )
                     logger.info("Copying {} to {}".format(srcfile, destfile))
-                    safe_copy(srcfile, destfile)
+                    archive_plan.add(srcfile, destfile, safe_copy)
                     logger.debug(
                         "datename_is_last + histfiles_for_restart copying \n  {} to \n  {}".format(
                             srcfile, destfile
@@ -636,7 +748,7 @@ def _archive_restarts_date_comp(
                             _get_archive_fn_desc(archive_file_fn), srcfile, destfile
                         )
                     )
-                    archive_file_fn(srcfile, destfile)
+                    archive_plan.add(srcfile, destfile, archive_file_fn)
 
                     # need to copy the history files needed for interim restarts - since
                     # have not archived all of the history files yet
@@ -648,7 +760,7 @@ def _archive_restarts_date_comp(
                             "hist file {} does not exist ".format(srcfile),
                         )
                         logger.info("copying {} to {}".format(srcfile, destfile))
-                        safe_copy(srcfile, destfile)
+                        archive_plan.add(srcfile, destfile, safe_copy)
                 else:
                     if compname == "nemo":
                         flist = glob.glob(rundir + "/" + casename + "_*_restart*.nc")
@@ -705,6 +817,7 @@ def _archive_restarts_date_comp(
                                                 srcfile
                                             )
                                         )
+                                        rundir_index.remove(os.path.basename(srcfile))
                                         if os.path.isfile(srcfile):
                                             try:
                                                 os.remove(srcfile)
@@ -772,6 +885,7 @@ def _archive_restarts_date_comp(
                                                 srcfile
                                             )
                                         )
+                                        rundir_index.remove(os.path.basename(srcfile))
                                         if os.path.isfile(srcfile):
                                             try:
                                                 os.remove(srcfile)
@@ -795,6 +909,7 @@ def _archive_restarts_date_comp(
                     else:
                         srcfile = os.path.join(rundir, rfile)
                         logger.info("removing interim restart file {}".format(srcfile))
+                        rundir_index.remove(rfile)
                         if os.path.isfile(srcfile):
                             try:
                                 os.remove(srcfile)
@@ -844,12 +959,16 @@ def _archive_process(
         components.append("dart")
 
     archive_file_fn = _get_archive_file_fn(copy_only)
+    # rundir is listed once, the files are archived once all are known
+    archive_plan = _ArchivePlan(rundir)
 
     # archive log files
-    _archive_log_files(dout_s_root, rundir, archive_incomplete_logs, archive_file_fn)
+    _archive_log_files(
+        dout_s_root, rundir, archive_incomplete_logs, archive_file_fn, archive_plan
+    )
 
     # archive restarts and all necessary associated files (e.g. rpointer files)
-    datenames = _get_datenames(casename, rundir)
+    datenames = _get_datenames(casename, rundir, archive_plan.rundir_index)
     logger.debug("datenames {} ".format(datenames))
     histfiles_savein_rundir_by_compname = {}
     for datename in datenames:
@@ -871,6 +990,7 @@ def _archive_process(
                 last_date,
                 archive_restdir,
                 archive_file_fn,
+                archive_plan,
                 components,
                 testonly=testonly,
             )
@@ -880,7 +1000,6 @@ def _archive_process(
                 )
 
     # archive history files
-
     for (_, compname, compclass) in _get_component_archive_entries(components, archive):
         if compclass:
             logger.info(
@@ -904,8 +1023,11 @@ def _archive_process(
                 dout_s_root,
                 casename,
                 rundir,
+                archive_plan,
             )
 
+    archive_plan.run()
+
 
 ###############################################################################
 def restore_from_archive(
@@ -978,6 +1100,7 @@ def archive_last_restarts(
     # Not currently used for anything if we're only archiving the last
     # set of restart files, but needed to satisfy the following interface
     archive_file_fn = _get_archive_file_fn(copy_only=False)
+    archive_plan = _ArchivePlan(rundir)
 
     _ = _archive_restarts_date(
         case=self,
@@ -989,8 +1112,10 @@ def archive_last_restarts(
         last_date=last_date,
         archive_restdir=archive_restdir,
         archive_file_fn=archive_file_fn,
+        archive_plan=archive_plan,
         link_to_last_restart_files=link_to_restart_files,
     )
+    archive_plan.run()
 
 
 ###############################################################################
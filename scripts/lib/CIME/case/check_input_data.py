@@ -6,13 +6,34 @@ from CIME.utils import SharedArea, find_files, safe_copy, expect
 from CIME.XML.inputdata import Inputdata
 import CIME.Servers
 
-import glob, hashlib, shutil
+import glob, hashlib, json, shutil, socket, tempfile
+from collections import namedtuple
+from multiprocessing.dummy import Pool as ThreadPool
 
 logger = logging.getLogger(__name__)
 # The inputdata_checksum.dat file will be read into this hash if it's available
 chksum_hash = dict()
 local_chksum_file = "inputdata_checksum.dat"
 
+# Threads checking for the input files, which are usually on a shared filesystem
+CHECK_THREADS = 16
+# Attempts at downloading a file whose download was interrupted
+DOWNLOAD_ATTEMPTS = 3
+# Files are downloaded to their path with the host, the process id and this
+# suffix, then renamed
+PARTIAL_SUFFIX = ".partial"
+# The md5 checksums of the files in DIN_LOC_ROOT, see get_md5s
+CHKSUM_CACHE_FILE = ".cime_chksum_cache.json"
+# Threads computing checksums, hashlib releases the GIL while hashing
+CHKSUM_THREADS = 8
+MD5_CHUNK_SIZE = 1 << 20
+
+# A distinct file of the input data lists, model is the first model listing it
+_InputFile = namedtuple(
+    "_InputFile",
+    ["model", "description", "full_path", "rel_path", "use_ic_path", "isdirectory"],
+)
+
 
 def _download_checksum_file(rundir):
     """
@@ -32,16 +53,7 @@ def _download_checksum_file(rundir):
                 protocol, user, passwd
             )
         )
-        if protocol == "svn":
-            server = CIME.Servers.SVN(address, user, passwd)
-        elif protocol == "gftp":
-            server = CIME.Servers.GridFTP(address, user, passwd)
-        elif protocol == "ftp":
-            server = CIME.Servers.FTP.ftp_login(address, user, passwd)
-        elif protocol == "wget":
-            server = CIME.Servers.WGET.wget_login(address, user, passwd)
-        else:
-            expect(False, "Unsupported inputdata protocol: {}".format(protocol))
+        server = _get_server(protocol, address, user, passwd)
         if not server:
             continue
 
@@ -64,6 +76,9 @@ def _download_checksum_file(rundir):
         if os.path.isfile(full_path):
             tmpfile = full_path + ".tmp"
             os.rename(full_path, tmpfile)
+        if os.path.isfile(new_file):
+            # Left by an earlier attempt, do not resume it
+            os.remove(new_file)
         # Use umask to make sure files are group read/writable. As long as parent directories
         # have +s, then everything should work.
         with SharedArea():
@@ -150,7 +165,7 @@ def _download_if_in_repo(
             os.makedirs(full_path + ".tmp")
         isdirectory = True
     elif not os.path.exists(os.path.dirname(full_path)):
-        os.makedirs(os.path.dirname(full_path))
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
 
     # Use umask to make sure files are group read/writable. As long as parent directories
     # have +s, then everything should work.
@@ -165,7 +180,51 @@ def _download_if_in_repo(
             else:
                 shutil.rmtree(full_path + ".tmp")
         else:
-            success = server.getfile(rel_path, full_path)
+            success = _getfile(server, rel_path, full_path)
+    return success
+
+
+def _get_partial_path(full_path):
+    """
+    The partial file of a download of full_path by this process. Processes
+    downloading the same file to a shared input data directory each use
+    their own.
+    """
+    return "{}.{}.{:d}{}".format(
+        full_path, socket.gethostname(), os.getpid(), PARTIAL_SUFFIX
+    )
+
+
+def _getfile(server, rel_path, full_path):
+    """
+    Download rel_path to full_path through a partial file of this process,
+    renamed to full_path once complete. An interrupted download is tried
+    again, resuming from the partial file if the server can, the last
+    attempt starts over.
+    """
+    partial_path = _get_partial_path(full_path)
+    success = False
+    for attempt in range(DOWNLOAD_ATTEMPTS):
+        if os.path.isfile(partial_path) and (
+            not server.RESUMABLE or attempt == DOWNLOAD_ATTEMPTS - 1
+        ):
+            os.remove(partial_path)
+
+        success = server.getfile(rel_path, partial_path)
+        if success or not os.path.isfile(partial_path):
+            break
+
+        if os.path.getsize(partial_path) == 0:
+            os.remove(partial_path)
+            break
+
+        logger.info("Download of {} was interrupted, trying again".format(rel_path))
+
+    if success:
+        os.rename(partial_path, full_path)
+    elif os.path.isfile(partial_path):
+        # no other process resumes it
+        os.remove(partial_path)
     return success
 
 
@@ -352,6 +411,114 @@ def stage_refcase(self, input_data_root=None, data_list_dir=None):
     return True
 
 
+def _get_server(protocol, address, user, passwd):
+    if protocol == "svn":
+        server = CIME.Servers.SVN(address, user, passwd)
+    elif protocol == "gftp":
+        server = CIME.Servers.GridFTP(address, user, passwd)
+    elif protocol == "ftp":
+        server = CIME.Servers.FTP.ftp_login(address, user, passwd)
+    elif protocol == "wget":
+        server = CIME.Servers.WGET.wget_login(address, user, passwd)
+    else:
+        expect(False, "Unsupported inputdata protocol: {}".format(protocol))
+    return server
+
+
+def _get_input_files(
+    case, data_list_files, input_data_root, input_ic_root, ic_filepath
+):
+    """
+    Read the input data lists, returns a list of _InputFile for the distinct
+    paths in all the lists, in the order they are first listed.
+    """
+    input_files = []
+    seen = set()
+    for data_list_file in data_list_files:
+        logger.info("Loading input file list: '{}'".format(data_list_file))
+        with open(data_list_file, "r") as fd:
+            lines = fd.readlines()
+
+        model = os.path.basename(data_list_file).split(".")[0]
+        for line in lines:
+            line = line.strip()
+            use_ic_path = False
+            if line and not line.startswith("#"):
+                tokens = line.split("=")
+                description, full_path = tokens[0].strip(), tokens[1].strip()
+                if (
+                    description.endswith("datapath")
+                    or description.endswith("data_path")
+                    or full_path.endswith("/dev/null")
+                ):
+                    continue
+                if description.endswith("file") or description.endswith("filename"):
+                    # There are required input data with key, or 'description' entries
+                    # that specify in their names whether they are files or filenames
+                    # rather than 'datapath's or 'data_path's so we check to make sure
+                    # the input data list has correct non-path values for input files.
+                    # This check happens whether or not a file already exists locally.
+                    expect(
+                        (not full_path.endswith(os.sep)),
+                        "Unsupported directory path in input_data_list named {}. Line entry is '{} = {}'.".format(
+                            data_list_file, description, full_path
+                        ),
+                    )
+                if full_path:
+                    # expand xml variables
+                    full_path = case.get_resolved_value(full_path)
+                    if full_path in seen:
+                        continue
+                    seen.add(full_path)
+
+                    rel_path = full_path
+                    if input_ic_root and input_ic_root in full_path and ic_filepath:
+                        rel_path = full_path.replace(input_ic_root, ic_filepath)
+                        use_ic_path = True
+                    elif input_data_root in full_path:
+                        rel_path = full_path.replace(input_data_root, "")
+                    elif input_ic_root and (
+                        input_ic_root not in input_data_root
+                        and input_ic_root in full_path
+                    ):
+                        if ic_filepath:
+                            rel_path = full_path.replace(input_ic_root, ic_filepath)
+                        use_ic_path = True
+
+                    input_files.append(
+                        _InputFile(
+                            model,
+                            description,
+                            full_path,
+                            rel_path,
+                            use_ic_path,
+                            rel_path.endswith(os.sep),
+                        )
+                    )
+                else:
+                    logger.warning(
+                        "Model {} no file specified for {}".format(model, description)
+                    )
+
+    return input_files
+
+
+def _run_in_pool(function, args_list, num_threads):
+    """
+    Returns [function(*args) for args in args_list], run in num_threads threads
+    """
+    num_threads = min(num_threads, len(args_list))
+    if num_threads <= 1:
+        return [function(*args) for args in args_list]
+
+    pool = ThreadPool(num_threads)
+    try:
+        return pool.starmap(function, args_list)
+    finally:
+        pool.close()
+        pool.join()
+
+
 def check_input_data(
     case,
     protocol="svn",
@@ -370,6 +537,9 @@ def check_input_data(
     in config_inputdata.xml.  If a chksum file is available compute the chksum and compare it to that
     in the file.
     Return True if no files missing
+
+    Each distinct file is checked once, the files are checked and downloaded
+    in parallel.
     """
     case.load_env(reset=True)
     rundir = case.get_value("RUNDIR")
@@ -399,192 +569,120 @@ def check_input_data(
                 protocol, user, passwd
             )
         )
-        if protocol == "svn":
-            server = CIME.Servers.SVN(address, user, passwd)
-        elif protocol == "gftp":
-            server = CIME.Servers.GridFTP(address, user, passwd)
-        elif protocol == "ftp":
-            server = CIME.Servers.FTP.ftp_login(address, user, passwd)
-        elif protocol == "wget":
-            server = CIME.Servers.WGET.wget_login(address, user, passwd)
-        else:
-            expect(False, "Unsupported inputdata protocol: {}".format(protocol))
+        server = _get_server(protocol, address, user, passwd)
         if not server:
             return None
 
-    for data_list_file in data_list_files:
-        logger.info("Loading input file list: '{}'".format(data_list_file))
-        with open(data_list_file, "r") as fd:
-            lines = fd.readlines()
+    input_files = _get_input_files(
+        case, data_list_files, input_data_root, input_ic_root, ic_filepath
+    )
+    # There are some special values of rel_path that we need to ignore - some
+    # of the component models set things like 'NULL' or 'same_as_TS' -
+    # basically if rel_path does not contain '/' (a directory tree) you can
+    # assume it's a special value and ignore it (perhaps with a warning)
+    input_files = [
+        input_file
+        for input_file in input_files
+        if "/" in input_file.rel_path and not input_file.full_path.startswith("unknown")
+    ]
+    exists = _run_in_pool(
+        os.path.exists,
+        [(input_file.full_path,) for input_file in input_files],
+        CHECK_THREADS,
+    )
 
-        for line in lines:
-            line = line.strip()
-            use_ic_path = False
-            if line and not line.startswith("#"):
-                tokens = line.split("=")
-                description, full_path = tokens[0].strip(), tokens[1].strip()
-                if (
-                    description.endswith("datapath")
-                    or description.endswith("data_path")
-                    or full_path.endswith("/dev/null")
-                ):
-                    continue
-                if description.endswith("file") or description.endswith("filename"):
-                    # There are required input data with key, or 'description' entries
-                    # that specify in their names whether they are files or filenames
-                    # rather than 'datapath's or 'data_path's so we check to make sure
-                    # the input data list has correct non-path values for input files.
-                    # This check happens whether or not a file already exists locally.
-                    expect(
-                        (not full_path.endswith(os.sep)),
-                        "Unsupported directory path in input_data_list named {}. Line entry is '{} = {}'.".format(
-                            data_list_file, description, full_path
+    downloads = []  # (input_file, download args)
+    to_verify = []  # (rel_path, isdirectory)
+    for input_file, file_exists in zip(input_files, exists):
+        model, description, full_path, rel_path, use_ic_path, isdirectory = input_file
+        if file_exists:
+            if rel_path == full_path:
+                logger.debug("  Found input file: '{}'".format(full_path))
+            else:
+                if chksum:
+                    to_verify.append((rel_path.strip(os.sep), isdirectory))
+                logger.debug("  Already had input file: '{}'".format(full_path))
+            continue
+
+        print("Model {} missing file {} = '{}'".format(model, description, full_path))
+        if not download:
+            no_files_missing = False
+        elif rel_path == full_path:
+            # User pointing to a file outside of input_data_root, we cannot determine
+            # rel_path, and so cannot download the file.
+            # Data download path must be DIN_LOC_ROOT, DIN_LOC_IC or RUNDIR
+            if full_path.startswith(rundir):
+                tmppath = full_path[len(rundir) + 1 :]
+                downloads.append(
+                    (
+                        input_file,
+                        (
+                            server,
+                            os.path.join(rundir, "inputdata"),
+                            tmppath[10:],
+                            isdirectory,
+                            "/",
                         ),
                     )
-                if full_path:
-                    # expand xml variables
-                    full_path = case.get_resolved_value(full_path)
-                    rel_path = full_path
-                    if input_ic_root and input_ic_root in full_path and ic_filepath:
-                        rel_path = full_path.replace(input_ic_root, ic_filepath)
-                        use_ic_path = True
-                    elif input_data_root in full_path:
-                        rel_path = full_path.replace(input_data_root, "")
-                    elif input_ic_root and (
-                        input_ic_root not in input_data_root
-                        and input_ic_root in full_path
-                    ):
-                        if ic_filepath:
-                            rel_path = full_path.replace(input_ic_root, ic_filepath)
-                        use_ic_path = True
-                    model = os.path.basename(data_list_file).split(".")[0]
-                    isdirectory = rel_path.endswith(os.sep)
-
-                    if (
-                        "/" in rel_path
-                        and rel_path == full_path
-                        and not full_path.startswith("unknown")
-                    ):
-                        # User pointing to a file outside of input_data_root, we cannot determine
-                        # rel_path, and so cannot download the file. If it already exists, we can
-                        # proceed
-                        if not os.path.exists(full_path):
-                            print(
-                                "Model {} missing file {} = '{}'".format(
-                                    model, description, full_path
-                                )
-                            )
-                            # Data download path must be DIN_LOC_ROOT, DIN_LOC_IC or RUNDIR
-
-                            rundir = case.get_value("RUNDIR")
-                            if download:
-                                if full_path.startswith(rundir):
-                                    filepath = os.path.dirname(full_path)
-                                    if not os.path.exists(filepath):
-                                        logger.info(
-                                            "Creating directory {}".format(filepath)
-                                        )
-                                        os.makedirs(filepath)
-                                    tmppath = full_path[len(rundir) + 1 :]
-                                    success = _download_if_in_repo(
-                                        server,
-                                        os.path.join(rundir, "inputdata"),
-                                        tmppath[10:],
-                                        isdirectory=isdirectory,
-                                        ic_filepath="/",
-                                    )
-                                    no_files_missing = success
-                                else:
-                                    logger.warning(
-                                        "    Cannot download file since it lives outside of the input_data_root '{}'".format(
-                                            input_data_root
-                                        )
-                                    )
-                            else:
-                                no_files_missing = False
-                        else:
-                            logger.debug("  Found input file: '{}'".format(full_path))
-                    else:
-                        # There are some special values of rel_path that
-                        # we need to ignore - some of the component models
-                        # set things like 'NULL' or 'same_as_TS' -
-                        # basically if rel_path does not contain '/' (a
-                        # directory tree) you can assume it's a special
-                        # value and ignore it (perhaps with a warning)
-
-                        if (
-                            "/" in rel_path
-                            and not os.path.exists(full_path)
-                            and not full_path.startswith("unknown")
-                        ):
-                            print(
-                                "Model {} missing file {} = '{}'".format(
-                                    model, description, full_path
-                                )
-                            )
-                            if download:
-                                if use_ic_path:
-                                    success = _download_if_in_repo(
-                                        server,
-                                        input_ic_root,
-                                        rel_path.strip(os.sep),
-                                        isdirectory=isdirectory,
-                                        ic_filepath=ic_filepath,
-                                    )
-                                else:
-                                    success = _download_if_in_repo(
-                                        server,
-                                        input_data_root,
-                                        rel_path.strip(os.sep),
-                                        isdirectory=isdirectory,
-                                        ic_filepath=ic_filepath,
-                                    )
-                                if not success:
-                                    no_files_missing = False
-                                if success and chksum:
-                                    verify_chksum(
-                                        input_data_root,
-                                        rundir,
-                                        rel_path.strip(os.sep),
-                                        isdirectory,
-                                    )
-                            else:
-                                no_files_missing = False
-                        else:
-                            if chksum:
-                                verify_chksum(
-                                    input_data_root,
-                                    rundir,
-                                    rel_path.strip(os.sep),
-                                    isdirectory,
-                                )
-                                logger.info(
-                                    "Chksum passed for file {}".format(
-                                        os.path.join(input_data_root, rel_path)
-                                    )
-                                )
-                            logger.debug(
-                                "  Already had input file: '{}'".format(full_path)
-                            )
-                else:
-                    model = os.path.basename(data_list_file).split(".")[0]
-                    logger.warning(
-                        "Model {} no file specified for {}".format(model, description)
+                )
+            else:
+                logger.warning(
+                    "    Cannot download file since it lives outside of the input_data_root '{}'".format(
+                        input_data_root
                     )
+                )
+        else:
+            downloads.append(
+                (
+                    input_file,
+                    (
+                        server,
+                        input_ic_root if use_ic_path else input_data_root,
+                        rel_path.strip(os.sep),
+                        isdirectory,
+                        ic_filepath,
+                    ),
+                )
+            )
+
+    if downloads:
+        # Set the umask once for all the threads
+        with SharedArea():
+            successes = _run_in_pool(
+                _download_if_in_repo,
+                [args for _, args in downloads],
+                server.CONCURRENT_DOWNLOADS,
+            )
+        for (input_file, _), success in zip(downloads, successes):
+            if not success:
+                no_files_missing = False
+            elif chksum and input_file.rel_path != input_file.full_path:
+                to_verify.append(
+                    (input_file.rel_path.strip(os.sep), input_file.isdirectory)
+                )
+
+    if to_verify:
+        verify_chksums(input_data_root, rundir, to_verify)
+        for rel_path, _ in to_verify:
+            logger.info(
+                "Chksum passed for file {}".format(
+                    os.path.join(input_data_root, rel_path)
+                )
+            )
 
     return no_files_missing
 
 
-def verify_chksum(input_data_root, rundir, filename, isdirectory):
+def _load_chksum_hash(rundir):
     """
-    For file in filename perform a chksum and compare the result to that stored in
-    the local checksumfile, if isdirectory chksum all files in the directory of form *.*
+    Read the local checksum file into chksum_hash if it is not loaded yet,
+    returns False if there is no checksum file
     """
     hashfile = os.path.join(rundir, local_chksum_file)
     if not chksum_hash:
         if not os.path.isfile(hashfile):
             logger.warning("Failed to find or download file {}".format(hashfile))
-            return
+            return False
 
         with open(hashfile) as fd:
             lines = fd.readlines()
@@ -597,29 +695,125 @@ def verify_chksum(input_data_root, rundir, filename, isdirectory):
                     )
                 else:
                     chksum_hash[fname] = fchksum
+    return True
 
-    if isdirectory:
-        filenames = glob.glob(os.path.join(filename, "*.*"))
-    else:
-        filenames = [filename]
-    for fname in filenames:
-        if not os.sep in fname:
-            continue
-        chksum = md5(os.path.join(input_data_root, fname))
-        if chksum_hash:
-            if not fname in chksum_hash:
+
+def _read_chksum_cache(input_data_root):
+    cache_file = os.path.join(input_data_root, CHKSUM_CACHE_FILE)
+    if not os.path.isfile(cache_file):
+        return {}
+
+    try:
+        with open(cache_file, "r", encoding="utf-8") as fd:
+            return json.load(fd)
+    except (OSError, ValueError) as e:
+        logger.debug("Ignoring unreadable {}: {}".format(cache_file, e))
+        return {}
+
+
+def _write_chksum_cache(input_data_root, new_entries):
+    """
+    Add new_entries to the checksum cache of input_data_root. Other cases may
+    update the cache at the same time, so it is read again just before it is
+    replaced. An entry can still be lost, it is then computed again next time.
+    """
+    cache = _read_chksum_cache(input_data_root)
+    cache.update(new_entries)
+    try:
+        fd, tmp_path = tempfile.mkstemp(dir=input_data_root, prefix=".tmp.")
+    except OSError as e:
+        # e.g. a DIN_LOC_ROOT that is not writable by this user
+        logger.debug("Could not write the checksum cache: {}".format(e))
+        return
+
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as fout:
+            json.dump(cache, fout)
+        os.chmod(tmp_path, 0o664)
+        os.replace(tmp_path, os.path.join(input_data_root, CHKSUM_CACHE_FILE))
+    except OSError as e:
+        logger.debug("Could not write the checksum cache: {}".format(e))
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def get_md5s(input_data_root, fnames):
+    """
+    Returns a dict of the md5 checksums of fnames, paths relative to
+    input_data_root. The checksums are cached in input_data_root together with
+    the size, modification time and inode of the files, so unchanged files are
+    not read again, the others are read in parallel.
+    """
+    cache = _read_chksum_cache(input_data_root)
+    chksums = {}
+    to_hash = []
+    for fname in fnames:
+        stat = os.stat(os.path.join(input_data_root, fname))
+        key = [stat.st_size, stat.st_mtime_ns, stat.st_ino]
+        entry = cache.get(fname)
+        if entry is not None and entry["key"] == key:
+            chksums[fname] = entry["md5"]
+        else:
+            to_hash.append((fname, key))
+
+    if to_hash:
+        new_chksums = _run_in_pool(
+            md5,
+            [(os.path.join(input_data_root, fname),) for fname, _ in to_hash],
+            CHKSUM_THREADS,
+        )
+        new_entries = {}
+        for (fname, key), chksum in zip(to_hash, new_chksums):
+            chksums[fname] = chksum
+            new_entries[fname] = {"key": key, "md5": chksum}
+        _write_chksum_cache(input_data_root, new_entries)
+
+    return chksums
+
+
+def verify_chksum(input_data_root, rundir, filename, isdirectory):
+    """
+    For file in filename perform a chksum and compare the result to that stored in
+    the local checksumfile, if isdirectory chksum all files in the directory of form *.*
+    """
+    verify_chksums(input_data_root, rundir, [(filename, isdirectory)])
+
+
+def verify_chksums(input_data_root, rundir, filenames):
+    """
+    verify_chksum for each (filename, isdirectory) of filenames, the files are
+    checksummed in parallel
+    """
+    if not _load_chksum_hash(rundir) or not chksum_hash:
+        return
+
+    hashfile = os.path.join(rundir, local_chksum_file)
+    fnames = []
+    for filename, isdirectory in filenames:
+        if isdirectory:
+            dir_fnames = glob.glob(os.path.join(filename, "*.*"))
+        else:
+            dir_fnames = [filename]
+        for fname in dir_fnames:
+            if os.sep not in fname:
+                continue
+            if fname not in chksum_hash:
                 logger.warning(
                     "Did not find hash for file {} in chksum file {}".format(
                         filename, hashfile
                     )
                 )
-            else:
-                expect(
-                    chksum == chksum_hash[fname],
-                    "chksum mismatch for file {} expected {} found {}".format(
-                        os.path.join(input_data_root, fname), chksum, chksum_hash[fname]
-                    ),
-                )
+            elif fname not in fnames:
+                fnames.append(fname)
+
+    chksums = get_md5s(input_data_root, fnames)
+    for fname in fnames:
+        expect(
+            chksums[fname] == chksum_hash[fname],
+            "chksum mismatch for file {} expected {} found {}".format(
+                os.path.join(input_data_root, fname), chksums[fname], chksum_hash[fname]
+            ),
+        )
 
 
 def md5(fname):
@@ -628,6 +822,6 @@ def md5(fname):
     """
     hash_md5 = hashlib.md5()
     with open(fname, "rb") as f:
-        for chunk in iter(lambda: f.read(4096), b""):
+        for chunk in iter(lambda: f.read(MD5_CHUNK_SIZE), b""):
             hash_md5.update(chunk)
     return hash_md5.hexdigest()
@@ -0,0 +1,130 @@
+"""
+Summarize coupler log files for the memory, throughput and run completion
+checks of the system tests.
+
+A log is read once, line by line, and the summary is cached in a hidden
+json file next to the log, so later checks and later test phases do not
+decompress it again.
+"""
+from CIME.XML.standard_module_setup import *
+
+import gzip, json, tempfile
+
+logger = logging.getLogger(__name__)
+
+# Bump when the summary changes so older cached summaries are not used
+SUMMARY_VERSION = 1
+
+_MEMINFO = re.compile(r".*model date =\s+(\w+).*memory =\s+(\d+\.?\d+).*highwater")
+_MODEL_DATE = re.compile(r".*model date =\s+(\w+)")
+_THROUGHPUT = re.compile(r"# simulated years / cmp-day =\s+(\d+\.\d+)\s")
+_RUN_COMPLETE = b"SUCCESSFUL TERMINATION"
+
+# Summaries already read in this process, path -> summary
+_SUMMARIES = {}
+
+
+def _get_summary_path(cpllog):
+    # Hidden so it does not match the log globs of the tests and st_archive
+    dirname, basename = os.path.split(cpllog)
+    return os.path.join(dirname, ".{}.summary.json".format(basename))
+
+
+def _read_log(cpllog):
+    """
+    Read the summary of cpllog from the log itself
+    """
+    summary = {
+        "version": SUMMARY_VERSION,
+        "compressed": cpllog.endswith(".gz"),
+        "mem_usage": [],
+        "first_model_date": None,
+        "last_model_date": None,
+        "throughput": None,
+        "run_complete": False,
+    }
+    fopen = gzip.open if summary["compressed"] else open
+    with fopen(cpllog, "rb") as fd:
+        for line in fd:
+            if b"model date =" in line:
+                text = line.decode("utf-8", errors="replace")
+                m = _MEMINFO.match(text)
+                if m:
+                    summary["mem_usage"].append((float(m.group(1)), float(m.group(2))))
+                m = _MODEL_DATE.match(text)
+                if m:
+                    if summary["first_model_date"] is None:
+                        summary["first_model_date"] = m.group(1)
+                    summary["last_model_date"] = m.group(1)
+            elif summary["throughput"] is None and b"simulated years" in line:
+                m = _THROUGHPUT.search(line.decode("utf-8", errors="replace"))
+                if m:
+                    summary["throughput"] = float(m.group(1))
+
+            if _RUN_COMPLETE in line:
+                summary["run_complete"] = True
+
+    return summary
+
+
+def _write_summary(summary_path, summary):
+    try:
+        fd, tmp_path = tempfile.mkstemp(
+            dir=os.path.dirname(summary_path), prefix=".tmp."
+        )
+    except OSError as e:
+        # e.g. a read-only baseline directory, the summary is only a cache
+        logger.debug("Could not write {}: {}".format(summary_path, e))
+        return
+
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as fout:
+            json.dump(summary, fout)
+        os.replace(tmp_path, summary_path)
+    except OSError as e:
+        logger.debug("Could not write {}: {}".format(summary_path, e))
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def get_cpl_log_summary(cpllog):
+    """
+    Returns a dict summarizing coupler log file cpllog:
+      mem_usage: list of (model date, memory) of all the memory records
+      first_model_date, last_model_date: the first and last model dates
+      throughput: the simulated years / cmp-day of the run or None
+      run_complete: True if the log is compressed and has the successful
+        termination message
+      compressed: True if the log is gzipped
+
+    The summary is cached next to the log and used for as long as the size
+    and modification time of the log do not change.
+    """
+    stat = os.stat(cpllog)
+    key = [stat.st_size, stat.st_mtime_ns]
+    summary = _SUMMARIES.get(cpllog)
+    if summary is not None and summary["key"] == key:
+        return summary
+
+    summary_path = _get_summary_path(cpllog)
+    summary = None
+    if os.path.isfile(summary_path):
+        try:
+            with open(summary_path, "r", encoding="utf-8") as fd:
+                summary = json.load(fd)
+        except (OSError, ValueError) as e:
+            logger.debug("Ignoring unreadable {}: {}".format(summary_path, e))
+
+    if (
+        summary is None
+        or summary.get("version") != SUMMARY_VERSION
+        or summary.get("key") != key
+    ):
+        summary = _read_log(cpllog)
+        summary["run_complete"] = summary["run_complete"] and summary["compressed"]
+        summary["key"] = key
+        _write_summary(summary_path, summary)
+
+    summary["mem_usage"] = [tuple(record) for record in summary["mem_usage"]]
+    _SUMMARIES[cpllog] = summary
+    return summary
@@ -8,10 +8,28 @@ information from a run.
 from CIME.XML.standard_module_setup import *
 from CIME.utils import safe_copy
 
-import datetime, re
+import datetime, json, re
 
 logger = logging.getLogger(__name__)
 
+# GPTL timer lines of the model_timing_stats file, the timer name is quoted:
+#   "name"  on  processes  threads  count  walltotal  wallmax (proc thrd)  wallmin (proc thrd)
+_MCT_TIME_LINE = re.compile(
+    r'\s*"([^"]*)"\s+\S\s+\d+\s*\d+\s*\S+\s*\S+\s*(\d*\.\d+)\s*\(.*\)\s*(\d*\.\d+)\s*\(.*\)'
+)
+_MCT_COUNT_LINE = re.compile(r'\s*"([^"]*)"\s+\S\s+(\d+)\s*\d+\s*(\S+)')
+_MCT_SERIAL_COUNT_LINE = re.compile(r'\s*"([^"]*)"\s+\S\s+(\d+)\s')
+
+# The columns of ESMF_Profile.summary lines, for each profile version:
+#   PETs  [PEs]  Count  Mean (s)  Min (s)  Min PET  Max (s)  Max PET
+_NUOPC_TIMES = [
+    re.compile(r"\d+\s+\d+\s+(\d*\.\d+)\s+(\d*\.\d+)\s+\d+\s+(\d*\.\d+)\s+\d+$"),
+    re.compile(r"\d+\s+\d+\s+\d+\s+(\d*\.\d+)\s+(\d*\.\d+)\s+\d+\s+(\d*\.\d+)\s+\d+$"),
+]
+_NUOPC_MED_REGION = re.compile(r"\[MED\] med_(phases|connectors|fraction)\S+$")
+_NUOPC_COMM_REGION = re.compile(r"\[\S+-TO-\S+\] RunPhase1$")
+_FLOAT_COLUMN = re.compile(r"\d*\.\d+$")
+
 
 class _GetTimingInfo:
     def __init__(self, name):
@@ -34,6 +52,8 @@ class _TimingParser:
         self.ncount = 0
         self.nprocs = 0
         self.version = -1
+        self._mct_table = None
+        self._nuopc_tables = {}
 
     def write(self, text):
         self.fout.write(text)
@@ -78,6 +98,75 @@ class _TimingParser:
                     )
                 )
 
+    def _set_lines(self, lines):
+        self.finlines = lines
+        self._mct_table = None
+        self._nuopc_tables = {}
+
+    def _get_mct_table(self):
+        """
+        Parse all the GPTL timers of finlines, returns a dict heading ->
+        [(nprocs, ncount), (minval, maxval)]. Either entry is None if no line
+        of the heading has it, the first line that has it is used.
+        """
+        if self._mct_table is None:
+            self._mct_table = {}
+            for line in self.finlines:
+                m = _MCT_COUNT_LINE.match(line)
+                if m:
+                    counts = (m.group(2), m.group(3))
+                else:
+                    m = _MCT_SERIAL_COUNT_LINE.match(line)
+                    counts = None if m is None else ("1", m.group(2))
+                if m is None:
+                    continue
+
+                entry = self._mct_table.setdefault(m.group(1), [None, None])
+                if entry[0] is None:
+                    entry[0] = counts
+                if entry[1] is None:
+                    m = _MCT_TIME_LINE.match(line)
+                    if m:
+                        entry[1] = (m.group(2), m.group(3))
+
+        return self._mct_table
+
+    def _get_nuopc_table(self, instance):
+        """
+        Split the lines of the ESMF profile into region names and columns,
+        returns (regions, run_rows, first_rows) for instance. regions is a dict
+        region name -> columns of the first line of the region in the run phase
+        of instance ([ensemble] regions in any phase), run_rows the list of
+        (region name, columns) of all lines in the run phase and first_rows a
+        dict region name -> columns of the first line of the region.
+        """
+        if instance not in self._nuopc_tables:
+            if self.version < 0:
+                self._get_esmf_profile_version()
+            ncolumns = 7 + self.version
+            regions = {}
+            run_rows = []
+            first_rows = {}
+            phase = None
+            for line in self.finlines:
+                phase = self._get_nuopc_phase(line, instance, phase)
+                tokens = line.split()
+                if len(tokens) <= ncolumns:
+                    continue
+
+                name = " ".join(tokens[:-ncolumns])
+                columns = tokens[-ncolumns:]
+                first_rows.setdefault(name, columns)
+                if phase == "run":
+                    run_rows.append((name, columns))
+                    regions.setdefault(name, columns)
+                elif "[ensemble]" in name:
+                    regions.setdefault(name, columns)
+
+            self._nuopc_tables[instance] = (regions, run_rows, first_rows)
+
+        return self._nuopc_tables[instance]
+
     def gettime2(self, heading_padded):
         if self._driver == "mct":
             return self._gettime2_mct(heading_padded)
@@ -87,36 +176,21 @@ class _TimingParser:
             return self._gettime2_nuopc()
 
     def _gettime2_mct(self, heading_padded):
-        nprocs = 0
-        ncount = 0
+        entry = self._get_mct_table().get(heading_padded.strip())
+        if entry is None:
+            return (0, 0)
 
-        heading = '"' + heading_padded.strip() + '"'
-        for line in self.finlines:
-            m = re.match(r"\s*{}\s+\S\s+(\d+)\s*\d+\s*(\S+)".format(heading), line)
-            if m:
-                nprocs = int(float(m.groups()[0]))
-                ncount = int(float(m.groups()[1]))
-                return (nprocs, ncount)
-            else:
-                m = re.match(r"\s*{}\s+\S\s+(\d+)\s".format(heading), line)
-                if m:
-                    nprocs = 1
-                    ncount = int(float(m.groups()[0]))
-                    return (nprocs, ncount)
-        return (0, 0)
+        nprocs, ncount = entry[0]
+        return (int(float(nprocs)), int(float(ncount)))
 
     def _gettime2_nuopc(self):
         self.nprocs = 0
         self.ncount = 0
-        #        expression = re.compile(r'\s*\MED:\s*\(med_phases_profile\)\s+(\d+)\s+(\d+)')
-        expression = re.compile(r"\s*\[ATM]\s*RunPhase1\s+(\d+)\s+(\d+)")
-
-        for line in self.finlines:
-            match = expression.match(line)
-            if match:
-                self.nprocs = int(match.group(1))
-                self.ncount = int(match.group(2))
-                return (self.nprocs, self.ncount)
+        columns = self._get_nuopc_table("0001")[2].get("[ATM] RunPhase1")
+        if columns is not None and columns[0].isdigit() and columns[1].isdigit():
+            self.nprocs = int(columns[0])
+            self.ncount = int(columns[1])
+            return (self.nprocs, self.ncount)
 
         return (0, 0)
 
@@ -129,23 +203,12 @@ class _TimingParser:
             return self._gettime_nuopc(heading_padded)
 
     def _gettime_mct(self, heading_padded):
-        found = False
-        heading = '"' + heading_padded.strip() + '"'
-        minval = 0
-        maxval = 0
-        for line in self.finlines:
-            m = re.match(
-                r"\s*{}\s+\S\s+\d+\s*\d+\s*\S+\s*\S+\s*(\d*\.\d+)\s*\(.*\)\s*(\d*\.\d+)\s*\(.*\)".format(
-                    heading
-                ),
-                line,
-            )
-            if m:
-                maxval = float(m.groups()[0])
-                minval = float(m.groups()[1])
-                found = True
-                return (minval, maxval, found)
-        return (0, 0, False)
+        entry = self._get_mct_table().get(heading_padded.strip())
+        if entry is None or entry[1] is None:
+            return (0, 0, False)
+
+        maxval, minval = entry[1]
+        return (float(minval), float(maxval), True)
 
     def _get_esmf_profile_version(self):
         """
@@ -164,41 +227,15 @@ class _TimingParser:
     def _gettime_nuopc(self, heading, instance="0001"):
         if instance == "":
             instance = "0001"
-        minval = 0
-        maxval = 0
-        m = None
-        timeline = []
-        #  PETs   Count    Mean (s)    Min (s)     Min PET Max (s)     Max PET
-        timeline.append(
-            re.compile(
-                r"\s*{}\s+\d+\s+\d+\s+(\d*\.\d+)\s+(\d*\.\d+)\s+\d+\s+(\d*\.\d+)\s+\d+".format(
-                    re.escape(heading)
-                )
-            )
-        )
-        #  PETs   PEs  Count    Mean (s)    Min (s)     Min PET Max (s)     Max PET
-        timeline.append(
-            re.compile(
-                r"\s*{}\s+\d+\s+\d+\s+\d+\s+(\d*\.\d+)\s+(\d*\.\d+)\s+\d+\s+(\d*\.\d+)\s+\d+".format(
-                    re.escape(heading)
-                )
-            )
-        )
-        phase = None
-        for line in self.finlines:
-            phase = self._get_nuopc_phase(line, instance, phase)
-            if phase != "run" and not "[ensemble]" in heading:
-                continue
-            if heading in line:
-                m = timeline[self.version].match(line)
-                if m:
-                    minval = float(m.group(2))
-                    maxval = float(m.group(3))
-                    return (minval, maxval, True)
-                else:
-                    expect(False, "Parsing error in ESMF_Profile.summary file")
+        regions = self._get_nuopc_table(instance)[0]
+        columns = regions.get(heading.strip())
+        if columns is None:
+            return (0, 0, False)
 
-        return (0, 0, False)
+        #  PETs  [PEs]  Count    Mean (s)    Min (s)     Min PET Max (s)     Max PET
+        m = _NUOPC_TIMES[self.version].match(" ".join(columns))
+        expect(m is not None, "Parsing error in ESMF_Profile.summary file")
+        return (float(m.group(2)), float(m.group(3)), True)
 
     @staticmethod
     def _get_nuopc_phase(line, instance, phase):
@@ -212,81 +249,57 @@ class _TimingParser:
             phase = "other"
         return phase
 
-    def getMEDtime(self, instance):
+    def _sum_nuopc_means(self, instance, region_re):
+        """
+        Sum of the mean times of the regions in the run phase of instance whose
+        names match region_re
+        """
         if instance == "":
             instance = "0001"
+        total = 0
+        for name, columns in self._get_nuopc_table(instance)[1]:
+            if region_re.match(name):
+                # The mean follows PETs, [PEs,] Count
+                mean = columns[self.version + 2]
+                if _FLOAT_COLUMN.match(mean):
+                    total += float(mean)
+                    logger.debug("{} time={} sum={}".format(name, mean, total))
 
-        med_phase_line = []
-        med_connector_line = []
-        med_fraction_line = []
-        med_phase_line.append(
-            re.compile(r"\s*(\[MED\] med_phases\S+)\s+\d+\s+\d+\s+(\d*\.\d+)\s+")
-        )
-        med_connector_line.append(
-            re.compile(r"\s*(\[MED\] med_connectors\S+)\s+\d+\s+\d+\s+(\d*\.\d+)\s+")
-        )
-        med_fraction_line.append(
-            re.compile(r"\s*(\[MED\] med_fraction\S+)\s+\d+\s+\d+\s+(\d*\.\d+)\s+")
-        )
-        med_phase_line.append(
-            re.compile(r"\s*(\[MED\] med_phases\S+)\s+\d+\s+\d+\s+\d+\s+(\d*\.\d+)\s+")
-        )
-        med_connector_line.append(
-            re.compile(
-                r"\s*(\[MED\] med_connectors\S+)\s+\d+\s+\d+\s+\d+\s+(\d*\.\d+)\s+"
-            )
-        )
-        med_fraction_line.append(
-            re.compile(
-                r"\s*(\[MED\] med_fraction\S+)\s+\d+\s+\d+\s+\d+\s+(\d*\.\d+)\s+"
-            )
-        )
+        return total
 
-        m = None
-        minval = 0
-        maxval = 0
-        phase = None
-        for line in self.finlines:
-            phase = self._get_nuopc_phase(line, instance, phase)
-            if phase != "run":
-                continue
-            m = med_phase_line[self.version].match(line)
-            if not m:
-                m = med_connector_line[self.version].match(line)
-            if not m:
-                m = med_fraction_line[self.version].match(line)
-            if m:
-                minval += float(m.group(2))
-                maxval += float(m.group(2))
-
-        return (minval, maxval)
+    def getMEDtime(self, instance):
+        total = self._sum_nuopc_means(instance, _NUOPC_MED_REGION)
+        return (total, total)
 
     def getCOMMtime(self, instance):
-        if instance == "":
-            instance = "0001"
-        comm_line = []
-        comm_line.append(
-            re.compile(r"\s*(\[\S+-TO-\S+\] RunPhase1)\s+\d+\s+\d+\s+(\d*\.\d+)\s+")
-        )
-        comm_line.append(
-            re.compile(
-                r"\s*(\[\S+-TO-\S+\] RunPhase1)\s+\d+\s+\d+\s+\d+\s+(\d*\.\d+)\s+"
-            )
-        )
-        m = None
-        maxval = 0
-        phase = None
-        for line in self.finlines:
-            phase = self._get_nuopc_phase(line, instance, phase)
-            if phase != "run":
-                continue
-            m = comm_line[self.version].match(line)
-            if m:
-                heading = m.group(1)
-                maxv = float(m.group(2))
-                maxval += maxv
-                logger.debug("{} time={} sum={}".format(heading, maxv, maxval))
-        return maxval
+        return self._sum_nuopc_means(instance, _NUOPC_COMM_REGION)
+
+    def get_timers(self, instance=""):
+        """
+        Returns a dict timer name -> dict of its statistics, for all the timers
+        of finlines
+        """
+        timers = {}
+        if self._driver == "mct":
+            for heading in self._get_mct_table():
+                nprocs, ncount = self._gettime2_mct(heading)
+                minval, maxval, found = self._gettime_mct(heading)
+                timers[heading] = {"nprocs": nprocs, "ncount": ncount}
+                if found:
+                    timers[heading].update({"min": minval, "max": maxval})
+        elif self._driver == "nuopc":
+            if instance == "":
+                instance = "0001"
+            for name, columns in self._get_nuopc_table(instance)[0].items():
+                m = _NUOPC_TIMES[self.version].match(" ".join(columns))
+                if m:
+                    timers[name] = {
+                        "mean": float(m.group(1)),
+                        "min": float(m.group(2)),
+                        "max": float(m.group(3)),
+                    }
+
+        return timers
 
     def getTiming(self):
         ninst = 1
@@ -412,6 +425,13 @@ class _TimingParser:
             "timing",
             "{}_timing{}.{}.{}".format(cime_model, inst_label, caseid, self.lid),
         )
+        jsonfilename = os.path.join(
+            self.caseroot,
+            "timing",
+            "{}_timing{}_summary.{}.{}.json".format(
+                cime_model, inst_label, caseid, self.lid
+            ),
+        )
 
         timingDir = os.path.join(self.caseroot, "timing")
         if not os.path.isfile(binfilename):
@@ -426,7 +446,7 @@ class _TimingParser:
         os.chdir(self.caseroot)
         try:
             fin = open(finfilename, "r")
-            self.finlines = fin.readlines()
+            self._set_lines(fin.readlines())
             fin.close()
         except Exception as e:
             logger.critical("Unable to open file {}".format(finfilename))
@@ -917,6 +937,58 @@ class _TimingParser:
 
         self.fout.close()
 
+        summary = {
+            "case": caseid,
+            "lid": self.lid,
+            "machine": mach,
+            "caseroot": self.caseroot,
+            "user": user,
+            "date": now,
+            "grid": grid,
+            "compset": compset,
+            "run_type": run_type,
+            "continue_run": continue_run,
+            "stop_option": stop_option,
+            "stop_n": stop_n,
+            "run_length_days": adays,
+            "ocn_run_length_days": odays,
+            "total_pes": totalpes * smt_factor,
+            "mpi_tasks_per_node": max_mpitasks_per_node,
+            "cost_pes": pecost,
+            "init_time": nmax,
+            "run_time": tmax,
+            "final_time": fmax,
+            "comm_time": xmax,
+            "model_cost": None,
+            "model_throughput": None,
+            "components": {},
+            "timers": self.get_timers(inst_label[1:]),
+        }
+        if adays > 0:
+            summary["model_cost"] = (tmax * 365.0 * pecost) / (3600.0 * adays)
+        if tmax > 0:
+            summary["model_throughput"] = (86400.0 * adays) / (tmax * 365.0)
+        if self._driver == "mct":
+            summary["ocn_init_wait_time"] = ocnwaittime
+            summary["ocn_init_run_time"] = ocnrunitime
+            summary["run_time_correction"] = correction
+        for k in self.case.get_values("COMP_CLASSES"):
+            m = self.models[k]
+            summary["components"][k] = {
+                "comp": m.comp,
+                "comp_pes": m.ntasks * m.nthrds,
+                "root_pe": m.rootpe,
+                "tasks": m.ntasks,
+                "threads": m.nthrds,
+                "instances": m.ninst,
+                "stride": m.pstrid,
+                "run_time": m.tmax,
+                "myears_per_wday": m.tmaxr,
+            }
+
+        with open(jsonfilename, "w") as fd:
+            json.dump(summary, fd, indent=2)
+
 
 def get_timing(case, lid):
     parser = _TimingParser(case, lid)
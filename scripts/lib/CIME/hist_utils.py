@@ -3,6 +3,8 @@ Functions for actions pertaining to history files.
 """
 from CIME.XML.standard_module_setup import *
 from CIME.test_status import TEST_NO_BASELINES_COMMENT, TEST_STATUS_FILENAME
+from CIME.XML.archive_base import RunDirIndex
+from CIME.nccompare import NATIVE_CPRNC, compare_files, has_netcdf4, hash_file
 from CIME.utils import (
     get_current_commit,
     get_timestamp,
@@ -12,17 +14,21 @@ from CIME.utils import (
     parse_test_name,
 )
 
-import logging, os, re, filecmp
+import logging, os, re, filecmp, json, time
+from multiprocessing.dummy import Pool as ThreadPool
 
 logger = logging.getLogger(__name__)
 
 BLESS_LOG_NAME = "bless_log"
+# The content hashes of the baseline hist files, written by generate_baseline
+BASELINE_HASHES_NAME = "hist_hashes.json"
 
 # ------------------------------------------------------------------------
 # Strings used in the comments generated by cprnc
 # ------------------------------------------------------------------------
 
 CPRNC_FIELDLISTS_DIFFER = "files differ only in their field lists"
+CPRNC_HASHES_MATCH = "content hashes match"
 
 # ------------------------------------------------------------------------
 # Strings used in the comments generated by _compare_hists
@@ -68,10 +74,11 @@ def copy_histfiles(case, suffix):
     archive = case.get_env("archive")
     comments = "Copying hist files to suffix '{}'\n".format(suffix)
     num_copied = 0
+    rundir_index = RunDirIndex(rundir)
     for model in _iter_model_file_substrs(case):
         comments += "  Copying hist files for model '{}'\n".format(model)
         test_hists = archive.get_latest_hist_files(
-            casename, model, rundir, ref_case=ref_case
+            casename, model, rundir, ref_case=ref_case, dir_index=rundir_index
         )
         num_copied += len(test_hists)
         for test_hist in test_hists:
@@ -98,6 +105,7 @@ def copy_histfiles(case, suffix):
             # by run2. But we live with that downside for the sake of the reason
             # noted above.)
             safe_copy(test_hist, new_file)
+            rundir_index.add(os.path.basename(new_file))
 
     expect(
         num_copied > 0,
@@ -119,6 +127,7 @@ def rename_all_hist_files(case, suffix):
     archive = case.get_env("archive")
     comments = "Renaming hist files by adding suffix '{}'\n".format(suffix)
     num_renamed = 0
+    rundir_index = RunDirIndex(rundir)
     for model in _iter_model_file_substrs(case):
         comments += "  Renaming hist files for model '{}'\n".format(model)
 
@@ -127,7 +136,11 @@ def rename_all_hist_files(case, suffix):
         else:
             mname = model
         test_hists = archive.get_all_hist_files(
-            case.get_value("CASE"), mname, rundir, ref_case=ref_case
+            case.get_value("CASE"),
+            mname,
+            rundir,
+            ref_case=ref_case,
+            dir_index=rundir_index,
         )
         num_renamed += len(test_hists)
         for test_hist in test_hists:
@@ -139,6 +152,7 @@ def rename_all_hist_files(case, suffix):
             comments += "    Renaming '{}' to '{}'\n".format(test_hist, new_file)
 
             os.rename(test_hist, new_file)
+            rundir_index.rename(os.path.basename(test_hist), os.path.basename(new_file))
 
     expect(
         num_renamed > 0,
@@ -256,6 +270,19 @@ def _hists_match(model, hists1, hists2, suffix1="", suffix2=""):
     return one_not_two, two_not_one, match_ups
 
 
+def _get_cprnc_jobs(cprnc_jobs):
+    """
+    Return the number of cprnc comparisons to run at the same time: cprnc_jobs
+    if given, else $CIME_CPRNC_JOBS, else the number of available cores.
+    """
+    if cprnc_jobs is None:
+        cprnc_jobs = os.environ.get("CIME_CPRNC_JOBS")
+    if cprnc_jobs is None:
+        cprnc_jobs = os.cpu_count() or 1
+
+    return max(1, int(cprnc_jobs))
+
+
 def _compare_hists(
     case,
     from_dir1,
@@ -264,6 +291,8 @@ def _compare_hists(
     suffix2="",
     outfile_suffix="",
     ignore_fieldlist_diffs=False,
+    cprnc_jobs=None,
+    hashes2=None,
 ):
     if from_dir1 == from_dir2:
         expect(suffix1 != suffix2, "Comparing files to themselves?")
@@ -271,6 +300,7 @@ def _compare_hists(
     casename = case.get_value("CASE")
     testcase = case.get_value("TESTCASE")
     casedir = case.get_value("CASEROOT")
+    cprnc_exe = case.get_value("CCSM_CPRNC")
     all_success = True
     num_compared = 0
     comments = "Comparing hists for case '{}' dir1='{}', suffix1='{}',  dir2='{}' suffix2='{}'\n".format(
@@ -279,19 +309,36 @@ def _compare_hists(
     multiinst_driver_compare = False
     archive = case.get_env("archive")
     ref_case = case.get_value("RUN_REFCASE")
+    dir_index1 = RunDirIndex(from_dir1)
+    dir_index2 = dir_index1 if from_dir2 == from_dir1 else RunDirIndex(from_dir2)
+
+    # Find all of the comparisons first, the comments for each model are
+    # completed once its cprnc comparisons have run
+    model_comments = []  # list of (comments, list of comparisons)
     for model in _iter_model_file_substrs(case):
         if model == "cpl" and suffix2 == "multiinst":
             multiinst_driver_compare = True
-        comments += "  comparing model '{}'\n".format(model)
+        model_comment = "  comparing model '{}'\n".format(model)
         hists1 = archive.get_latest_hist_files(
-            casename, model, from_dir1, suffix=suffix1, ref_case=ref_case
+            casename,
+            model,
+            from_dir1,
+            suffix=suffix1,
+            ref_case=ref_case,
+            dir_index=dir_index1,
         )
         hists2 = archive.get_latest_hist_files(
-            casename, model, from_dir2, suffix=suffix2, ref_case=ref_case
+            casename,
+            model,
+            from_dir2,
+            suffix=suffix2,
+            ref_case=ref_case,
+            dir_index=dir_index2,
         )
 
         if len(hists1) == 0 and len(hists2) == 0:
-            comments += "    no hist files found for model {}\n".format(model)
+            model_comment += "    no hist files found for model {}\n".format(model)
+            model_comments.append((model_comment, []))
             continue
 
         one_not_two, two_not_one, match_ups = _hists_match(
@@ -300,7 +347,7 @@ def _compare_hists(
         for item in one_not_two:
             if "initial" in item:
                 continue
-            comments += "    File '{}' {} in '{}' with suffix '{}'\n".format(
+            model_comment += "    File '{}' {} in '{}' with suffix '{}'\n".format(
                 item, NO_COMPARE, from_dir2, suffix2
             )
             all_success = False
@@ -308,34 +355,73 @@ def _compare_hists(
         for item in two_not_one:
             if "initial" in item:
                 continue
-            comments += "    File '{}' {} in '{}' with suffix '{}'\n".format(
+            model_comment += "    File '{}' {} in '{}' with suffix '{}'\n".format(
                 item, NO_ORIGINAL, from_dir1, suffix1
             )
             all_success = False
 
         num_compared += len(match_ups)
 
+        comparisons = []
         for hist1, hist2 in match_ups:
             if not ".nc" in hist1:
                 logger.info("Ignoring non-netcdf file {}".format(hist1))
                 continue
-            success, cprnc_log_file, cprnc_comment = cprnc(
-                model,
-                os.path.join(from_dir1, hist1),
-                os.path.join(from_dir2, hist2),
-                case,
-                from_dir1,
-                multiinst_driver_compare=multiinst_driver_compare,
-                outfile_suffix=outfile_suffix,
-                ignore_fieldlist_diffs=ignore_fieldlist_diffs,
-            )
+            comparisons.append((model, hist1, hist2, multiinst_driver_compare))
+
+        model_comments.append((model_comment, comparisons))
+
+    def run_cprnc(comparison):
+        model, hist1, hist2, multiinst_driver_compare = comparison
+        t1 = time.time()
+        result = cprnc(
+            model,
+            os.path.join(from_dir1, hist1),
+            os.path.join(from_dir2, hist2),
+            case,
+            from_dir1,
+            multiinst_driver_compare=multiinst_driver_compare,
+            outfile_suffix=outfile_suffix,
+            ignore_fieldlist_diffs=ignore_fieldlist_diffs,
+            cprnc_exe=cprnc_exe,
+            expected_hash=hashes2.get(hist2) if hashes2 else None,
+        )
+        return result + (time.time() - t1,)
+
+    all_comparisons = [
+        comparison for _, comparisons in model_comments for comparison in comparisons
+    ]
+    num_jobs = min(_get_cprnc_jobs(cprnc_jobs), len(all_comparisons))
+    if num_jobs > 1:
+        pool = ThreadPool(num_jobs)
+        try:
+            results = pool.map(run_cprnc, all_comparisons)
+        finally:
+            pool.close()
+            pool.join()
+    else:
+        results = [run_cprnc(comparison) for comparison in all_comparisons]
+
+    # Assemble the comments in the same order as the comparisons were found
+    results = iter(results)
+    for model_comment, comparisons in model_comments:
+        comments += model_comment
+        for _, hist1, hist2, _ in comparisons:
+            success, cprnc_log_file, cprnc_comment, walltime = next(results)
+            timing = " ({:.2f} seconds)".format(walltime)
+            if cprnc_comment == CPRNC_HASHES_MATCH:
+                timing = " ({}, {:.2f} seconds)".format(cprnc_comment, walltime)
             if success:
-                comments += "    {} matched {}\n".format(hist1, hist2)
+                comments += "    {} matched {}{}\n".format(hist1, hist2, timing)
             else:
                 if cprnc_comment == CPRNC_FIELDLISTS_DIFFER:
-                    comments += "    {} {} {}\n".format(hist1, FIELDLISTS_DIFFER, hist2)
+                    comments += "    {} {} {}{}\n".format(
+                        hist1, FIELDLISTS_DIFFER, hist2, timing
+                    )
                 else:
-                    comments += "    {} {} {}\n".format(hist1, DIFF_COMMENT, hist2)
+                    comments += "    {} {} {}{}\n".format(
+                        hist1, DIFF_COMMENT, hist2, timing
+                    )
                 comments += "    cat " + cprnc_log_file + "\n"
                 expected_log_file = os.path.join(
                     casedir, os.path.basename(cprnc_log_file)
@@ -362,7 +448,7 @@ def _compare_hists(
     return all_success, comments
 
 
-def compare_test(case, suffix1, suffix2, ignore_fieldlist_diffs=False):
+def compare_test(case, suffix1, suffix2, ignore_fieldlist_diffs=False, cprnc_jobs=None):
     """
     Compares two sets of component history files in the testcase directory
 
@@ -373,6 +459,8 @@ def compare_test(case, suffix1, suffix2, ignore_fieldlist_diffs=False):
         field lists (i.e., all shared fields are bit-for-bit, but one case has some
         diagnostic fields that are missing from the other case), treat the two cases as
         identical.
+    cprnc_jobs - The number of cprnc comparisons to run at the same time, defaults
+        to $CIME_CPRNC_JOBS or the number of available cores
 
     returns (SUCCESS, comments)
     """
@@ -385,6 +473,7 @@ def compare_test(case, suffix1, suffix2, ignore_fieldlist_diffs=False):
         suffix1,
         suffix2,
         ignore_fieldlist_diffs=ignore_fieldlist_diffs,
+        cprnc_jobs=cprnc_jobs,
     )
 
 
@@ -398,6 +487,7 @@ def cprnc(
     outfile_suffix="",
     ignore_fieldlist_diffs=False,
     cprnc_exe=None,
+    expected_hash=None,
 ):
     """
     Run cprnc to compare two individual nc files
@@ -406,6 +496,8 @@ def cprnc(
     file2 - the full or relative path of the second file
     case - the case containing the files
     rundir - the rundir for the case
+    cprnc_exe - the cprnc executable, defaults to CCSM_CPRNC. If it is "python",
+        the files are compared in python by CIME.nccompare instead.
     outfile_suffix - if non-blank, then the output file name ends with this
         suffix (with a '.' added before the given suffix).
         Use None to avoid permissions issues in the case dir.
@@ -413,6 +505,8 @@ def cprnc(
         field lists (i.e., all shared fields are bit-for-bit, but one case has some
         diagnostic fields that are missing from the other case), treat the two cases as
         identical.
+    expected_hash - the hash_file content hash of file2 if it is known. If the
+        hash of file1 is the same, the files match and cprnc is not run.
 
     returns (True if the files matched, log_name, comment)
         where 'comment' is either an empty string or one of the module-level constants
@@ -439,6 +533,22 @@ def cprnc(
     if outfile_suffix:
         output_filename += ".{}".format(outfile_suffix)
 
+    if expected_hash is not None and _hash_hist_file(file1) == expected_hash:
+        # Do not leave the output of an earlier comparison behind
+        if outfile_suffix is not None and os.path.exists(output_filename):
+            os.remove(output_filename)
+        return (True, output_filename, CPRNC_HASHES_MATCH)
+
+    if cprnc_exe == NATIVE_CPRNC:
+        return _compare_files_native(
+            file1,
+            file2,
+            output_filename,
+            multiinst_driver_compare=multiinst_driver_compare,
+            save_output=outfile_suffix is not None,
+            ignore_fieldlist_diffs=ignore_fieldlist_diffs,
+        )
+
     if outfile_suffix is None:
         cpr_stat, out, _ = run_cmd(
             "{} -m {} {}".format(cprnc_exe, file1, file2), combine_output=True
@@ -490,7 +600,119 @@ def cprnc(
     return (files_match, output_filename, comment)
 
 
-def compare_baseline(case, baseline_dir=None, outfile_suffix=""):
+def _hash_hist_file(path):
+    """
+    Returns the hash_file content hash of hist file path, None if it can't be
+    computed
+    """
+    if not has_netcdf4:
+        return None
+
+    try:
+        return hash_file(path)
+    except (OSError, RuntimeError) as e:
+        logger.debug("Could not hash {}: {}".format(path, e))
+        return None
+
+
+def _write_baseline_hashes(basegen_dir, baselines):
+    """
+    Record the content hash of each of the baseline files, together with the
+    size and modification time of the file so a hash is not used once the
+    baseline has been replaced by other means than generate_baseline.
+    """
+    hashes = {}
+    for baseline in baselines:
+        checksum = _hash_hist_file(baseline)
+        if checksum is not None:
+            stat = os.stat(baseline)
+            hashes[os.path.basename(baseline)] = {
+                "hash": checksum,
+                "size": stat.st_size,
+                "mtime_ns": stat.st_mtime_ns,
+            }
+
+    if hashes:
+        with open(
+            os.path.join(basegen_dir, BASELINE_HASHES_NAME), "w", encoding="utf-8"
+        ) as fd:
+            json.dump(hashes, fd, indent=1, sort_keys=True)
+
+
+def _read_baseline_hashes(basecmp_dir):
+    """
+    Returns a dict of baseline file name to content hash for the baseline files
+    in basecmp_dir that have not changed since their hash was recorded
+    """
+    hashes_file = os.path.join(basecmp_dir, BASELINE_HASHES_NAME)
+    if not has_netcdf4 or not os.path.isfile(hashes_file):
+        return {}
+
+    try:
+        with open(hashes_file, "r", encoding="utf-8") as fd:
+            hashes = json.load(fd)
+    except (OSError, ValueError) as e:
+        logger.warning("Ignoring unreadable {}: {}".format(hashes_file, e))
+        return {}
+
+    result = {}
+    for name, entry in hashes.items():
+        try:
+            stat = os.stat(os.path.join(basecmp_dir, name))
+        except OSError:
+            continue
+        if stat.st_size == entry["size"] and stat.st_mtime_ns == entry["mtime_ns"]:
+            result[name] = entry["hash"]
+
+    return result
+
+
+def _compare_files_native(
+    file1,
+    file2,
+    output_filename,
+    multiinst_driver_compare=False,
+    save_output=True,
+    ignore_fieldlist_diffs=False,
+):
+    """
+    Compare two nc files with nccompare instead of the cprnc executable, same
+    arguments and return value as cprnc
+    """
+    # The full comparison is only needed for the report or to tell variables
+    # with different dimensions from real differences
+    stop_on_diff = not save_output and not multiinst_driver_compare
+    try:
+        result = compare_files(file1, file2, stop_on_diff=stop_on_diff)
+        out = result.report()
+    except (OSError, RuntimeError) as e:
+        result = None
+        out = "Could not compare {} and {}: {}\n".format(file1, file2, e)
+
+    if save_output:
+        with open(output_filename, "w", encoding="utf-8") as fd:
+            fd.write(out)
+
+    comment = ""
+    if result is None:
+        files_match = False
+    elif multiinst_driver_compare:
+        # see cprnc, only the fields that could be compared need to match
+        files_match = not result.has_value_diffs()
+    elif result.identical():
+        files_match = True
+    elif result.var_diffs:
+        files_match = False
+    elif ignore_fieldlist_diffs:
+        files_match = True
+    else:
+        files_match = False
+        comment = CPRNC_FIELDLISTS_DIFFER
+
+    return (files_match, output_filename, comment)
+
+
+def compare_baseline(case, baseline_dir=None, outfile_suffix="", cprnc_jobs=None):
     """
     compare the current test output to a baseline result
 
@@ -498,6 +720,10 @@ def compare_baseline(case, baseline_dir=None, outfile_suffix=""):
     baseline_dir - Optionally, specify a specific baseline dir, otherwise it will be computed from case config
     outfile_suffix - if non-blank, then the cprnc output file name ends with
         this suffix (with a '.' added before the given suffix). if None, no output file saved.
+    Hist files whose content hash matches the one recorded by generate_baseline
+        are not compared with cprnc.
+    cprnc_jobs - The number of cprnc comparisons to run at the same time, defaults
+        to $CIME_CPRNC_JOBS or the number of available cores
 
     returns (SUCCESS, comments)
     SUCCESS means all hist files matched their corresponding baseline
@@ -518,7 +744,12 @@ def compare_baseline(case, baseline_dir=None, outfile_suffix=""):
             )
 
     success, comments = _compare_hists(
-        case, rundir, basecmp_dir, outfile_suffix=outfile_suffix
+        case,
+        rundir,
+        basecmp_dir,
+        outfile_suffix=outfile_suffix,
+        cprnc_jobs=cprnc_jobs,
+        hashes2=_read_baseline_hashes(basecmp_dir),
     )
     if get_model() == "e3sm":
         bless_log = os.path.join(basecmp_dir, BLESS_LOG_NAME)
@@ -584,8 +815,15 @@ def _generate_baseline_impl(case, baseline_dir=None, allow_baseline_overwrite=Fa
     ):
         expect(False, " Cowardly refusing to overwrite existing baseline directory")
 
+    # The hashes of the previous baselines must not outlive them
+    hashes_file = os.path.join(basegen_dir, BASELINE_HASHES_NAME)
+    if os.path.exists(hashes_file):
+        os.remove(hashes_file)
+
     comments = "Generating baselines into '{}'\n".format(basegen_dir)
     num_gen = 0
+    baselines = []
+    rundir_index = RunDirIndex(rundir)
     for model in _iter_model_file_substrs(case):
 
         if model == "ww3dev":
@@ -593,7 +831,7 @@ def _generate_baseline_impl(case, baseline_dir=None, allow_baseline_overwrite=Fa
         comments += "  generating for model '{}'\n".format(model)
 
         hists = archive.get_latest_hist_files(
-            testcase, model, rundir, ref_case=ref_case
+            testcase, model, rundir, ref_case=ref_case, dir_index=rundir_index
         )
         logger.debug("latest_files: {}".format(hists))
         num_gen += len(hists)
@@ -607,10 +845,14 @@ def _generate_baseline_impl(case, baseline_dir=None, allow_baseline_overwrite=Fa
                 os.remove(baseline)
 
             safe_copy(os.path.join(rundir, hist), baseline, preserve_meta=False)
+            if baseline.endswith(".nc"):
+                baselines.append(baseline)
             comments += "    generating baseline '{}' from file {}\n".format(
                 baseline, hist
             )
 
+    _write_baseline_hashes(basegen_dir, baselines)
+
     # copy latest cpl log to baseline
     # drop the date so that the name is generic
     if case.get_value("COMP_INTERFACE") == "nuopc":
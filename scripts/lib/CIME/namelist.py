@@ -107,7 +107,7 @@ import collections
 # pylint: disable=wildcard-import,unused-wildcard-import
 
 from CIME.XML.standard_module_setup import *
-from CIME.utils import expect, string_in_list
+from CIME.utils import expect
 import six
 
 logger = logging.getLogger(__name__)
@@ -918,6 +918,9 @@ class Namelist(object):
         safer to use `parse` than to directly call this constructor.
         """
         self._groups = {}
+        # Lowercase name -> name maps of the group names (key None) and of the
+        # variable names of each group, built on first use by _find_name
+        self._name_maps = {}
         if groups is not None:
             for group_name in groups:
                 expect(group_name is not None, " Got None in groups {}".format(groups))
@@ -929,6 +932,29 @@ class Namelist(object):
 
     def clean_groups(self):
         self._groups = collections.OrderedDict()
+        self._name_maps = {}
+
+    def _find_name(self, name, group_name=None):
+        """Case insensitive search for a group name or, if `group_name` is
+        given, for a variable name of that existing group.
+
+        Returns the first matching name, or None, like CIME.utils.string_in_list
+        but without scanning all names, so that filling a large namelist one
+        variable at a time is not quadratic.
+        """
+        name_map = self._name_maps.get(group_name)
+        if name_map is None:
+            names = self._groups if group_name is None else self._groups[group_name]
+            name_map = {}
+            for existing in names:
+                name_map.setdefault(existing.lower(), existing)
+            self._name_maps[group_name] = name_map
+        return name_map.get(name.lower())
+
+    def _add_name(self, name, group_name=None):
+        name_map = self._name_maps.get(group_name)
+        if name_map is not None:
+            name_map.setdefault(name.lower(), name)
 
     def get_group_names(self):
         """Return a list of all groups in the namelist.
@@ -957,7 +983,7 @@ class Namelist(object):
         >>> sorted(x.get_variable_names('fOo'))
         ['bar(::)', 'bazz', 'bazz(2)', 'bazz(:2:)']
         """
-        gn = string_in_list(group_name, self._groups)
+        gn = self._find_name(group_name)
         if not gn:
             return []
         return list(self._groups[gn].keys())
@@ -976,9 +1002,9 @@ class Namelist(object):
         >>> parse(text='&foo bar=1,2 /').get_variable_value('foO', 'Bar')
         ['1', '2']
         """
-        gn = string_in_list(group_name, self._groups)
+        gn = self._find_name(group_name)
         if gn:
-            vn = string_in_list(variable_name, self._groups[gn])
+            vn = self._find_name(variable_name, gn)
             if vn:
                 # Make a copy of the list so that any modifications done by the caller
                 # don't modify the internal values.
@@ -1006,7 +1032,7 @@ class Namelist(object):
         possible_groups = []
         vn = None
         for group_name in self._groups:
-            vnt = string_in_list(variable_name, self._groups[group_name])
+            vnt = self._find_name(variable_name, group_name)
             if vnt:
                 vn = vnt
                 possible_groups.append(group_name)
@@ -1054,19 +1080,21 @@ class Namelist(object):
                 minindex
             ),
         )
-        gn = string_in_list(group_name, self._groups)
+        gn = self._find_name(group_name)
         if not gn:
             gn = group_name
             self._groups[gn] = {}
+            self._add_name(gn)
 
         tlen = 1
-        vn = string_in_list(variable_name, self._groups[gn])
+        vn = self._find_name(variable_name, gn)
         if vn:
             tlen = len(self._groups[gn][vn])
         else:
             vn = variable_name
             tlen = 1
             self._groups[gn][vn] = [""]
+            self._add_name(vn, gn)
 
         if minindex > tlen:
             self._groups[gn][vn].extend([""] * (minindex - tlen - 1))
@@ -1092,11 +1120,13 @@ class Namelist(object):
         >>> x.get_variable_names('brack')
         []
         """
-        gn = string_in_list(group_name, self._groups)
+        gn = self._find_name(group_name)
         if gn:
-            vn = string_in_list(variable_name, self._groups[gn])
+            vn = self._find_name(variable_name, gn)
             if vn:
                 del self._groups[gn][vn]
+                # another spelling of the name may be left
+                self._name_maps.pop(gn, None)
 
     def merge_nl(self, other, overwrite=False):
         """Merge this namelist object with another.
@@ -0,0 +1,242 @@
+"""
+Compare two netCDF files in python, an alternative to the cprnc executable.
+
+Setting CCSM_CPRNC to "python" makes hist_utils.cprnc use compare_files
+instead of running cprnc. This requires the netCDF4 and numpy packages.
+"""
+from CIME.XML.standard_module_setup import *
+from collections import namedtuple
+import hashlib, itertools
+
+# pylint: disable=import-error
+try:
+    import numpy
+    import netCDF4
+
+    has_netcdf4 = True
+except ImportError:
+    has_netcdf4 = False
+
+logger = logging.getLogger(__name__)
+
+# The CCSM_CPRNC value that selects compare_files
+NATIVE_CPRNC = "python"
+
+# The maximum number of elements of a variable read from each file at a time
+MAX_CHUNK_ELEMENTS = 1 << 22
+
+# A shared variable that differs, num_diffs is None if the variables could not
+# be compared because their shapes or types differ
+VarDiff = namedtuple("VarDiff", ["name", "num_diffs", "max_abs_diff", "rms_diff"])
+
+
+class CompareResult(object):
+    """
+    The result of comparing two netCDF files
+    """
+
+    def __init__(self, file1, file2, only_in_file1, only_in_file2):
+        self.file1 = file1
+        self.file2 = file2
+        self.only_in_file1 = only_in_file1
+        self.only_in_file2 = only_in_file2
+        self.var_diffs = []
+        self.num_compared = 0
+        # False if the comparison stopped at the first differing variable
+        self.complete = True
+
+    def fieldlists_differ(self):
+        return bool(self.only_in_file1 or self.only_in_file2)
+
+    def has_value_diffs(self):
+        """
+        True if any shared variable that could be compared has differences
+        """
+        return any(var_diff.num_diffs is not None for var_diff in self.var_diffs)
+
+    def identical(self):
+        return not self.var_diffs and not self.fieldlists_differ()
+
+    def summary(self):
+        """
+        The summary line, using the wording of cprnc
+        """
+        if self.identical():
+            return "the two files seem to be IDENTICAL"
+        elif not self.var_diffs:
+            return "the two files DIFFER only in their field lists"
+        else:
+            return "the two files seem to be DIFFERENT"
+
+    def report(self):
+        lines = ["file 1: {}".format(self.file1), "file 2: {}".format(self.file2)]
+        for name in self.only_in_file1:
+            lines.append("variable {} only found in file 1".format(name))
+        for name in self.only_in_file2:
+            lines.append("variable {} only found in file 2".format(name))
+        for var_diff in self.var_diffs:
+            if var_diff.num_diffs is None:
+                lines.append(
+                    "variable {} has different dimensions or type".format(var_diff.name)
+                )
+            else:
+                lines.append(
+                    "variable {} has {:d} differences, max abs diff {:g}, rms diff {:g}".format(
+                        *var_diff
+                    )
+                )
+
+        lines.append(
+            "{:d} variables compared, {:d} had non-zero differences{}".format(
+                self.num_compared,
+                sum(1 for var_diff in self.var_diffs if var_diff.num_diffs),
+                "" if self.complete else ", stopped at first difference",
+            )
+        )
+        lines.append(self.summary())
+        return "\n".join(lines) + "\n"
+
+
+def _iter_chunks(variables, max_chunk_elements):
+    """
+    Yield the data of the equally shaped variables in matching chunks of at
+    most max_chunk_elements elements, in C order. The inner dimensions that
+    fit are read whole, the next one in slices and the outer ones one index
+    at a time.
+    """
+    shape = variables[0].shape
+    if not shape:
+        yield [numpy.asarray(var[...]) for var in variables]
+        return
+
+    dim = len(shape) - 1
+    inner_size = 1
+    while dim > 0 and inner_size * shape[dim] <= max_chunk_elements:
+        inner_size *= shape[dim]
+        dim -= 1
+    step = max(1, max_chunk_elements // max(1, inner_size))
+    for outer in itertools.product(*[range(size) for size in shape[:dim]]):
+        outer_index = tuple(slice(idx, idx + 1) for idx in outer)
+        for start in range(0, shape[dim], step):
+            index = outer_index + (slice(start, start + step),)
+            yield [numpy.asarray(var[index]) for var in variables]
+
+
+def _compare_variable(name, var1, var2, stop_on_diff, max_chunk_elements):
+    """
+    Returns a VarDiff if the variables differ, None if they are identical
+    """
+    if var1.shape != var2.shape or var1.dtype != var2.dtype:
+        return VarDiff(name, None, None, None)
+
+    numeric = numpy.issubdtype(var1.dtype, numpy.number)
+    num_diffs = 0
+    num_values = 0
+    max_abs_diff = 0.0
+    sum_squares = 0.0
+    for data1, data2 in _iter_chunks([var1, var2], max_chunk_elements):
+        num_values += data1.size
+        if data1.dtype != object and data1.tobytes() == data2.tobytes():
+            continue
+
+        if numeric:
+            diff_mask = data1 != data2
+            if numpy.issubdtype(data1.dtype, numpy.floating):
+                diff_mask &= ~(numpy.isnan(data1) & numpy.isnan(data2))
+            diffs = numpy.abs(
+                data1[diff_mask].astype(numpy.float64)
+                - data2[diff_mask].astype(numpy.float64)
+            )
+            diffs[numpy.isnan(diffs)] = numpy.inf
+            if diffs.size:
+                max_abs_diff = max(max_abs_diff, float(diffs.max()))
+                sum_squares += float(numpy.sum(diffs * diffs))
+            num_diffs += int(diffs.size)
+        else:
+            num_diffs += int(numpy.count_nonzero(data1 != data2))
+
+        if num_diffs and stop_on_diff:
+            break
+
+    if not num_diffs:
+        return None
+
+    rms_diff = (sum_squares / num_values) ** 0.5 if numeric else 0.0
+    return VarDiff(name, num_diffs, max_abs_diff if numeric else 0.0, rms_diff)
+
+
+def compare_files(
+    file1, file2, stop_on_diff=False, max_chunk_elements=MAX_CHUNK_ELEMENTS
+):
+    """
+    Compare the variables of two netCDF files, returns a CompareResult.
+
+    Variables are read in chunks of at most max_chunk_elements elements so
+    memory use does not depend on the size of the files. The raw values in
+    the files are compared bit-for-bit, without applying fill values or scale
+    factors. If stop_on_diff, the comparison stops at the first variable that
+    differs, use this when only pass/fail is needed.
+    """
+    expect(
+        has_netcdf4,
+        "Comparing netCDF files in python requires the netCDF4 and numpy packages",
+    )
+    with netCDF4.Dataset(file1) as ds1, netCDF4.Dataset(file2) as ds2:
+        ds1.set_auto_maskandscale(False)
+        ds2.set_auto_maskandscale(False)
+        names1 = list(ds1.variables)
+        names2 = list(ds2.variables)
+        result = CompareResult(
+            file1,
+            file2,
+            [name for name in names1 if name not in ds2.variables],
+            [name for name in names2 if name not in ds1.variables],
+        )
+        for name in names1:
+            if name not in ds2.variables:
+                continue
+
+            result.num_compared += 1
+            var_diff = _compare_variable(
+                name,
+                ds1.variables[name],
+                ds2.variables[name],
+                stop_on_diff,
+                max_chunk_elements,
+            )
+            if var_diff is not None:
+                result.var_diffs.append(var_diff)
+                if stop_on_diff:
+                    result.complete = False
+                    break
+
+    return result
+
+
+def hash_file(path, max_chunk_elements=MAX_CHUNK_ELEMENTS):
+    """
+    Returns the sha256 hex digest of the variables of netCDF file path: their
+    names, dimensions, types and raw values. Attributes are not included, the
+    history and date attributes differ between otherwise identical files and,
+    as for compare_files, attributes do not make files differ.
+    """
+    expect(
+        has_netcdf4,
+        "Hashing netCDF files in python requires the netCDF4 and numpy packages",
+    )
+    checksum = hashlib.sha256()
+    with netCDF4.Dataset(path) as ds:
+        ds.set_auto_maskandscale(False)
+        for name, var in ds.variables.items():
+            checksum.update(
+                "{} {} {} {}\n".format(
+                    name, var.dimensions, var.shape, var.dtype
+                ).encode("utf-8")
+            )
+            for (data,) in _iter_chunks([var], max_chunk_elements):
+                if data.dtype == object:
+                    checksum.update(repr(data.tolist()).encode("utf-8"))
+                else:
+                    checksum.update(data.tobytes())
+
+    return checksum.hexdigest()
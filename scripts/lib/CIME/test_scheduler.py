@@ -44,6 +44,7 @@ from CIME.locked_files import lock_file
 from CIME.cs_status_creator import create_cs_status
 from CIME.hist_utils import generate_teststatus
 from CIME.build import post_build
+from CIME.warm_worker import WarmWorker
 
 logger = logging.getLogger(__name__)
 
@@ -205,6 +206,7 @@ class TestScheduler(object):
         single_exe=False,
         workflow=None,
         chksum=False,
+        warm_worker=False,
     ):
         ###########################################################################
         self._cime_root = get_cime_root()
@@ -452,6 +454,9 @@ class TestScheduler(object):
                 )
 
         self._chksum = chksum
+        # Run the case scripts in a WarmWorker instead of new interpreters
+        self._use_warm_worker = warm_worker
+        self._warm_worker = None
         # By the end of this constructor, this program should never hard abort,
         # instead, errors will be placed in the TestStatus files for the various
         # tests cases
@@ -560,11 +565,20 @@ class TestScheduler(object):
         # Must be atomic
         self._tests[test] = (phase, status)
 
+    ###########################################################################
+    def _run_cmd(self, cmd, from_dir=None, combine_output=False):
+        ###########################################################################
+        if self._warm_worker is not None:
+            return self._warm_worker.run_cmd(
+                cmd, from_dir=from_dir, combine_output=combine_output
+            )
+        return run_cmd(cmd, from_dir=from_dir, combine_output=combine_output)
+
     ###########################################################################
     def _shell_cmd_for_phase(self, test, cmd, phase, from_dir=None):
         ###########################################################################
         while True:
-            rc, output, errput = run_cmd(cmd, from_dir=from_dir)
+            rc, output, errput = self._run_cmd(cmd, from_dir=from_dir)
             if rc != 0:
                 self._log_output(
                     test,
@@ -969,7 +983,7 @@ class TestScheduler(object):
 
         # It's OK for this command to fail with baseline diffs but not catastrophically
         if rv[0]:
-            cmdstat, output, _ = run_cmd(
+            cmdstat, output, _ = self._run_cmd(
                 "./case.cmpgen_namelists", combine_output=True, from_dir=test_dir
             )
             expect(
@@ -1399,9 +1413,18 @@ class TestScheduler(object):
         # Setup cs files
         self._setup_cs_files()
 
+        if self._use_warm_worker:
+            # Must be forked before the producer starts any threads
+            self._warm_worker = WarmWorker(comp_interface=self._cime_driver)
+
         GenericXML.DISABLE_CACHING = True
-        self._producer()
-        GenericXML.DISABLE_CACHING = False
+        try:
+            self._producer()
+        finally:
+            GenericXML.DISABLE_CACHING = False
+            if self._warm_worker is not None:
+                self._warm_worker.close()
+                self._warm_worker = None
 
         expect(threading.active_count() == 1, "Leftover threads?")
 
@@ -0,0 +1,9 @@
+import atexit
+import shutil
+import tempfile
+
+from CIME.XML.generic_xml import GenericXML
+
+# Keep the XML disk cache entries of the tests out of the user's ~/.cime
+GenericXML.DISK_CACHE_DIR = tempfile.mkdtemp(prefix="cime_xml_cache_")
+atexit.register(shutil.rmtree, GenericXML.DISK_CACHE_DIR, ignore_errors=True)
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+from CIME import utils
+from distutils.spawn import find_executable  # pylint: disable=import-error
+
+from CIME.build import (
+    _BuildScheduler,
+    _get_dir_stamps,
+    _get_sharedlib_cache_roots,
+    _get_source_tree_state,
+    _is_clean_build_dir,
+    _is_sharedlib_cached,
+    _restore_sharedlib,
+    _store_sharedlib,
+)
+
+# pylint: disable=protected-access
+
+
+class TestBuildScheduler(unittest.TestCase):
+    def setUp(self):
+        self._lock = threading.Lock()
+        self._jobs_in_use = 0
+        self._max_jobs_in_use = 0
+        self._built = []
+
+    def _build(self, name, fail=False):
+        def build(jobs):
+            with self._lock:
+                self._jobs_in_use += jobs
+                self._max_jobs_in_use = max(self._max_jobs_in_use, self._jobs_in_use)
+            time.sleep(0.05)
+            with self._lock:
+                self._jobs_in_use -= jobs
+                self._built.append(name)
+            utils.expect(not fail, "BUILD FAIL: {}".format(name))
+
+        return build
+
+    def test_dependency_order(self):
+        scheduler = _BuildScheduler(8)
+        scheduler.add_target("csm_share", self._build("csm_share"), deps=["mct", "pio"])
+        scheduler.add_target("pio", self._build("pio"), deps=["gptl", "mpi-serial"])
+        scheduler.add_target("gptl", self._build("gptl"))
+        scheduler.add_target("mct", self._build("mct"))
+
+        walltimes = scheduler.run()
+
+        assert sorted(walltimes) == ["csm_share", "gptl", "mct", "pio"]
+        assert self._built.index("pio") > self._built.index("gptl")
+        assert self._built[-1] == "csm_share"
+
+    def test_job_budget(self):
+        scheduler = _BuildScheduler(3)
+        for idx in range(10):
+            scheduler.add_target("comp{}".format(idx), self._build(idx))
+
+        ts = time.time()
+        scheduler.run()
+
+        assert len(self._built) == 10
+        assert self._max_jobs_in_use == 3
+        # targets ran concurrently
+        assert time.time() - ts < 0.5
+
+    def test_failure_skips_dependents(self):
+        scheduler = _BuildScheduler(2)
+        scheduler.add_target("gptl", self._build("gptl", fail=True))
+        scheduler.add_target("pio", self._build("pio"), deps=["gptl"])
+        scheduler.add_target("csm_share", self._build("csm_share"), deps=["pio"])
+        scheduler.add_target("mct", self._build("mct"))
+
+        with self.assertRaisesRegex(utils.CIMEError, "csm_share not built"):
+            scheduler.run()
+
+        assert sorted(self._built) == ["gptl", "mct"]
+
+    def test_exclusive_target(self):
+        scheduler = _BuildScheduler(4)
+        for idx in range(3):
+            scheduler.add_target("comp{}".format(idx), self._build(idx))
+        scheduler.add_target("cached", self._build("cached"), exclusive=True)
+
+        scheduler.run()
+
+        assert len(self._built) == 4
+        assert self._built.index("cached") == 3
+
+
+class TestSharedlibCache(unittest.TestCase):
+    def setUp(self):
+        self._tempdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self._tempdir, ignore_errors=True)
+
+    def _write(self, path, content):
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        with open(path, "w") as fd:
+            fd.write(content)
+
+    def test_store_and_restore(self):
+        bldroot = os.path.join(self._tempdir, "case1", "bld", "gptl")
+        installpath = os.path.join(self._tempdir, "case1", "install")
+        cache_entry = os.path.join(self._tempdir, "cache", "gptl-1234")
+        self._write(os.path.join(installpath, "lib", "libmct.a"), "mct")
+
+        stamps = _get_dir_stamps(_get_sharedlib_cache_roots(installpath))
+        # build directory files refer to the case and are not cached
+        self._write(os.path.join(bldroot, "Makefile.conf"), bldroot)
+        self._write(os.path.join(installpath, "gptl", "gptl.o"), "object")
+        self._write(os.path.join(installpath, "lib", "libgptl.a"), "gptl")
+        self._write(os.path.join(installpath, "include", "gptl.mod"), "module")
+        _store_sharedlib(cache_entry, installpath, stamps)
+
+        installpath = os.path.join(self._tempdir, "case2", "install")
+        _restore_sharedlib(cache_entry, installpath)
+
+        assert sorted(_get_dir_stamps([installpath])) == [
+            os.path.join(installpath, "include", "gptl.mod"),
+            os.path.join(installpath, "lib", "libgptl.a"),
+        ]
+        with open(os.path.join(installpath, "lib", "libgptl.a")) as fd:
+            assert fd.read() == "gptl"
+
+    def test_empty_entry(self):
+        installpath = os.path.join(self._tempdir, "case1", "install")
+        cache_entry = os.path.join(self._tempdir, "cache", "mct-1234")
+        self._write(os.path.join(installpath, "lib", "libmct.a"), "mct")
+
+        # a rebuild that installs nothing new
+        stamps = _get_dir_stamps(_get_sharedlib_cache_roots(installpath))
+        _store_sharedlib(cache_entry, installpath, stamps)
+        assert not os.path.exists(cache_entry)
+
+        os.makedirs(cache_entry)
+        assert not _is_sharedlib_cached(cache_entry)
+        self._write(os.path.join(cache_entry, "lib", "libmct.a"), "mct")
+        assert _is_sharedlib_cached(cache_entry)
+
+    def test_clean_build_dir(self):
+        bldroot = os.path.join(self._tempdir, "bld", "mct")
+        os.makedirs(bldroot)
+        assert _is_clean_build_dir(bldroot)
+        # the mpi-serial build inside the mct build directory
+        self._write(os.path.join(bldroot, "mpi-serial", "mpi.o"), "object")
+        assert _is_clean_build_dir(bldroot)
+        self._write(os.path.join(bldroot, "mct", "Makefile"), "")
+        assert not _is_clean_build_dir(bldroot)
+
+    def _git(self, cmd, repo):
+        utils.run_cmd_no_fail(
+            "git -c user.name=test -c user.email=test@test {}".format(cmd),
+            from_dir=repo,
+        )
+
+    @unittest.skipIf(not find_executable("git"), "git is not available")
+    def test_source_tree_state(self):
+        srcroot = os.path.join(self._tempdir, "src")
+        external = os.path.join(srcroot, "libraries", "mct")
+        self._write(os.path.join(srcroot, ".gitignore"), "libraries/\ncase/\n")
+        self._write(os.path.join(external, "mct.F90"), "v1")
+        self._write(os.path.join(srcroot, "case", "env_build.xml"), "")
+        for repo in (srcroot, external):
+            self._git("init -q", repo)
+            self._git("add -A", repo)
+            self._git("commit -q -m init", repo)
+
+        def get_state():
+            return _get_source_tree_state(
+                [srcroot, os.path.join(srcroot, "cime")],
+                skip_dirs=[os.path.join(srcroot, "case")],
+            )
+
+        state = get_state()
+        assert sorted(state) == ["0:.", "0:libraries/mct"]
+
+        # the parent repository ignores the external
+        self._write(os.path.join(external, "mct.F90"), "v2")
+        assert get_state()["0:."] == state["0:."]
+        assert get_state() != state
+        self._git("commit -q -a -m update", external)
+        assert get_state() != state
+
+        # the content of untracked files
+        self._write(os.path.join(external, "new.F90"), "v1")
+        state = get_state()
+        self._write(os.path.join(external, "new.F90"), "v2")
+        assert get_state() != state
+        os.remove(os.path.join(external, "new.F90"))
+
+        # the skipped case directory is not searched
+        state = get_state()
+        os.makedirs(os.path.join(srcroot, "case", "bld", ".svn"))
+        assert get_state() == state
+
+        os.makedirs(os.path.join(srcroot, "libraries", "pio", ".svn"))
+        assert get_state() is None
+
+
+if __name__ == "__main__":
+    unittest.main()
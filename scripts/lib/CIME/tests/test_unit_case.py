@@ -7,6 +7,7 @@ import tempfile
 
 from CIME.case import case_submit
 from CIME.case import Case
+from CIME.case import case as case_module
 from CIME import utils as cime_utils
 
 
@@ -394,5 +395,158 @@ class TestCase_RecordCmd(unittest.TestCase):
         handle.writelines.assert_called_with(expected)
 
 
+@mock.patch.dict(os.environ, {"CIME_MODEL": "cesm"})
+class TestCaseResolvedValue(unittest.TestCase):
+    ENV_CASE = """<?xml version="1.0"?>
+<file id="env_case.xml" version="2.0">
+  <header>test case</header>
+  <group id="case_def">
+    <entry id="BASEROOT" value="/case">
+      <type>char</type>
+    </entry>
+    <entry id="EXEROOT" value="$BASEROOT/bld">
+      <type>char</type>
+    </entry>
+    <entry id="RUNDIR" value="$EXEROOT/run">
+      <type>char</type>
+    </entry>
+    <entry id="OTHER" value="other">
+      <type>char</type>
+    </entry>
+  </group>
+</file>
+"""
+
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        with open(os.path.join(self.tempdir.name, "env_case.xml"), "w") as fd:
+            fd.write(self.ENV_CASE)
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def test_resolved_value_cache(self):
+        with Case(self.tempdir.name, read_only=False) as case:
+            env_case = case.get_env("case")
+            with mock.patch.object(
+                env_case, "get_resolved_value", wraps=env_case.get_resolved_value
+            ) as get_resolved_value:
+                assert case.get_value("RUNDIR") == "/case/bld/run"
+                num_calls = get_resolved_value.call_count
+
+                assert case.get_value("RUNDIR") == "/case/bld/run"
+                assert get_resolved_value.call_count == num_calls
+
+                # Unrelated variables do not invalidate the value
+                case.set_value("OTHER", "changed")
+                assert case.get_value("RUNDIR") == "/case/bld/run"
+                assert get_resolved_value.call_count == num_calls
+
+            case.set_value("BASEROOT", "/newcase")
+            assert case.get_value("RUNDIR") == "/newcase/bld/run"
+
+            case.set_value("EXEROOT", "$BASEROOT/build")
+            assert case.get_value("RUNDIR") == "/newcase/build/run"
+
+            # Changes made directly to an env file are noticed too
+            env_case.set_value("BASEROOT", "/direct")
+            assert case.get_value("RUNDIR") == "/direct/build/run"
+
+    def test_resolved_value_shared_tree(self):
+        with Case(self.tempdir.name, read_only=False) as case:
+            # both cases read the env files through the same parsed trees
+            other_case = Case(self.tempdir.name, read_only=False)
+            assert other_case.get_value("RUNDIR") == "/case/bld/run"
+
+            case.set_value("BASEROOT", "/newcase")
+            assert other_case.get_value("RUNDIR") == "/newcase/bld/run"
+
+    def test_resolved_value_env_var(self):
+        with Case(self.tempdir.name, read_only=False) as case:
+            with mock.patch.dict(os.environ, {"CIME_TEST_VAR": "one"}):
+                assert case.get_resolved_value("$ENV{CIME_TEST_VAR}/$OTHER") == (
+                    "one/other"
+                )
+
+            with mock.patch.dict(os.environ, {"CIME_TEST_VAR": "two"}):
+                assert case.get_resolved_value("$ENV{CIME_TEST_VAR}/$OTHER") == (
+                    "two/other"
+                )
+
+
+@mock.patch.dict(os.environ, {"CIME_MODEL": "cesm"})
+class TestCaseLazyEnvFiles(unittest.TestCase):
+    ENV_FILE = """<?xml version="1.0"?>
+<file id="{}" version="2.0">
+  <header>test case</header>
+  <group id="group">
+    <entry id="{}" value="{}">
+      <type>char</type>
+      <desc>test</desc>
+    </entry>
+  </group>{}
+</file>
+"""
+
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        for filename, vid, value in (
+            ("env_case.xml", "CASEROOT", self.tempdir.name),
+            ("env_run.xml", "RUN_VALUE", "$CASEROOT/run"),
+            ("env_build.xml", "COMP_INTERFACE", "nuopc"),
+            ("env_mach_pes.xml", "MACH_PES_VALUE", "1"),
+            ("env_batch.xml", "BATCH_VALUE", "1"),
+            ("env_workflow.xml", "WORKFLOW_VALUE", "1"),
+        ):
+            self._write_env_file(filename, vid, value)
+        self._write_env_file(
+            "env_mach_specific.xml",
+            "MACH_SPECIFIC_VALUE",
+            "1",
+            extra='\n  <module_system type="none"/>',
+        )
+        with open(os.path.join(self.tempdir.name, "env_archive.xml"), "w") as fd:
+            fd.write('<file id="env_archive.xml" version="1.0"></file>')
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def _write_env_file(self, filename, vid, value, extra=""):
+        with open(os.path.join(self.tempdir.name, filename), "w") as fd:
+            fd.write(self.ENV_FILE.format(filename, vid, value, extra))
+
+    def _loaded(self, case):
+        return [
+            os.path.basename(env_file.filename)
+            for env_file in case._files  # pylint: disable=protected-access
+            if case_module._is_loaded(env_file)  # pylint: disable=protected-access
+        ]
+
+    def test_lazy_env_files(self):
+        case = Case(self.tempdir.name, read_only=False)
+        assert case.get_value("CASEROOT") == self.tempdir.name
+        assert self._loaded(case) == ["env_case.xml"]
+
+        assert case.get_value("RUN_VALUE") == self.tempdir.name + "/run"
+        assert "env_run.xml" in self._loaded(case)
+
+        # the names recorded for the files read so far let lookups skip them
+        case = Case(self.tempdir.name, read_only=False)
+        assert case.get_value("RUN_VALUE") == self.tempdir.name + "/run"
+        assert self._loaded(case) == ["env_case.xml", "env_run.xml"]
+
+        # looking up an undefined variable reads all files once
+        assert case.get_value("UNDEFINED") is None
+        case = Case(self.tempdir.name, read_only=False)
+        assert case.get_value("UNDEFINED") is None
+        assert self._loaded(case) == ["env_case.xml"]
+
+        # names recorded for an older version of a file are not used
+        self._write_env_file("env_run.xml", "UNDEFINED", "defined")
+        case = Case(self.tempdir.name, read_only=False)
+        assert case.get_value("UNDEFINED") == "defined"
+        assert self._loaded(case) == ["env_case.xml", "env_run.xml"]
+
+
 if __name__ == "__main__":
     unittest.main()
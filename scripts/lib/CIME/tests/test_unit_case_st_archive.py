@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+
+import errno
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from CIME.case import case_st_archive
+from CIME.XML.env_archive import EnvArchive
+
+# pylint: disable=protected-access
+
+_ENV_ARCHIVE = """<?xml version="1.0"?>
+<file id="env_archive.xml" version="2.0">
+<header>test</header>
+<components version="2.0">
+  <comp_archive_spec compname="drv" compclass="cpl">
+    <rest_file_extension>r</rest_file_extension>
+    <hist_file_extension>hi\\..*\\.nc$</hist_file_extension>
+    <rpointer>
+      <rpointer_file>rpointer.drv$NINST_STRING</rpointer_file>
+      <rpointer_content>$CASE.cpl$NINST_STRING.r.$DATENAME.nc</rpointer_content>
+    </rpointer>
+  </comp_archive_spec>
+  <comp_archive_spec compname="cam" compclass="atm">
+    <rest_file_extension>r</rest_file_extension>
+    <hist_file_extension>h\\d*.*\\.nc$</hist_file_extension>
+    <rpointer>
+      <rpointer_file>rpointer.atm$NINST_STRING</rpointer_file>
+      <rpointer_content>$CASE.cam$NINST_STRING.r.$DATENAME.nc</rpointer_content>
+    </rpointer>
+  </comp_archive_spec>
+</components>
+</file>
+"""
+
+# file name -> disposition, as the test_file_names of config_archive.xml
+_RUN_FILES = {
+    "casename.cpl.r.1976-01-01-00000.nc": "copy",
+    "casename.cpl.r.1975-01-01-00000.nc": "move",
+    "casename.cpl.hi.1976-01-01-00000.nc": "move",
+    "casename.cam.r.1976-01-01-00000.nc": "copy",
+    "casename.cam.r.1975-01-01-00000.nc": "move",
+    "casename.cam.h0.1975-12.nc": "move",
+    "casename.cam.h1.1976-01-01-00000.nc": "move",
+    "casename.cam.i.1976-01-01-00000.nc": "ignore",
+    "cpl.log.1234.gz": "move",
+    "atm.log.1234": "move",
+    "rpointer.drv": "copy",
+    "rpointer.atm": "copy",
+}
+
+
+class TestCaseStArchive(unittest.TestCase):
+    def setUp(self):
+        self._tempdir = tempfile.mkdtemp()
+        self._rundir = os.path.join(self._tempdir, "run")
+        self._dout_s_root = os.path.join(self._rundir, "archive")
+        os.makedirs(self._rundir)
+        for name, disposition in _RUN_FILES.items():
+            with open(os.path.join(self._rundir, name), "w") as fd:
+                fd.write(disposition + "\n")
+
+        with open(os.path.join(self._tempdir, "env_archive.xml"), "w") as fd:
+            fd.write(_ENV_ARCHIVE)
+        self._archive = EnvArchive(self._tempdir, read_only=True)
+
+        self._case = mock.MagicMock()
+        self._case.get_value.side_effect = lambda name, **_: {
+            "DOUT_S_SAVE_INTERIM_RESTART_FILES": True
+        }.get(name)
+
+    def tearDown(self):
+        shutil.rmtree(self._tempdir, ignore_errors=True)
+
+    def _archive_process(self):
+        case_st_archive._archive_process(
+            self._case,
+            self._archive,
+            None,
+            True,
+            False,
+            components=["drv", "cam"],
+            dout_s_root=self._dout_s_root,
+            casename="casename",
+            rundir=self._rundir,
+            testonly=True,
+        )
+
+    def _assert_archived(self):
+        case_st_archive._check_disposition(self._rundir)
+        for name, disposition in _RUN_FILES.items():
+            in_rundir = os.path.isfile(os.path.join(self._rundir, name))
+            assert in_rundir == (disposition != "move"), name
+
+        archived = set()
+        for root, _, files in os.walk(self._dout_s_root):
+            archived.update(
+                os.path.relpath(os.path.join(root, name), self._dout_s_root)
+                for name in files
+            )
+        assert archived == {
+            "logs/cpl.log.1234.gz",
+            "logs/atm.log.1234",
+            "cpl/hist/casename.cpl.hi.1976-01-01-00000.nc",
+            "atm/hist/casename.cam.h0.1975-12.nc",
+            "atm/hist/casename.cam.h1.1976-01-01-00000.nc",
+            "rest/1975-01-01-00000/casename.cpl.r.1975-01-01-00000.nc",
+            "rest/1975-01-01-00000/casename.cam.r.1975-01-01-00000.nc",
+            "rest/1975-01-01-00000/rpointer.drv",
+            "rest/1975-01-01-00000/rpointer.atm",
+            "rest/1976-01-01-00000/casename.cpl.r.1976-01-01-00000.nc",
+            "rest/1976-01-01-00000/casename.cam.r.1976-01-01-00000.nc",
+            "rest/1976-01-01-00000/rpointer.drv",
+            "rest/1976-01-01-00000/rpointer.atm",
+        }
+
+    def test_archive_process(self):
+        with self.assertLogs(case_st_archive.logger, "INFO") as logs:
+            self._archive_process()
+        self._assert_archived()
+        assert "Archived 13 files (7 renamed)" in logs.output[-1]
+
+    def test_archive_process_other_filesystem(self):
+        def rename(*_):
+            raise OSError(errno.EXDEV, "Invalid cross-device link")
+
+        with mock.patch.object(os, "rename", side_effect=rename):
+            self._archive_process()
+        self._assert_archived()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+
+import functools
+import glob
+import http.server
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+import CIME.Servers
+from CIME.case import check_input_data
+
+# pylint: disable=protected-access
+
+
+class QuietHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
+    """
+    Serves files without logging the requests to stderr
+    """
+
+    def log_message(self, *args):  # pylint: disable=arguments-differ
+        pass
+
+
+class LocalServer(object):
+    """
+    A stand-in for a CIME.Servers server, serving the files of a local directory
+    """
+
+    CONCURRENT_DOWNLOADS = 4
+    RESUMABLE = True
+
+    def __init__(self, root, interrupt=()):
+        self._root = root
+        # files whose first download stops halfway
+        self._interrupt = set(interrupt)
+        self.requests = []
+        self._lock = threading.Lock()
+
+    def getfile(self, rel_path, full_path):
+        with self._lock:
+            self.requests.append(rel_path)
+        src = os.path.join(self._root, rel_path)
+        if not os.path.isfile(src):
+            return False
+
+        with open(src, "rb") as fd:
+            data = fd.read()
+        offset = os.path.getsize(full_path) if os.path.isfile(full_path) else 0
+        if rel_path in self._interrupt:
+            self._interrupt.remove(rel_path)
+            data = data[: len(data) // 2]
+            success = False
+        else:
+            success = True
+        with open(full_path, "ab") as fd:
+            fd.write(data[offset:])
+        return success
+
+
+class TestCheckInputData(unittest.TestCase):
+    def setUp(self):
+        self._tempdir = tempfile.mkdtemp()
+        self._server_root = os.path.join(self._tempdir, "server")
+        self._din_loc_root = os.path.join(self._tempdir, "inputdata")
+        self._data_list_dir = os.path.join(self._tempdir, "Buildconf")
+        for dirname in (self._server_root, self._din_loc_root, self._data_list_dir):
+            os.makedirs(dirname)
+
+        self._case = mock.MagicMock()
+        self._case.get_value.side_effect = lambda name, **_: {
+            "RUNDIR": os.path.join(self._tempdir, "run"),
+            "DIN_LOC_ROOT": self._din_loc_root,
+            "DIN_LOC_IC": self._din_loc_root,
+        }.get(name)
+        self._case.get_resolved_value.side_effect = lambda value: value
+
+    def tearDown(self):
+        shutil.rmtree(self._tempdir, ignore_errors=True)
+
+    def _write_file(self, root, rel_path, text):
+        path = os.path.join(root, rel_path)
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        with open(path, "w") as fd:
+            fd.write(text)
+
+    def _write_data_lists(self):
+        for model, rel_paths in (
+            ("atm", ["atm/a.nc", "share/s.nc", "atm/present.nc"]),
+            ("lnd", ["lnd/l.nc", "share/s.nc", "lnd/missing.nc"]),
+        ):
+            with open(
+                os.path.join(self._data_list_dir, "{}.input_data_list".format(model)),
+                "w",
+            ) as fd:
+                for idx, rel_path in enumerate(rel_paths):
+                    fd.write(
+                        "file{:d} = {}\n".format(
+                            idx, os.path.join(self._din_loc_root, rel_path)
+                        )
+                    )
+                fd.write("special = NULL\n")
+
+        self._write_file(self._din_loc_root, "atm/present.nc", "present")
+        for rel_path in ("atm/a.nc", "share/s.nc", "lnd/l.nc"):
+            self._write_file(self._server_root, rel_path, rel_path * 100)
+
+    def _check_input_data(self, download, protocol="ftp", address=None):
+        return check_input_data.check_input_data(
+            self._case,
+            protocol=protocol,
+            address=address,
+            input_data_root=self._din_loc_root,
+            data_list_dir=self._data_list_dir,
+            download=download,
+        )
+
+    def _assert_downloaded(self):
+        for rel_path in ("atm/a.nc", "share/s.nc", "lnd/l.nc"):
+            with open(os.path.join(self._din_loc_root, rel_path)) as fd:
+                assert fd.read() == rel_path * 100
+            assert not glob.glob(
+                os.path.join(self._din_loc_root, rel_path + ".*.partial")
+            )
+
+    def test_check_input_data(self):
+        self._write_data_lists()
+        server = LocalServer(self._server_root, interrupt=["lnd/l.nc"])
+
+        assert not self._check_input_data(False)
+        with mock.patch.object(check_input_data, "_get_server", return_value=server):
+            assert not self._check_input_data(True)
+
+        # each file is requested once, the interrupted one resumed
+        assert sorted(server.requests) == [
+            "atm/a.nc",
+            "lnd/l.nc",
+            "lnd/l.nc",
+            "lnd/missing.nc",
+            "share/s.nc",
+        ]
+        self._assert_downloaded()
+
+        os.remove(os.path.join(self._data_list_dir, "lnd.input_data_list"))
+        assert self._check_input_data(False)
+
+    def test_getfile_restart(self):
+        self._write_file(self._server_root, "a.nc", "new" * 10)
+        server = LocalServer(self._server_root, interrupt=["a.nc"])
+        server.RESUMABLE = False
+
+        full_path = os.path.join(self._din_loc_root, "a.nc")
+        assert check_input_data._getfile(server, "a.nc", full_path)
+        with open(full_path) as fd:
+            assert fd.read() == "new" * 10
+
+    def test_getfile_concurrent(self):
+        self._write_file(self._server_root, "a.nc", "new")
+        full_path = os.path.join(self._din_loc_root, "a.nc")
+        # the download of another process
+        other_partial = "{}.otherhost.1{}".format(
+            full_path, check_input_data.PARTIAL_SUFFIX
+        )
+        self._write_file(self._din_loc_root, other_partial, "other")
+
+        for resumable in (True, False):
+            server = LocalServer(self._server_root)
+            server.RESUMABLE = resumable
+            assert check_input_data._getfile(server, "a.nc", full_path)
+            with open(full_path) as fd:
+                assert fd.read() == "new"
+            with open(other_partial) as fd:
+                assert fd.read() == "other"
+
+    @unittest.skipIf(not hasattr(CIME.Servers, "WGET"), "wget not found")
+    @unittest.skipIf(
+        not hasattr(http.server, "ThreadingHTTPServer"), "needs python 3.7"
+    )
+    def test_check_input_data_wget(self):
+        self._write_data_lists()
+        handler = functools.partial(
+            QuietHTTPRequestHandler, directory=self._server_root
+        )
+        httpd = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        thread = threading.Thread(target=httpd.serve_forever)
+        thread.start()
+        try:
+            address = "http://127.0.0.1:{:d}/".format(httpd.server_address[1])
+            assert not self._check_input_data(True, protocol="wget", address=address)
+        finally:
+            httpd.shutdown()
+            thread.join()
+            httpd.server_close()
+
+        self._assert_downloaded()
+        assert not glob.glob(
+            os.path.join(self._din_loc_root, "lnd/missing.nc.*.partial")
+        )
+
+    def test_verify_chksums(self):
+        rundir = os.path.join(self._tempdir, "run")
+        os.makedirs(rundir)
+        lines = []
+        for rel_path in ("atm/a.nc", "atm/b.nc", "lnd/l.nc"):
+            self._write_file(self._din_loc_root, rel_path, rel_path)
+            lines.append(
+                "{} {}\n".format(
+                    check_input_data.md5(os.path.join(self._din_loc_root, rel_path)),
+                    rel_path,
+                )
+            )
+        with open(os.path.join(rundir, check_input_data.local_chksum_file), "w") as fd:
+            fd.writelines(lines)
+
+        to_verify = [("atm", True), ("lnd/l.nc", False), ("atm/a.nc", False)]
+        md5 = mock.Mock(side_effect=check_input_data.md5)
+        with mock.patch.dict(
+            check_input_data.chksum_hash, clear=True
+        ), mock.patch.object(check_input_data, "md5", md5):
+            # directories are globbed relative to the cwd
+            cwd = os.getcwd()
+            os.chdir(self._din_loc_root)
+            try:
+                check_input_data.verify_chksums(self._din_loc_root, rundir, to_verify)
+            finally:
+                os.chdir(cwd)
+            assert md5.call_count == 3
+            assert os.path.isfile(
+                os.path.join(self._din_loc_root, check_input_data.CHKSUM_CACHE_FILE)
+            )
+
+            # unchanged files are not hashed again
+            md5.reset_mock()
+            check_input_data.verify_chksums(
+                self._din_loc_root, rundir, [("lnd/l.nc", False), ("atm/a.nc", False)]
+            )
+            assert md5.call_count == 0
+
+            # a changed file is
+            self._write_file(self._din_loc_root, "lnd/l.nc", "changed")
+            with self.assertRaisesRegex(Exception, "chksum mismatch"):
+                check_input_data.verify_chksums(
+                    self._din_loc_root, rundir, [("lnd/l.nc", False)]
+                )
+            assert md5.call_count == 1
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+
+import gzip
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from CIME import cpl_log
+
+# pylint: disable=protected-access
+
+CPL_LOG = """ tStamp_write: model date =   00010102       0 wall clock = 2021-01-01 00:00:10 avg dt =     1.00 dt =     1.00
+ memory_write: model date =   00010102       0 memory =    1000.00 MB (highwater)        500.00 MB (usage)  (pe=    0 comps= cpl)
+ memory_write: model date =   00010103       0 memory =    1100.00 MB (highwater)        510.00 MB (usage)  (pe=    0 comps= cpl)
+ tStamp_write: model date =   00010104       0 wall clock = 2021-01-01 00:00:30 avg dt =     1.00 dt =     1.00
+ memory_write: model date =   00010104       0 memory =    1200.00 MB (highwater)        520.00 MB (usage)  (pe=    0 comps= cpl)
+
+ # simulated years / cmp-day =      12.345 (pure)
+ # simulated years / cmp-day =      99.999 (pure)
+ SUCCESSFUL TERMINATION OF CPL7-cesm
+"""
+
+
+class TestCplLog(unittest.TestCase):
+    def setUp(self):
+        self._tempdir = tempfile.mkdtemp()
+        cpl_log._SUMMARIES.clear()
+
+    def tearDown(self):
+        shutil.rmtree(self._tempdir, ignore_errors=True)
+        cpl_log._SUMMARIES.clear()
+
+    def _write_log(self, name, text=CPL_LOG):
+        path = os.path.join(self._tempdir, name)
+        fopen = gzip.open if name.endswith(".gz") else open
+        with fopen(path, "wt") as fd:
+            fd.write(text)
+        return path
+
+    def test_get_cpl_log_summary(self):
+        cpllog = self._write_log("cpl.log.1234.gz")
+
+        summary = cpl_log.get_cpl_log_summary(cpllog)
+
+        assert summary["mem_usage"] == [
+            (10102.0, 1000.0),
+            (10103.0, 1100.0),
+            (10104.0, 1200.0),
+        ]
+        assert summary["first_model_date"] == "00010102"
+        assert summary["last_model_date"] == "00010104"
+        assert summary["throughput"] == 12.345
+        assert summary["run_complete"]
+        # hidden, so it is not found as a log
+        assert sorted(os.listdir(self._tempdir)) == [
+            ".cpl.log.1234.gz.summary.json",
+            "cpl.log.1234.gz",
+        ]
+
+        # read from the cache file
+        cpl_log._SUMMARIES.clear()
+        with mock.patch.object(cpl_log, "_read_log") as read_log:
+            assert cpl_log.get_cpl_log_summary(cpllog) == summary
+            read_log.assert_not_called()
+
+        # the log changed
+        self._write_log("cpl.log.1234.gz", text="partial\n")
+        os.utime(cpllog, ns=(1, 1))
+        summary = cpl_log.get_cpl_log_summary(cpllog)
+        assert summary["mem_usage"] == []
+        assert not summary["run_complete"]
+
+    def test_uncompressed_log(self):
+        summary = cpl_log.get_cpl_log_summary(self._write_log("cpl.log.1234"))
+
+        assert len(summary["mem_usage"]) == 3
+        assert not summary["compressed"]
+        assert not summary["run_complete"]
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from CIME import get_timing
+
+# pylint: disable=protected-access
+
+MCT_TIMING_STATS = """***** GLOBAL STATISTICS (     4 MPI TASKS) *****
+
+name                                            on  processes  threads        count      walltotal   wallmax (proc   thrd  )   wallmin (proc   thrd  )
+"CPL:INIT"                                       -        4        4 4.000000e+00  1.0e+01     2.750 (     1      0)     2.250 (     3      0)
+"CPL:RUN_LOOP"                                   -        4        4 1.920000e+02  4.0e+02   100.500 (     0      0)    99.250 (     2      0)
+"CPL:CLOCK_ADVANCE"                              -        4        4 1.920000e+02  1.0e+00     0.300 (     0      0)     0.200 (     2      0)
+"CPL:ATM_RUN"                                    -        2        2 9.600000e+01  8.0e+01    40.000 (     0      0)    39.000 (     1      0)
+"CPL:SERIAL"                                     -        7
+"CPL:ATM_RUN"                                    -        4        4 1.000000e+00  1.0e+00     1.000 (     0      0)     1.000 (     1      0)
+"CPL:BAD"                                        -        4        4 1.000000e+00  1.0e+00     bad
+"""
+
+ESMF_PROFILE_SUMMARY = """Region                                        PETs   PEs    Count    Mean (s)    Min (s)     Min PET Max (s)     Max PET
+  [ESMF]                                      4      4      1        10.500      10.400      0       10.600      3
+    [ensemble] Init 1                         4      4      1        1.500       1.400       0       1.600       3
+      [ATM] RunPhase1                         4      4      1        0.100       0.050       0       0.150       3
+    [ensemble] RunPhase1                      4      4      1        8.000       7.900       0       8.100       3
+      [ESM0001] RunPhase1                     4      4      1        7.800       7.700       0       7.900       3
+        [ATM] RunPhase1                       2      2      48       5.000       4.500       0       5.500       1
+        [MED] med_phases_prep_atm             4      4      48       0.250       0.200       0       0.300       3
+        [MED] med_fraction_set                4      4      48       0.125       0.100       0       0.150       3
+        [ATM-TO-MED] RunPhase1                4      4      48       0.500       0.400       0       0.600       3
+        [MED-TO-ATM] RunPhase1                4      4      48       0.250       0.200       0       0.300       3
+    [ensemble] FinalizePhase1                 4      4      1        0.500       0.400       0       0.600       3
+"""
+
+COMP_CLASSES = ["CPL", "ATM", "LND", "ICE", "OCN", "ROF", "GLC", "WAV"]
+
+
+class TestGetTiming(unittest.TestCase):
+    def setUp(self):
+        self._cwd = os.getcwd()
+        self._caseroot = tempfile.mkdtemp()
+        self._rundir = os.path.join(self._caseroot, "run")
+        os.makedirs(os.path.join(self._rundir, "timing"))
+        self._values = {
+            "CASEROOT": self._caseroot,
+            "RUNDIR": self._rundir,
+            "COMP_INTERFACE": "mct",
+            "MODEL": "cesm",
+            "CASE": "testcase",
+            "MACH": "testmach",
+            "USER": "testuser",
+            "CONTINUE_RUN": False,
+            "RUN_TYPE": "startup",
+            "NCPL_BASE_PERIOD": "day",
+            "STOP_OPTION": "ndays",
+            "STOP_N": 4,
+            "COST_PES": 0,
+            "COSTPES_PER_NODE": None,
+            "TOTALPES": 4,
+            "MAX_MPITASKS_PER_NODE": 4,
+            "MAX_TASKS_PER_NODE": 4,
+            "MULTI_DRIVER": False,
+        }
+        for comp_class in COMP_CLASSES:
+            self._values["{}_NCPL".format(comp_class)] = 48
+            self._values["COMP_{}".format(comp_class)] = comp_class.lower()
+            for key, value in (
+                ("NTASKS", 4),
+                ("ROOTPE", 0),
+                ("PSTRID", 1),
+                ("NTHRDS", 1),
+                ("NINST", 1),
+            ):
+                self._values["{}_{}".format(key, comp_class)] = value
+
+    def tearDown(self):
+        # getTiming changes to the caseroot
+        os.chdir(self._cwd)
+        shutil.rmtree(self._caseroot, ignore_errors=True)
+
+    def _parser(self, driver, text):
+        self._values["COMP_INTERFACE"] = driver
+        case = mock.MagicMock()
+        case.get_value.side_effect = self._values.get
+        case.get_values.return_value = COMP_CLASSES
+        parser = get_timing._TimingParser(case, lid="1234-5678")
+        parser._set_lines(text.splitlines(True))
+        return parser
+
+    def test_gettime_mct(self):
+        parser = self._parser("mct", MCT_TIMING_STATS)
+
+        assert parser.gettime(" CPL:INIT ") == (2.25, 2.75, True)
+        # the first line of the timer
+        assert parser.gettime(" CPL:ATM_RUN ") == (39.0, 40.0, True)
+        assert parser.gettime(" CPL:SERIAL ") == (0, 0, False)
+        assert parser.gettime(" CPL:BAD ") == (0, 0, False)
+        assert parser.gettime(" CPL:MISSING ") == (0, 0, False)
+
+        assert parser.gettime2("CPL:CLOCK_ADVANCE ") == (4, 192)
+        assert parser.gettime2("CPL:SERIAL") == (1, 7)
+        assert parser.gettime2("CPL:MISSING") == (0, 0)
+
+        with mock.patch.object(get_timing, "_MCT_TIME_LINE") as time_line:
+            parser.gettime(" CPL:RUN_LOOP ")
+            # parsed only once
+            time_line.match.assert_not_called()
+
+    def test_gettime_nuopc(self):
+        parser = self._parser("nuopc", ESMF_PROFILE_SUMMARY)
+
+        assert parser.gettime2("") == (4, 4)
+        assert parser.gettime("[ensemble] Init 1") == (1.4, 1.6, True)
+        assert parser.gettime("[ensemble] RunPhase1") == (7.9, 8.1, True)
+        assert parser.gettime(" CPL:INIT ") == (0, 0, False)
+        # in the run phase only
+        assert parser._gettime_nuopc(" [ATM] RunPhase1 ", "") == (4.5, 5.5, True)
+        assert parser.getMEDtime("") == (0.375, 0.375)
+        assert parser.getCOMMtime("0001") == 0.75
+
+    def test_get_timing(self):
+        with open(
+            os.path.join(self._rundir, "timing", "model_timing_stats"), "w"
+        ) as fd:
+            fd.write(MCT_TIMING_STATS)
+
+        parser = self._parser("mct", "")
+        parser.getTiming()
+
+        timing_dir = os.path.join(self._caseroot, "timing")
+        with open(
+            os.path.join(timing_dir, "cesm_timing.testcase.1234-5678"), "r"
+        ) as fd:
+            assert "Model Throughput:" in fd.read()
+        with open(
+            os.path.join(timing_dir, "cesm_timing_summary.testcase.1234-5678.json"),
+            "r",
+        ) as fd:
+            summary = json.load(fd)
+
+        assert summary["run_length_days"] == 1
+        assert summary["init_time"] == 2.75
+        assert summary["components"]["ATM"]["run_time"] == 40.0
+        assert summary["timers"]["CPL:SERIAL"] == {"nprocs": 1, "ncount": 7}
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -368,6 +368,45 @@ $GRIDMAP_ENTRIES
         self.assert_grid_info_f09_g17_3glc(grid_info)
         self.assertEqual(grid_info["GLC2ATM_EXTRA"], "unset")
 
+    def test_read_config_grids_compset_match(self):
+        """Test that the first model_grid matching the compset is chosen"""
+        model_grid_entries = """
+    <model_grid alias="f09_g17" compset="_CAM" not_compset="_POP">
+      <grid name="atm">0.9x1.25</grid>
+      <grid name="ocnice">gx1v7</grid>
+    </model_grid>
+    <model_grid alias="f09_g17" not_compset="_DOCN">
+      <grid name="atm">0.9x1.25</grid>
+      <grid name="ocnice">gx1v6</grid>
+    </model_grid>
+"""
+        self._create_grids_xml(
+            model_grid_entries=model_grid_entries,
+            domain_entries="",
+            gridmap_entries="",
+        )
+
+        grids = Grids(self._xml_filepath)
+        for _ in range(2):
+            self.assertIn(
+                "_oi%gx1v7_",
+                grids._read_config_grids("f09_g17", "_CAM_CICE", None, None),
+            )
+            self.assertIn(
+                "_oi%gx1v6_",
+                grids._read_config_grids("f09_g17", "_CAM_POP", None, None),
+            )
+            with self.assertRaisesRegex(CIMEError, "not valid for compset"):
+                grids._read_config_grids("f09_g17", "_CAM_POP_DOCN", None, None)
+            with self.assertRaisesRegex(CIMEError, "no alias f19_g17 defined"):
+                grids._read_config_grids("f19_g17", "_CAM_CICE", None, None)
+
+        # another object reading the same file shares its lookup tables
+        self.assertIs(
+            Grids(self._xml_filepath)._get_model_grid_index(),
+            grids._get_model_grid_index(),
+        )
+
 
 class TestComponentGrids(unittest.TestCase):
     """Tests the _ComponentGrids helper class defined in CIME.XML.grids"""
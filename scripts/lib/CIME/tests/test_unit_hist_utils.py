@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+
+import random
+import re
+import time
+import unittest
+from unittest import mock
+
+from CIME import hist_utils
+
+# pylint: disable=protected-access
+
+
+class TestHistUtils(unittest.TestCase):
+    def _make_case(self, models):
+        values = {
+            "CASE": "casename",
+            "TESTCASE": "ERS",
+            "CASEROOT": "/caseroot",
+            "CCSM_CPRNC": "/path/to/cprnc",
+            "RUN_REFCASE": None,
+        }
+        archive = mock.MagicMock()
+        archive.get_latest_hist_files.side_effect = (
+            lambda casename, model, from_dir, **kwargs: [
+                "casename.{}.h{}.nc{}".format(model, idx, kwargs["suffix"])
+                for idx in range(3)
+            ]
+        )
+
+        case = mock.MagicMock()
+        case.get_value.side_effect = values.get
+        case.get_env.return_value = archive
+        case.get_compset_components.side_effect = lambda: list(models)
+        return case
+
+    @staticmethod
+    def _fake_cprnc(model, file1, file2, case, rundir, **kwargs):
+        # finish in a random order
+        time.sleep(random.random() * 0.02)
+        assert kwargs["cprnc_exe"] == "/path/to/cprnc"
+        return (".h1." not in file1, file1 + ".cprnc.out", "")
+
+    @mock.patch("CIME.hist_utils.RunDirIndex")
+    @mock.patch("CIME.hist_utils.safe_copy")
+    @mock.patch("CIME.hist_utils.cprnc")
+    def test_compare_hists_parallel_order(self, cprnc, _, __):
+        cprnc.side_effect = self._fake_cprnc
+        case = self._make_case(["atm", "lnd", "ocn"])
+
+        comments = {}
+        for cprnc_jobs in (1, 8):
+            success, comments[cprnc_jobs] = hist_utils._compare_hists(
+                case, "/rundir", "/rundir", "base", "rest", cprnc_jobs=cprnc_jobs
+            )
+            assert not success
+
+        assert cprnc.call_count == 24
+        timing = re.compile(r" \(\d+\.\d\d seconds\)")
+        assert timing.search(comments[8])
+        assert timing.sub("", comments[1]) == timing.sub("", comments[8])
+
+        lines = timing.sub("", comments[8]).splitlines()
+        assert lines[1] == "  comparing model 'atm'"
+        assert lines[2] == "    casename.atm.h0.ncbase matched casename.atm.h0.ncrest"
+        assert (
+            lines[3]
+            == "    casename.atm.h1.ncbase did NOT match casename.atm.h1.ncrest"
+        )
+        assert lines[-1] == "FAIL"
+
+    def test_get_cprnc_jobs(self):
+        with mock.patch.dict("os.environ", {"CIME_CPRNC_JOBS": "3"}):
+            assert hist_utils._get_cprnc_jobs(None) == 3
+            assert hist_utils._get_cprnc_jobs(5) == 5
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from CIME import hist_utils
+from CIME import nccompare
+
+# pylint: disable=import-error,protected-access
+if nccompare.has_netcdf4:
+    import netCDF4
+    import numpy
+
+
+@unittest.skipIf(not nccompare.has_netcdf4, "netCDF4 and numpy are not installed")
+class TestNCCompare(unittest.TestCase):
+    def setUp(self):
+        self._tempdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self._tempdir, ignore_errors=True)
+
+    def _write_file(self, name, variables, history="created"):
+        path = os.path.join(self._tempdir, name)
+        with netCDF4.Dataset(path, "w") as ds:
+            ds.history = history
+            ds.createDimension("time", None)
+            ds.createDimension("lat", 4)
+            ds.createDimension("lon", 5)
+            for varname, data in variables.items():
+                var = ds.createVariable(varname, data.dtype, ("time", "lat", "lon"))
+                var[:] = data
+
+        return path
+
+    def test_compare_files(self):
+        data = numpy.arange(60, dtype=numpy.float64).reshape(3, 4, 5)
+        changed = data.copy()
+        changed[2, 3, 4] += 0.5
+        file1 = self._write_file("file1.nc", {"T": data, "U": data})
+        file2 = self._write_file("file2.nc", {"T": data, "U": data})
+        file3 = self._write_file("file3.nc", {"T": data})
+        file4 = self._write_file("file4.nc", {"T": changed, "U": changed})
+
+        result = nccompare.compare_files(file1, file2, max_chunk_elements=7)
+        assert result.identical()
+        assert result.num_compared == 2
+
+        result = nccompare.compare_files(file1, file3)
+        assert not result.identical()
+        assert result.only_in_file1 == ["U"]
+        assert not result.var_diffs
+        assert result.summary() == "the two files DIFFER only in their field lists"
+
+        result = nccompare.compare_files(file1, file4, max_chunk_elements=7)
+        assert result.var_diffs == [
+            nccompare.VarDiff("T", 1, 0.5, (0.25 / 60) ** 0.5),
+            nccompare.VarDiff("U", 1, 0.5, (0.25 / 60) ** 0.5),
+        ]
+        assert " 2 had non-zero differences" in result.report()
+
+        result = nccompare.compare_files(file1, file4, stop_on_diff=True)
+        assert [var_diff.name for var_diff in result.var_diffs] == ["T"]
+        assert not result.complete
+
+    def test_iter_chunks(self):
+        data = numpy.arange(60, dtype=numpy.float64).reshape(1, 3, 4, 5)
+        path = self._write_file("file1.nc", {})
+        with netCDF4.Dataset(path, "a") as ds:
+            ds.createDimension("lev", 3)
+            var = ds.createVariable("T", data.dtype, ("time", "lev", "lat", "lon"))
+            var[:] = data
+
+        with netCDF4.Dataset(path) as ds:
+            var = ds.variables["T"]
+            for max_chunk_elements, sizes in (
+                (100, [60]),
+                (30, [20, 20, 20]),
+                (7, [5] * 12),
+                (3, [3, 2] * 12),
+            ):
+                chunks = [
+                    chunk
+                    for (chunk,) in nccompare._iter_chunks([var], max_chunk_elements)
+                ]
+                assert [chunk.size for chunk in chunks] == sizes
+                assert (
+                    numpy.concatenate([chunk.ravel() for chunk in chunks])
+                    == data.ravel()
+                ).all()
+
+    def test_hash_file(self):
+        data = numpy.arange(60, dtype=numpy.float64).reshape(3, 4, 5)
+        changed = data.copy()
+        changed[0, 0, 0] = -1.0
+        file1 = self._write_file("file1.nc", {"T": data})
+        file2 = self._write_file("file2.nc", {"T": data}, history="rerun")
+        file3 = self._write_file("file3.nc", {"T": changed})
+        file4 = self._write_file("file4.nc", {"U": data})
+
+        checksum = nccompare.hash_file(file1)
+        assert nccompare.hash_file(file1, max_chunk_elements=7) == checksum
+        assert nccompare.hash_file(file2) == checksum
+        assert nccompare.hash_file(file3) != checksum
+        assert nccompare.hash_file(file4) != checksum
+
+    @mock.patch("CIME.hist_utils.run_cmd")
+    def test_baseline_hashes(self, run_cmd):
+        data = numpy.arange(60, dtype=numpy.float64).reshape(3, 4, 5)
+        baseline = self._write_file("cam.h0.nc", {"T": data})
+        rerun = self._write_file("case.cam.h0.nc", {"T": data}, history="rerun")
+        hist_utils._write_baseline_hashes(self._tempdir, [baseline])
+
+        hashes = hist_utils._read_baseline_hashes(self._tempdir)
+        assert hashes == {"cam.h0.nc": nccompare.hash_file(baseline)}
+
+        case = mock.MagicMock()
+        result = hist_utils.cprnc(
+            "cam",
+            rerun,
+            baseline,
+            case,
+            self._tempdir,
+            cprnc_exe="/path/to/cprnc",
+            expected_hash=hashes["cam.h0.nc"],
+        )
+        assert result[0]
+        assert result[2] == hist_utils.CPRNC_HASHES_MATCH
+        run_cmd.assert_not_called()
+
+        # a baseline replaced behind generate_baseline's back has no hash
+        self._write_file("cam.h0.nc", {"T": data + 1.0})
+        os.utime(baseline, ns=(0, 0))
+        assert hist_utils._read_baseline_hashes(self._tempdir) == {}
+
+
+class TestCompareFilesNative(unittest.TestCase):
+    def _compare(self, result, **kwargs):
+        with mock.patch("CIME.hist_utils.compare_files", return_value=result):
+            return hist_utils._compare_files_native(
+                "file1.nc", "file2.nc", "out", save_output=False, **kwargs
+            )
+
+    def test_results(self):
+        result = nccompare.CompareResult("file1.nc", "file2.nc", [], [])
+        assert self._compare(result) == (True, "out", "")
+
+        result.only_in_file2 = ["V"]
+        assert self._compare(result) == (
+            False,
+            "out",
+            hist_utils.CPRNC_FIELDLISTS_DIFFER,
+        )
+        assert self._compare(result, ignore_fieldlist_diffs=True) == (True, "out", "")
+
+        result.var_diffs = [nccompare.VarDiff("T", None, None, None)]
+        assert self._compare(result) == (False, "out", "")
+        assert self._compare(result, multiinst_driver_compare=True) == (
+            True,
+            "out",
+            "",
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
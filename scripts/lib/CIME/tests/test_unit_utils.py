@@ -13,6 +13,7 @@ from CIME.utils import (
     import_from_file,
     _line_defines_python_function,
     file_contains_python_function,
+    transform_vars,
 )
 
 from CIME.tests import utils
@@ -345,5 +346,51 @@ class TestUtils(unittest.TestCase):
             self.assertMatchAllLines(tempdir, test_lines)
 
 
+class TestTransformVars(unittest.TestCase):
+    def test_transform_vars(self):
+        case = mock.MagicMock(spec=["get_value", "num_nodes"])
+        case.num_nodes = 2
+        case.get_value.side_effect = lambda name, subgroup=None: {
+            ("JOB_QUEUE", "case.run"): "regular",
+            ("JOB_QUEUE", "case.st_archive"): "share",
+            ("PROJECT", "case.run"): "P1",
+            ("PROJECT", "case.st_archive"): "P1",
+        }.get((name, subgroup))
+
+        template = "-l nodes={{ num_nodes }} -q {{ job_queue }} -A {{ project }}"
+        values = {}
+        assert (
+            transform_vars(template, case=case, subgroup="case.run", values=values)
+            == "-l nodes=2 -q regular -A P1"
+        )
+        assert (
+            transform_vars(
+                "{{ project }} {{ project }}",
+                case=case,
+                subgroup="case.run",
+                values=values,
+            )
+            == "P1 P1"
+        )
+        assert case.get_value.call_count == 2
+
+        assert (
+            transform_vars(
+                template, case=case, subgroup="case.st_archive", values=values
+            )
+            == "-l nodes=2 -q share -A P1"
+        )
+        assert case.get_value.call_count == 4
+
+        # overrides come first, unresolved variables are dropped
+        assert (
+            transform_vars(
+                "{{ num_nodes }}{{ unknown }}", case=case, overrides={"num_nodes": 3}
+            )
+            == "3"
+        )
+        assert transform_vars("-q {{ queue }}", case=case) == ""
+
+
 if __name__ == "__main__":
     unittest.main()
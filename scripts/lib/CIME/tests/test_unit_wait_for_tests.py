@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from CIME import test_status
+from CIME import wait_for_tests
+from CIME.tests import utils as test_utils
+
+# pylint: disable=protected-access
+
+
+class TestWaitForTests(unittest.TestCase):
+    def setUp(self):
+        self._tempdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self._tempdir, ignore_errors=True)
+
+    def _make_test(self, idx, status, mtime=1):
+        test_dir = os.path.join(self._tempdir, str(idx))
+        if not os.path.isdir(test_dir):
+            os.makedirs(test_dir)
+        test_utils.make_fake_teststatus(
+            test_dir, "Test_{:d}".format(idx), status, test_status.RUN_PHASE
+        )
+        # an old mtime, so unchanged files are not parsed again
+        os.utime(
+            os.path.join(test_dir, test_status.TEST_STATUS_FILENAME), (mtime, mtime)
+        )
+        return test_dir
+
+    def test_no_wait(self):
+        test_paths = [
+            self._make_test(1, test_status.TEST_FAIL_STATUS),
+            self._make_test(0, test_status.TEST_PEND_STATUS),
+            os.path.join(self._tempdir, "2", test_status.TEST_STATUS_FILENAME),
+        ]
+
+        results = wait_for_tests.wait_for_tests_impl(test_paths, no_wait=True)
+
+        assert results["Test_0"] == (
+            test_paths[1],
+            test_status.TEST_PEND_STATUS,
+            test_status.RUN_PHASE,
+        )
+        assert results["Test_1"] == (
+            test_paths[0],
+            test_status.TEST_FAIL_STATUS,
+            test_status.RUN_PHASE,
+        )
+        assert results["2"][1] == "File '{}' doesn't exist".format(test_paths[2])
+
+    def test_watch_tests(self):
+        test_paths = [
+            self._make_test(0, test_status.TEST_PEND_STATUS),
+            self._make_test(1, test_status.TEST_PASS_STATUS),
+            self._make_test(2, test_status.TEST_PEND_STATUS),
+        ]
+        sleeps = []
+
+        def sleep(_):
+            sleeps.append(None)
+            if len(sleeps) == 3:
+                self._make_test(2, test_status.TEST_FAIL_STATUS, mtime=2)
+            elif len(sleeps) == 5:
+                self._make_test(0, test_status.TEST_PASS_STATUS, mtime=2)
+
+        with mock.patch.object(
+            wait_for_tests, "TestStatus", wraps=wait_for_tests.TestStatus
+        ) as parse, mock.patch.object(wait_for_tests.time, "sleep", sleep):
+            results = [
+                result[:3] for result in wait_for_tests.watch_tests(test_paths, True)
+            ]
+
+        assert results == [
+            ("Test_1", test_paths[1], test_status.TEST_PASS_STATUS),
+            ("Test_2", test_paths[2], test_status.TEST_FAIL_STATUS),
+            ("Test_0", test_paths[0], test_status.TEST_PASS_STATUS),
+        ]
+        assert len(sleeps) == 5
+        # only the files that changed were parsed again
+        assert parse.call_count == 5
+
+    def test_watch_tests_signal(self):
+        test_paths = [self._make_test(0, test_status.TEST_PEND_STATUS)]
+
+        def sleep(_):
+            wait_for_tests.SIGNAL_RECEIVED = True
+
+        try:
+            with mock.patch.object(wait_for_tests.time, "sleep", sleep):
+                results = list(wait_for_tests.watch_tests(test_paths, True))
+        finally:
+            wait_for_tests.SIGNAL_RECEIVED = False
+
+        assert results == [
+            (
+                "Test_0",
+                test_paths[0],
+                test_status.TEST_PEND_STATUS,
+                test_status.RUN_PHASE,
+            )
+        ]
+
+
+if __name__ == "__main__":
+    unittest.main()
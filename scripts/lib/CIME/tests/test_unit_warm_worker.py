@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from CIME.warm_worker import WarmWorker
+
+_SCRIPT = """#!/usr/bin/env python3
+import os, sys
+from CIME.XML.generic_xml import GenericXML
+
+print("args", sys.argv[1:], "cwd", os.getcwd())
+print("cached", os.environ["CACHED_FILE"] in GenericXML._FILEMAP)
+print("error output", file=sys.stderr)
+sys.exit(int(os.environ.get("SCRIPT_RC", "0")))
+"""
+
+
+class TestWarmWorker(unittest.TestCase):
+    def setUp(self):
+        self._tempdir = os.path.realpath(tempfile.mkdtemp())
+        self._script = os.path.join(self._tempdir, "script")
+        with open(self._script, "w") as fd:
+            fd.write(_SCRIPT)
+        os.chmod(self._script, 0o755)
+
+    def tearDown(self):
+        shutil.rmtree(self._tempdir, ignore_errors=True)
+
+    def test_run_cmd(self):
+        worker = WarmWorker()
+        try:
+            from CIME.XML.files import Files
+
+            os.environ["CACHED_FILE"] = Files().filename
+            rc, output, errput = worker.run_cmd(
+                "./script one 'two words'", from_dir=self._tempdir
+            )
+            assert rc == 0
+            assert output.splitlines() == [
+                "args ['one', 'two words'] cwd {}".format(self._tempdir),
+                "cached True",
+            ]
+            assert errput == "error output"
+
+            os.environ["SCRIPT_RC"] = "3"
+            rc, output, errput = worker.run_cmd(
+                self._script, from_dir=self._tempdir, combine_output=True
+            )
+            assert rc == 3
+            assert "error output" in output
+            assert errput is None
+
+            # not a python script
+            rc, output, _ = worker.run_cmd("echo hello", from_dir=self._tempdir)
+            assert (rc, output) == (0, "hello")
+        finally:
+            worker.close()
+            os.environ.pop("CACHED_FILE", None)
+            os.environ.pop("SCRIPT_RC", None)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from CIME.XML.archive_base import ArchiveBase, RunDirIndex
+
+TEST_CONFIG = r"""<?xml version="1.0"?>
+<components version="2.0">
+  <comp_archive_spec compname="cam" compclass="atm">
+    <hist_file_extension>h\d*.*\.nc$</hist_file_extension>
+    <hist_file_extension>e</hist_file_extension>
+  </comp_archive_spec>
+  <comp_archive_spec compname="drv" compclass="cpl">
+    <hist_file_extension>hi\..*\.nc$</hist_file_extension>
+  </comp_archive_spec>
+</components>
+"""
+
+TEST_FILES = [
+    "casename.cam.h0.0001-01-01-00000.nc",
+    "casename.cam.h1.0001-01-01-00000.nc",
+    "casename.cam.h0.0001-01-01-00000.nc.base",
+    "casename.cam.e.0001-01-01-00000",
+    "casename.cam_0002.h0.0001-01-01-00000.nc",
+    "casename.cam.r.0001-01-01-00000.nc",
+    "casename.cpl.hi.0001-01-01-00000.nc",
+    "casename.cpl.hi.0001-01-01-00000.nc.cprnc.out",
+    "othercase.cam.h0.0001-01-01-00000.nc",
+]
+
+
+class TestXMLArchiveBase(unittest.TestCase):
+    def setUp(self):
+        self._tempdir = tempfile.mkdtemp()
+        self._rundir = os.path.join(self._tempdir, "run")
+        os.makedirs(self._rundir)
+        for name in TEST_FILES:
+            with open(os.path.join(self._rundir, name), "w") as fd:
+                fd.write("")
+
+        config_file = os.path.join(self._tempdir, "config_archive.xml")
+        with open(config_file, "w") as fd:
+            fd.write(TEST_CONFIG)
+        self._archive = ArchiveBase(config_file)
+
+    def tearDown(self):
+        shutil.rmtree(self._tempdir, ignore_errors=True)
+
+    def test_get_all_hist_files(self):
+        assert self._archive.get_all_hist_files("casename", "cam", self._rundir) == [
+            "casename.cam.e.0001-01-01-00000",
+            "casename.cam.h0.0001-01-01-00000.nc",
+            "casename.cam.h1.0001-01-01-00000.nc",
+            "casename.cam_0002.h0.0001-01-01-00000.nc",
+        ]
+        assert self._archive.get_all_hist_files(
+            "casename", "cam", self._rundir, suffix="base"
+        ) == ["casename.cam.h0.0001-01-01-00000.nc.base"]
+        assert self._archive.get_all_hist_files("casename", "cpl", self._rundir) == [
+            "casename.cpl.hi.0001-01-01-00000.nc"
+        ]
+
+    def test_dir_index_reused(self):
+        with mock.patch("os.scandir", wraps=os.scandir) as scandir:
+            dir_index = RunDirIndex(self._rundir)
+            for model in ("cam", "cpl"):
+                for suffix in ("", "base"):
+                    self._archive.get_latest_hist_files(
+                        "casename",
+                        model,
+                        self._rundir,
+                        suffix=suffix,
+                        dir_index=dir_index,
+                    )
+
+        assert scandir.call_count == 1
+
+        dir_index.rename(
+            "casename.cpl.hi.0001-01-01-00000.nc",
+            "casename.cpl.hi.0001-01-01-00000.nc.base",
+        )
+        assert self._archive.get_all_hist_files(
+            "casename", "cpl", self._rundir, suffix="base", dir_index=dir_index
+        ) == ["casename.cpl.hi.0001-01-01-00000.nc.base"]
+
+
+if __name__ == "__main__":
+    unittest.main()
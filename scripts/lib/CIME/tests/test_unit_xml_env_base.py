@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+from CIME.XML.entry_id import EntryID
+from CIME.XML.env_base import EnvBase
+
+# pylint: disable=protected-access
+
+
+def _make_env_file(path, num_groups, num_entries):
+    lines = ['<?xml version="1.0"?>', '<file id="env_test_index.xml" version="2.0">']
+    for group in range(num_groups):
+        lines.append('  <group id="group{}">'.format(group))
+        for entry in range(num_entries):
+            lines.append(
+                '    <entry id="VAR_{}_{}" value="{}">'.format(group, entry, entry)
+            )
+            lines.append("      <type>integer</type>")
+            lines.append("    </entry>")
+        lines.append('    <entry id="SHARED" value="group{}">'.format(group))
+        lines.append("      <type>char</type>")
+        lines.append("    </entry>")
+        lines.append("  </group>")
+    lines.append("</file>")
+
+    with open(path, "w") as fd:
+        fd.write("\n".join(lines))
+
+
+class TestXMLEnvBase(unittest.TestCase):
+    def setUp(self):
+        self._tempdir = tempfile.mkdtemp()
+        self._filename = os.path.join(self._tempdir, "env_test_index.xml")
+
+    def tearDown(self):
+        EnvBase.invalidate(self._filename)
+        shutil.rmtree(self._tempdir, ignore_errors=True)
+
+    def test_index_matches_generic_lookup(self):
+        _make_env_file(self._filename, 3, 10)
+
+        env = EnvBase(self._tempdir, self._filename)
+
+        for vid in ("VAR_0_0", "VAR_2_9", "SHARED", "DOES_NOT_EXIST"):
+            attributes = {"id": vid}
+            expected = EntryID.scan_children(env, "entry", attributes=attributes)
+            assert env.scan_children("entry", attributes=attributes) == expected
+
+            for group in env.get_children("group"):
+                expected = EntryID.get_children(
+                    env, "entry", attributes=attributes, root=group
+                )
+                assert (
+                    env.get_children("entry", attributes=attributes, root=group)
+                    == expected
+                )
+
+            # entries are not direct children of the file root
+            assert env.get_children("entry", attributes=attributes) == []
+
+        assert env.get_value("VAR_1_5") == 5
+        assert env.get_value("SHARED", subgroup="group2") == "group2"
+        assert env.get_value("DOES_NOT_EXIST") is None
+
+    def test_index_invalidated_on_structural_change(self):
+        _make_env_file(self._filename, 2, 2)
+
+        env = EnvBase(self._tempdir, self._filename)
+        assert env.get_value("NEW_VAR") is None
+
+        env.unlock()
+        group = env.get_child("group", {"id": "group1"})
+        entry = env.make_child("entry", {"id": "NEW_VAR", "value": "1"}, root=group)
+        assert env.scan_children("entry", {"id": "NEW_VAR"}) == [entry]
+        assert env.get_value("NEW_VAR") == "1"
+
+        env.set(entry, "id", "RENAMED_VAR")
+        assert env.scan_children("entry", {"id": "NEW_VAR"}) == []
+        assert env.scan_children("entry", {"id": "RENAMED_VAR"}) == [entry]
+
+        env.remove_child(entry, root=group)
+        assert env.scan_children("entry", {"id": "RENAMED_VAR"}) == []
+
+        env.set_value("VAR_0_1", 7)
+        assert env.get_value("VAR_0_1") == 7
+
+    def test_index_shared_tree(self):
+        _make_env_file(self._filename, 2, 2)
+
+        # both objects read the file through the same parsed tree
+        env = EnvBase(self._tempdir, self._filename)
+        other = EnvBase(self._tempdir, self._filename)
+        assert other.get_value("NEW_VAR") is None
+
+        env.unlock()
+        group = env.get_child("group", {"id": "group1"})
+        entry = env.make_child("entry", {"id": "NEW_VAR", "value": "1"}, root=group)
+        assert other.get_value("NEW_VAR") == "1"
+
+        env.remove_child(entry, root=group)
+        assert other.get_value("NEW_VAR") is None
+
+        # value changes do not rebuild the index
+        with mock.patch.object(
+            other, "_build_index", wraps=other._build_index
+        ) as build_index:
+            env.set_value("VAR_0_1", 7)
+            assert other.get_value("VAR_0_1") == 7
+            build_index.assert_not_called()
+
+    def test_index_noncompliant_file(self):
+        with open(self._filename, "w") as fd:
+            fd.write(
+                """<?xml version="1.0"?>
+<file id="env_test_index.xml" version="2.0">
+  <group id="group0">
+    <other>
+      <entry id="NESTED" value="1"/>
+    </other>
+  </group>
+</file>"""
+            )
+
+        env = EnvBase(self._tempdir, self._filename)
+
+        assert env._id_map is None
+        assert len(env.scan_children("entry", {"id": "NESTED"})) == 1
+
+    def test_index_performance(self):
+        _make_env_file(self._filename, 20, 100)
+
+        env = EnvBase(self._tempdir, self._filename)
+        vids = ["VAR_{}_{}".format(g, e) for g in range(20) for e in range(0, 100, 10)]
+
+        ts = time.time()
+        linear_results = [
+            EntryID.scan_children(env, "entry", attributes={"id": vid}) for vid in vids
+        ]
+        linear = time.time() - ts
+
+        with mock.patch.object(
+            EntryID, "scan_children", side_effect=EntryID.scan_children
+        ) as scan_children:
+            ts = time.time()
+            indexed_results = [
+                env.scan_children("entry", attributes={"id": vid}) for vid in vids
+            ]
+            indexed = time.time() - ts
+            scan_children.assert_not_called()
+
+        assert indexed_results == linear_results
+        print(
+            "Perf test result: linear {:0.4f}s indexed {:0.4f}s".format(linear, indexed)
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,8 +1,12 @@
 #!/usr/bin/env python3
 
+import os
+import shutil
+import tempfile
 import unittest
 from unittest import mock
 
+from CIME.XML import env_batch
 from CIME.XML.env_batch import EnvBatch
 
 # pylint: disable=unused-argument
@@ -441,6 +445,94 @@ class TestXMLEnvBatch(unittest.TestCase):
             "JOB_WALLCLOCK_TIME", "12:00:00", subgroup="case.run"
         )
 
+    def _make_batch_query(self, tempdir, script, attributes):
+        """
+        Writes an env_batch.xml whose batch_query runs script, which logs its
+        arguments to the returned queries file
+        """
+        query = os.path.join(tempdir, "query")
+        queries = os.path.join(tempdir, "queries")
+        with open(query, "w") as fd:
+            fd.write('#!/bin/sh\necho "$@" >> {}\n{}'.format(queries, script))
+        os.chmod(query, 0o755)
+        with open(os.path.join(tempdir, "env_batch.xml"), "w") as fd:
+            fd.write(
+                """<?xml version="1.0"?>
+<file id="env_batch.xml" version="2.0">
+  <header>test</header>
+  <batch_system type="test">
+    <batch_query {}>{}</batch_query>
+  </batch_system>
+</file>
+""".format(
+                    attributes, query
+                )
+            )
+        return queries
+
+    def test_get_status(self):
+        tempdir = tempfile.mkdtemp()
+        try:
+            queries = self._make_batch_query(
+                tempdir,
+                """if [ "$1" = "-j" ]; then
+  echo "JOBID ST"
+  echo "   $2  R"
+else
+  echo "JOBID ST"
+  echo "   1001  R"
+  echo "   1002 PD"
+fi
+""",
+                'per_job_arg="-j" list_args="-u $ENV{USER}"',
+            )
+
+            batch = EnvBatch(tempdir, read_only=True)
+            with mock.patch.dict(os.environ, {"USER": "jdoe"}), mock.patch.dict(
+                env_batch._BATCH_QUERIES, clear=True
+            ):
+                assert batch.get_status("1001") == "JOBID ST\n   1001  R"
+                assert batch.get_status("1002.host") == "JOBID ST\n   1002 PD"
+                # not in the listing, queried on its own
+                assert batch.get_status("1003") == "JOBID ST\n   1003  R"
+                with open(queries) as fd:
+                    assert fd.read() == "-u jdoe\n-j 1003\n"
+
+                with mock.patch.object(EnvBatch, "DISABLE_BATCH_QUERY_CACHING", True):
+                    assert batch.get_status("1001") == "JOBID ST\n   1001  R"
+                with mock.patch.object(EnvBatch, "BATCH_QUERY_TTL", -1):
+                    assert batch.get_status("1001") == "JOBID ST\n   1001  R"
+                with open(queries) as fd:
+                    assert fd.read() == "-u jdoe\n-j 1003\n-j 1001\n-u jdoe\n"
+        finally:
+            shutil.rmtree(tempdir, ignore_errors=True)
+
+    def test_get_status_multiline_listing(self):
+        # qstat -f lists each job over several lines, none starting with its id
+        qstat_f = """echo "Job Id: $2.server"
+echo "    Job_Name = case.run"
+echo "    job_state = R"
+"""
+        for attributes, expected_queries in (
+            # args is not used to list the jobs
+            ('args="-f" per_job_arg="-f"', "-f 4242\n"),
+            ('per_job_arg="-f" list_args="-f"', "-f\n-f 4242\n"),
+        ):
+            tempdir = tempfile.mkdtemp()
+            try:
+                queries = self._make_batch_query(tempdir, qstat_f, attributes)
+                batch = EnvBatch(tempdir, read_only=True)
+                with mock.patch.dict(env_batch._BATCH_QUERIES, clear=True):
+                    assert batch.get_status("4242") == (
+                        "Job Id: 4242.server\n"
+                        "    Job_Name = case.run\n"
+                        "    job_state = R"
+                    )
+                with open(queries) as fd:
+                    assert fd.read() == expected_queries
+            finally:
+                shutil.rmtree(tempdir, ignore_errors=True)
+
 
 if __name__ == "__main__":
     unittest.main()
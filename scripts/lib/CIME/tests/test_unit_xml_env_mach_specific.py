@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from CIME.XML import env_mach_specific
+from CIME.XML.env_mach_specific import EnvMachSpecific
+
+# pylint: disable=protected-access
+
+_ENV_MACH_SPECIFIC = """<?xml version="1.0"?>
+<file id="env_mach_specific.xml" version="2.0">
+  <header>test</header>
+  <group id="compliant_values">
+    <entry id="run_exe" value="cesm.exe">
+      <type>char</type>
+      <desc>executable name</desc>
+    </entry>
+  </group>
+  <module_system type="module" allow_error="true">
+    <init_path lang="python">/does/not/exist/init.py</init_path>
+    <cmd_path lang="python">/does/not/exist/module python</cmd_path>
+    <modules>
+      <command name="load">gcc/{}</command>
+    </modules>
+  </module_system>
+</file>
+"""
+
+
+class TestXMLEnvMachSpecific(unittest.TestCase):
+    def setUp(self):
+        self._caseroot = tempfile.mkdtemp()
+        self._values = {
+            "CASEROOT": self._caseroot,
+            "MACH": "testmach",
+            "COMPILER": "gnu",
+            "MPILIB": "openmpi",
+            "DEBUG": False,
+        }
+        self._case = mock.MagicMock()
+        self._case.get_value.side_effect = lambda name, **_: self._values.get(name)
+        self._loads = 0
+
+    def tearDown(self):
+        shutil.rmtree(self._caseroot, ignore_errors=True)
+        for name in ("CIME_TEST_MODULE", "CIME_TEST_REMOVED"):
+            os.environ.pop(name, None)
+
+    def _fake_load_modules(self, modules_to_load, force_method=None, verbose=False):
+        self._loads += 1
+        os.environ["CIME_TEST_MODULE"] = modules_to_load[0][1]
+        os.environ.pop("CIME_TEST_REMOVED", None)
+
+    def _load_env(self, version="9"):
+        infile = os.path.join(self._caseroot, "env_mach_specific.xml")
+        with open(infile, "w") as fd:
+            fd.write(_ENV_MACH_SPECIFIC.format(version))
+        EnvMachSpecific.invalidate(infile)
+        env = EnvMachSpecific(self._caseroot, read_only=True)
+        with mock.patch.object(env, "_load_modules", self._fake_load_modules):
+            env.load_env(self._case)
+
+    def test_env_cache(self):
+        os.environ["CIME_TEST_REMOVED"] = "1"
+        self._load_env()
+        assert self._loads == 1
+        assert os.path.isfile(
+            os.path.join(self._caseroot, env_mach_specific.ENV_CACHE_FILENAME)
+        )
+
+        # replayed from the cache
+        os.environ.pop("CIME_TEST_MODULE")
+        os.environ["CIME_TEST_REMOVED"] = "1"
+        self._load_env()
+        assert self._loads == 1
+        assert os.environ["CIME_TEST_MODULE"] == "gcc/9"
+        assert "CIME_TEST_REMOVED" not in os.environ
+
+        # a different starting environment
+        os.environ["CIME_TEST_MODULE"] = "other"
+        self._load_env()
+        assert self._loads == 2
+
+        # different modules
+        self._load_env(version="10")
+        assert self._loads == 3
+        assert os.environ["CIME_TEST_MODULE"] == "gcc/10"
+
+        with mock.patch.object(EnvMachSpecific, "DISABLE_ENV_CACHING", True):
+            self._load_env(version="10")
+        assert self._loads == 4
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,361 @@
+#!/usr/bin/env python3
+
+import glob
+import os
+import shutil
+import tempfile
+import time
+import unittest
+import xml.etree.ElementTree as ET
+from unittest import mock
+from distutils.spawn import find_executable  # pylint: disable=import-error
+
+from CIME import utils
+from CIME.XML import generic_xml
+from CIME.XML.files import Files
+from CIME.XML.generic_xml import GenericXML, format_xml
+
+# pylint: disable=protected-access
+
+
+class TestXMLGenericXML(unittest.TestCase):
+    def setUp(self):
+        self._tempdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self._tempdir, ignore_errors=True)
+
+    def _xmllint_format(self, xml_element):
+        # run_cmd_no_fail strips the trailing newline
+        return (
+            utils.run_cmd_no_fail(
+                "{} --format -".format(find_executable("xmllint")),
+                input_str=ET.tostring(xml_element),
+            )
+            + "\n"
+        )
+
+    def test_format_xml(self):
+        xml_element = ET.fromstring(
+            """<file id="env_run.xml" version="2.0">
+  <header>
+      These variables may be changed anytime during a run
+    </header>
+  <group id="run_begin_stop_restart">
+    <entry id="RUN_TYPE" value="startup">
+      <type>char</type>
+      <valid_values>startup,hybrid,branch</valid_values>
+      <desc>Run initialization type, &amp; &lt;notes&gt;</desc>
+    </entry>
+    <entry id="EMPTY"><desc>   </desc></entry>
+    <entry id="MIXED">text <b>bold</b> more</entry>
+  </group>
+</file>"""
+        )
+        xml_element.append(ET.Comment(" a comment "))
+
+        expected = """<?xml version="1.0"?>
+<file id="env_run.xml" version="2.0">
+  <header>
+      These variables may be changed anytime during a run
+    </header>
+  <group id="run_begin_stop_restart">
+    <entry id="RUN_TYPE" value="startup">
+      <type>char</type>
+      <valid_values>startup,hybrid,branch</valid_values>
+      <desc>Run initialization type, &amp; &lt;notes&gt;</desc>
+    </entry>
+    <entry id="EMPTY">
+      <desc>   </desc>
+    </entry>
+    <entry id="MIXED">text <b>bold</b> more</entry>
+  </group>
+  <!-- a comment -->
+</file>
+"""
+
+        assert format_xml(xml_element) == expected
+
+    @unittest.skipIf(find_executable("xmllint") is None, "xmllint not found")
+    def test_format_xml_matches_xmllint(self):
+        config_dir = os.path.join(utils.get_cime_root(), "config")
+        xml_files = glob.glob(os.path.join(config_dir, "**", "*.xml"), recursive=True)
+
+        assert xml_files
+        for xml_file in xml_files:
+            xml_element = ET.parse(xml_file).getroot()
+            assert format_xml(xml_element) == self._xmllint_format(
+                xml_element
+            ), xml_file
+
+    @unittest.skipIf(find_executable("xmllint") is None, "xmllint not found")
+    def test_write_performance(self):
+        config_file = os.path.join(utils.get_cime_root(), "config", "config_tests.xml")
+        xml_obj = GenericXML(config_file)
+        num_writes = 20
+
+        timings = {}
+        for use_xmllint in (True, False):
+            outfile = os.path.join(
+                self._tempdir, "xmllint.xml" if use_xmllint else "format_xml.xml"
+            )
+            with mock.patch.object(GenericXML, "USE_XMLLINT", use_xmllint):
+                ts = time.time()
+                for _ in range(num_writes):
+                    xml_obj.write(outfile=outfile, force_write=True)
+                timings[use_xmllint] = time.time() - ts
+
+        with open(os.path.join(self._tempdir, "xmllint.xml")) as fd:
+            xmllint_output = fd.read()
+        with open(os.path.join(self._tempdir, "format_xml.xml")) as fd:
+            assert fd.read() == xmllint_output
+
+        print(
+            "Perf test result: {:d} writes xmllint {:0.2f}s format_xml {:0.2f}s".format(
+                num_writes, timings[True], timings[False]
+            )
+        )
+
+    def test_write_incremental(self):
+        infile = os.path.join(self._tempdir, "env_test.xml")
+        with open(infile, "w") as fd:
+            fd.write(
+                """<?xml version="1.0"?>
+<file id="env_test.xml" version="2.0">
+  <group id="test">
+    <entry id="A" value="1"><type>char</type></entry>
+    <entry id="B" value="2"><type>char</type></entry>
+  </group>
+</file>
+"""
+            )
+        os.chmod(infile, 0o640)
+        xml_obj = GenericXML(infile, read_only=False)
+
+        def write(changes):
+            for entry in xml_obj.scan_children("entry"):
+                if xml_obj.get(entry, "id") in changes:
+                    xml_obj.set(entry, "value", changes[xml_obj.get(entry, "id")])
+            with mock.patch.object(os, "replace", side_effect=os.replace) as replace:
+                xml_obj.write(force_write=True)
+            with open(infile) as fd:
+                output = fd.read()
+            # the same as without the cache
+            with mock.patch.object(generic_xml, "_FORMAT_CACHE_LEVELS", ()):
+                assert output == format_xml(xml_obj.root.xml_element)
+            return replace.called
+
+        assert write({"B": "3"})
+        assert 'id="B" value="3"' in open(infile).read()
+        assert write({"A": "4"})
+        # unchanged output is not written
+        assert not write({"A": "4"})
+
+        assert os.stat(infile).st_mode & 0o777 == 0o640
+        assert os.listdir(self._tempdir) == ["env_test.xml"]
+
+    def _make_cached_xml(self):
+        include_file = os.path.join(self._tempdir, "include.xml")
+        with open(include_file, "w") as fd:
+            fd.write('<?xml version="1.0"?>\n<file><entry id="B"/></file>\n')
+        infile = os.path.join(self._tempdir, "config.xml")
+        with open(infile, "w") as fd:
+            fd.write(
+                """<?xml version="1.0"?>
+<file xmlns:xi="http://www.w3.org/2001/XInclude">
+  <entry id="A"/>
+  <xi:include href="include.xml"/>
+</file>
+"""
+            )
+        return infile, include_file
+
+    def _read_cached_xml(self, infile):
+        class CachedXML(GenericXML):
+            DISK_CACHEABLE = True
+            DISK_CACHE_DIR = os.path.join(self._tempdir, "cache")
+
+        GenericXML.invalidate(infile)
+        xml_obj = CachedXML(infile)
+        return xml_obj, os.listdir(CachedXML.DISK_CACHE_DIR)
+
+    def _entry_ids(self, xml_obj):
+        return [xml_obj.get(entry, "id") for entry in xml_obj.get_children("entry")]
+
+    @mock.patch.object(GenericXML, "DISABLE_DISK_CACHING", False)
+    def test_disk_cache(self):
+        infile, include_file = self._make_cached_xml()
+
+        xml_obj, cache_files = self._read_cached_xml(infile)
+        assert len(cache_files) == 1
+        assert self._entry_ids(xml_obj) == ["A", "B"]
+
+        with mock.patch.object(GenericXML, "read_fd") as read_fd:
+            xml_obj, _ = self._read_cached_xml(infile)
+            read_fd.assert_not_called()
+        assert self._entry_ids(xml_obj) == ["A", "B"]
+
+        # changing an included file invalidates the entry
+        with open(include_file, "w") as fd:
+            fd.write('<?xml version="1.0"?>\n<file><entry id="CC"/></file>\n')
+        xml_obj, cache_files = self._read_cached_xml(infile)
+        assert len(cache_files) == 1
+        assert self._entry_ids(xml_obj) == ["A", "CC"]
+
+        with mock.patch.object(
+            GenericXML, "DISABLE_DISK_CACHING", True
+        ), mock.patch.object(GenericXML, "_read_disk_cache") as read_cache:
+            xml_obj, _ = self._read_cached_xml(infile)
+            read_cache.assert_not_called()
+
+    @mock.patch.object(GenericXML, "DISABLE_DISK_CACHING", False)
+    def test_disk_cache_prune(self):
+        cache_dir = os.path.join(self._tempdir, "cache")
+        infiles = []
+        for idx in range(4):
+            infiles.append(os.path.join(self._tempdir, "config{}.xml".format(idx)))
+            with open(infiles[-1], "w") as fd:
+                fd.write('<?xml version="1.0"?>\n<file><entry id="A"/></file>\n')
+
+        def read(infile):
+            GenericXML.invalidate(infile)
+            CachedXML(infile)
+            return sorted(os.listdir(cache_dir))
+
+        class CachedXML(GenericXML):
+            DISK_CACHEABLE = True
+            DISK_CACHE_DIR = cache_dir
+            DISK_CACHE_SIZE = 2
+
+        with mock.patch.object(GenericXML, "_pruned_disk_caches", set()):
+            read(infiles[0])
+            entries = read(infiles[1])
+            assert len(entries) == 2
+            # a process prunes the cache once
+            assert len(read(infiles[2])) == 3
+
+        os.remove(infiles[1])
+        for entry in entries:
+            os.utime(os.path.join(cache_dir, entry), (0, 0))
+        with mock.patch.object(
+            GenericXML, "_pruned_disk_caches", set()
+        ), mock.patch.object(CachedXML, "DISK_CACHE_SIZE", 1):
+            # the entry of the removed file goes, then the least recently read
+            read(infiles[0])
+            assert len(read(infiles[3])) == 2
+        with mock.patch.object(GenericXML, "read_fd") as read_fd:
+            read(infiles[0])
+            read(infiles[3])
+            read_fd.assert_not_called()
+        with mock.patch.object(GenericXML, "_pruned_disk_caches", set()):
+            # parsed again and stored
+            assert len(read(infiles[2])) == 3
+
+    @mock.patch.dict(os.environ, {"CIME_MODEL": "cesm"})
+    def test_disk_cache_performance(self):
+        config_file = os.path.join(
+            utils.get_cime_root(), "config", "cesm", "config_files.xml"
+        )
+        cache_dir = os.path.join(self._tempdir, "cache")
+        num_reads = 10
+
+        timings = {}
+        for disable in (True, False):
+            with mock.patch.multiple(
+                GenericXML, DISABLE_DISK_CACHING=disable, DISK_CACHE_DIR=cache_dir
+            ):
+                # prime the disk cache
+                GenericXML.invalidate(config_file)
+                Files()
+                ts = time.time()
+                for _ in range(num_reads):
+                    GenericXML.invalidate(config_file)
+                    Files()
+                timings[disable] = time.time() - ts
+
+        GenericXML.invalidate(config_file)
+        print(
+            "Perf test result: {:d} reads uncached {:0.2f}s disk cached {:0.2f}s".format(
+                num_reads, timings[True], timings[False]
+            )
+        )
+
+    def _make_children_xml(self):
+        infile = os.path.join(self._tempdir, "children.xml")
+        with open(infile, "w") as fd:
+            fd.write(
+                """<?xml version="1.0"?>
+<file>
+  <entry id="A" a="1" b="1"/>
+  <other id="B" a="1" b="1"/>
+  <entry id="C" a="1"/>
+  <entry id="D" a="1" b="2"/>
+  <group><entry id="E" a="1" b="1"/></group>
+</file>
+"""
+            )
+        GenericXML.invalidate(infile)
+        return GenericXML(infile)
+
+    def test_iter_children(self):
+        xml_obj = self._make_children_xml()
+
+        for name, attributes in (
+            (None, None),
+            ("entry", None),
+            ("entry", {"a": "1", "b": None}),
+            (None, {"b": "1"}),
+            ("entry", {"c": None}),
+            ("entry", {}),
+        ):
+            children = xml_obj.get_children(name, attributes=attributes)
+            assert list(xml_obj.iter_children(name, attributes=attributes)) == children
+        assert [
+            xml_obj.get(node, "id")
+            for node in xml_obj.iter_children("entry", attributes={"b": None})
+        ] == ["A", "D"]
+
+        # wrappers are interned per node
+        children = xml_obj.get_children("entry")
+        assert all(
+            new is old for new, old in zip(xml_obj.get_children("entry"), children)
+        )
+        assert xml_obj.scan_children("entry")[0] is children[0]
+        assert not hasattr(children[0], "__dict__")
+
+    def test_interned_elements_released(self):
+        xml_obj = self._make_children_xml()
+        xml_obj.read_only = False
+
+        group = xml_obj.get_child("group")
+        nested = xml_obj.get_child("entry", root=group)
+        assert group.xml_element in xml_obj._elements
+        xml_obj.remove_child(group)
+        assert group.xml_element not in xml_obj._elements
+        assert nested.xml_element not in xml_obj._elements
+        assert xml_obj.get_children("entry")
+
+        # reading a new tree drops the wrappers of the old one
+        infile = os.path.join(self._tempdir, "other.xml")
+        with open(infile, "w") as fd:
+            fd.write('<?xml version="1.0"?>\n<file><entry id="Z"/></file>\n')
+        xml_obj.tree = None
+        xml_obj.needsrewrite = False
+        xml_obj.read(infile)
+        assert list(xml_obj._elements) == []
+        entry = xml_obj.get_child("entry")
+        assert list(xml_obj._elements) == [entry.xml_element]
+
+    def test_scan_children_attributes(self):
+        xml_obj = self._make_children_xml()
+
+        nodes = xml_obj.scan_children("entry", attributes={"a": "1", "b": "1"})
+        assert [xml_obj.get(node, "id") for node in nodes] == ["A", "E"]
+        nodes = xml_obj.scan_children("entry", attributes={"b": None, "a": "1"})
+        assert [xml_obj.get(node, "id") for node in nodes] == ["A", "D", "E"]
+        assert xml_obj.scan_children("entry", attributes={"a": "2", "b": "1"}) == []
+        assert xml_obj.scan_children("entry", attributes={"a": "1", "b": "3"}) == []
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,6 +1,14 @@
+import os
+import shutil
 import tempfile
+import time
 import unittest
+from unittest import mock
 
+from CIME.namelist import Namelist
+from CIME.nmlgen import NamelistGenerator
+from CIME.utils import string_in_list
+from CIME.XML.entry_id import EntryID
 from CIME.XML.namelist_definition import NamelistDefinition
 
 # pylint: disable=protected-access
@@ -37,6 +45,100 @@ class TestXMLNamelistDefinition(unittest.TestCase):
             assert nmldef._valid_values == {"test1": None, "test2": None}
             assert nmldef._group_names == {"test1": None, "test2": None}
 
+    def _write_definition(self, num_entries):
+        lines = ['<?xml version="1.0"?>', '<entry_id version="2.0">']
+        for idx in range(num_entries):
+            lines += [
+                '  <entry id="var{}">'.format(idx),
+                "    <type>integer</type>",
+                "    <category>test</category>",
+                "    <group>group{}</group>".format(idx % 5),
+                '    <values match="{}">'.format("last" if idx % 2 else "first"),
+                "      <value>{}</value>".format(idx),
+                '      <value grid="f09.*">1{}</value>'.format(idx),
+                '      <value grid="f09.*" ocn="g.{}">2{}</value>'.format(idx % 3, idx),
+                '      <value grid=".*">3{}</value>'.format(idx),
+                '      <value comp="test">4{}</value>'.format(idx),
+                "    </values>",
+                "  </entry>",
+            ]
+        lines.append("</entry_id>")
+
+        path = os.path.join(self._tempdir, "namelist_definition.xml")
+        with open(path, "w") as fd:
+            fd.write("\n".join(lines))
+        return path
+
+    def setUp(self):
+        self._tempdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self._tempdir, ignore_errors=True)
+
+    def test_value_match_matches_entry_id(self):
+        nmldef = NamelistDefinition(self._write_definition(12))
+        nmldef.set_nodes()
+
+        configs = (
+            None,
+            {},
+            {"grid": "f09_g17"},
+            {"grid": "f19_g17", "ocn": "g.1"},
+            {"grid": "f09_g17", "ocn": "g.2"},
+            {"grid": "f09_g17", "ocn": "g.2", "comp": "test"},
+        )
+        for node in nmldef.get_children("entry"):
+            for config in configs:
+                for exact_match in (False, True):
+                    assert nmldef._get_value_match(
+                        node, config, exact_match
+                    ) == EntryID._get_value_match(nmldef, node, config, exact_match)
+
+        assert nmldef.get_node_element_info("var3", "type") == "integer"
+        assert nmldef.get_node_element_info("missing", "type") is None
+
+    def test_init_defaults_performance(self):
+        definition_file = self._write_definition(2000)
+        case = mock.MagicMock()
+        case.get_value.return_value = None
+        config = {"grid": "f09_g17", "ocn": "g.1"}
+
+        def _find_name(namelist, name, group_name=None):
+            names = (
+                namelist._groups if group_name is None else namelist._groups[group_name]
+            )
+            return string_in_list(name, names)
+
+        def _build_namelists():
+            nmlgen = NamelistGenerator(case, [definition_file])
+            # once per instance, as buildnml does
+            for _ in range(3):
+                nmlgen.init_defaults([], config)
+            return nmlgen.get_group_variables("group1")
+
+        timings = {}
+        namelists = {}
+        for indexed in (False, True):
+            NamelistDefinition.invalidate(definition_file)
+            ts = time.time()
+            if indexed:
+                namelists[indexed] = _build_namelists()
+            else:
+                with mock.patch.object(
+                    NamelistDefinition, "_get_value_match", EntryID._get_value_match
+                ), mock.patch.object(Namelist, "_find_name", _find_name):
+                    namelists[indexed] = _build_namelists()
+            timings[indexed] = time.time() - ts
+
+        assert namelists[True] == namelists[False]
+        assert namelists[True]["var1"] == "21"
+
+        print(
+            "Perf test result: 3 init_defaults of 2000 entries linear {:0.2f}s indexed {:0.2f}s".format(
+                timings[False], timings[True]
+            )
+        )
+
 
 if __name__ == "__main__":
     unittest.main()
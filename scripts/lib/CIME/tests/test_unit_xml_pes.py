@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from CIME.XML.pes import Pes
+from CIME.utils import CIMEError
+
+CONFIG_PES = """<?xml version="1.0"?>
+<config_pes version="2.0">
+  <grid name="any">
+    <mach name="any">
+      <pes pesize="any" compset="any">
+        <comment>default</comment>
+        <ntasks><ntasks_atm>1</ntasks_atm></ntasks>
+      </pes>
+    </mach>
+    <mach name="cheyenne">
+      <pes pesize="any" compset="_CAM">
+        <comment>cam on cheyenne</comment>
+        <ntasks><ntasks_atm>36</ntasks_atm></ntasks>
+        <nthrds><nthrds_atm>2</nthrds_atm></nthrds>
+      </pes>
+      <pes pesize="any" compset="_CLM">
+        <comment>clm on cheyenne</comment>
+        <ntasks><ntasks_atm>72</ntasks_atm></ntasks>
+      </pes>
+    </mach>
+  </grid>
+  <overrides>
+    <grid name="a%ne30">
+      <mach name="any">
+        <pes pesize="any" compset="any">
+          <rootpe><rootpe_atm>4</rootpe_atm></rootpe>
+        </pes>
+      </mach>
+    </grid>
+  </overrides>
+</config_pes>
+"""
+
+
+class TestPes(unittest.TestCase):
+    def setUp(self):
+        self._workdir = tempfile.mkdtemp()
+        self._xml_filepath = os.path.join(self._workdir, "config_pes.xml")
+        with open(self._xml_filepath, "w") as fd:
+            fd.write(CONFIG_PES)
+
+    def tearDown(self):
+        shutil.rmtree(self._workdir)
+
+    def test_find_pes_layout(self):
+        pes = Pes(self._xml_filepath)
+
+        for _ in range(2):
+            ntasks, nthrds, rootpe, _, _, comment = pes.find_pes_layout(
+                "a%0.9x1.25", "2000_CAM_SLND", "cheyenne"
+            )
+            self.assertEqual(ntasks, {"NTASKS_ATM": 36})
+            self.assertEqual(nthrds, {"NTHRDS_ATM": 2})
+            self.assertEqual(rootpe, {})
+            self.assertEqual(comment, "cam on cheyenne")
+
+            ntasks, _, rootpe, _, _, comment = pes.find_pes_layout(
+                "a%ne30", "2000_DATM_SLND", "cheyenne"
+            )
+            self.assertEqual(ntasks, {"NTASKS_ATM": 1})
+            self.assertEqual(rootpe, {"ROOTPE_ATM": 4})
+            self.assertEqual(comment, "default")
+
+            with self.assertRaisesRegex(CIMEError, "More than one PE layout"):
+                pes.find_pes_layout("a%0.9x1.25", "2000_CAM_CLM", "cheyenne")
+
+        ntasks, _, _, _, _, _ = Pes(self._xml_filepath).find_pes_layout(
+            "a%0.9x1.25", "2000_CAM_SLND", "cheyenne", mpilib="mpi-serial"
+        )
+        self.assertEqual(ntasks, {"NTASKS_ATM": 1})
+
+
+if __name__ == "__main__":
+    unittest.main()
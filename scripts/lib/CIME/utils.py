@@ -2000,80 +2000,118 @@ def is_last_process_complete(filepath, expect_text, fail_text):
     return complete
 
 
-def transform_vars(text, case=None, subgroup=None, overrides=None, default=None):
+_TEMPLATE_VAR_RE = re.compile(r"{{ (\w+) }}")
+# Templates split by _compile_template, text -> tokens
+_COMPILED_TEMPLATES = {}
+_COMPILED_TEMPLATES_SIZE = 1000
+
+
+def _compile_template(text):
+    """
+    Returns text split into literal text and the names of the variables
+    between them, the names are at the odd indices.
+
+    >>> _compile_template("-l nodes={{ num_nodes }}:ppn={{ tasks_per_node }}")
+    ('-l nodes=', 'num_nodes', ':ppn=', 'tasks_per_node', '')
+    """
+    tokens = _COMPILED_TEMPLATES.get(text)
+    if tokens is None:
+        tokens = tuple(_TEMPLATE_VAR_RE.split(text))
+        if len(_COMPILED_TEMPLATES) >= _COMPILED_TEMPLATES_SIZE:
+            _COMPILED_TEMPLATES.clear()
+        _COMPILED_TEMPLATES[text] = tokens
+    return tokens
+
+
+def _get_template_value(variable, case, subgroup, overrides, default, values):
+    """
+    Returns the value of template variable variable for transform_vars and
+    where it comes from, or (None, None) if it has no value
+    """
+    name = variable.lower()
+    if overrides is not None and overrides.get(name) is not None:
+        return str(overrides[name]), "overrides"
+
+    if case is not None:
+        if getattr(case, name, None) is not None:
+            return str(getattr(case, name)), "case members"
+
+        key = (variable.upper(), subgroup)
+        if values is not None and key in values:
+            value = values[key]
+        else:
+            value = case.get_value(variable.upper(), subgroup=subgroup)
+            if values is not None:
+                values[key] = value
+        if value is not None:
+            return str(value), "case"
+
+    if default is not None:
+        return default, "default"
+
+    return None, None
+
+
+def transform_vars(
+    text, case=None, subgroup=None, overrides=None, default=None, values=None
+):
     """
     Do the variable substitution for any variables that need transforms
     recursively.
 
+    The text is split into literal text and variables once, then rendered in
+    a single pass. values is an optional dict caching the values looked up in
+    case, pass the same dict to the calls for one case.
+
     >>> transform_vars("{{ cesm_stdout }}", default="cesm.stdout")
     'cesm.stdout'
     >>> member_store = lambda : None
     >>> member_store.foo = "hi"
     >>> transform_vars("I say {{ foo }}", overrides={"foo":"hi"})
     'I say hi'
-    """
-    directive_re = re.compile(r"{{ (\w+) }}", flags=re.M)
-    # loop through directive text, replacing each string enclosed with
-    # template characters with the necessary values.
-    while directive_re.search(text):
-        m = directive_re.search(text)
-        variable = m.groups()[0]
-        whole_match = m.group()
-        if (
-            overrides is not None
-            and variable.lower() in overrides
-            and overrides[variable.lower()] is not None
-        ):
-            repl = overrides[variable.lower()]
-            logger.debug(
-                "from overrides: in {}, replacing {} with {}".format(
-                    text, whole_match, str(repl)
-                )
-            )
-            text = text.replace(whole_match, str(repl))
-
-        elif (
-            case is not None
-            and hasattr(case, variable.lower())
-            and getattr(case, variable.lower()) is not None
-        ):
-            repl = getattr(case, variable.lower())
-            logger.debug(
-                "from case members: in {}, replacing {} with {}".format(
-                    text, whole_match, str(repl)
-                )
-            )
-            text = text.replace(whole_match, str(repl))
-
-        elif (
-            case is not None
-            and case.get_value(variable.upper(), subgroup=subgroup) is not None
-        ):
-            repl = case.get_value(variable.upper(), subgroup=subgroup)
-            logger.debug(
-                "from case: in {}, replacing {} with {}".format(
-                    text, whole_match, str(repl)
-                )
-            )
-            text = text.replace(whole_match, str(repl))
-
-        elif default is not None:
-            logger.debug(
-                "from default: in {}, replacing {} with {}".format(
-                    text, whole_match, str(default)
-                )
+    >>> transform_vars("-q {{ queue }}")
+    ''
+    >>> transform_vars("{{ a }} and {{ b }}", overrides={"a": "{{ b }}", "b": "x"})
+    'x and x'
+    """
+    tokens = _compile_template(text)
+    if len(tokens) == 1:
+        return text
+
+    out = [tokens[0]]
+    # every occurrence of a variable gets the value of the first one
+    done = {}
+    for idx in range(1, len(tokens), 2):
+        variable = tokens[idx]
+        if variable in done:
+            out.append(done[variable])
+            out.append(tokens[idx + 1])
+            continue
+
+        repl, source = _get_template_value(
+            variable, case, subgroup, overrides, default, values
+        )
+        if repl is None:
+            # If no queue exists, then the directive '-q' by itself will cause an error
+            rest = "".join(
+                done.get(token, "{{{{ {} }}}}".format(token)) if i % 2 else token
+                for i, token in enumerate(tokens[idx:], idx)
             )
-            text = text.replace(whole_match, default)
+            if "-q {{ queue }}" in "".join(out) + rest:
+                return ""
 
+            logger.warning("Could not replace variable '{}'".format(variable))
+            repl = ""
         else:
-            # If no queue exists, then the directive '-q' by itself will cause an error
-            if "-q {{ queue }}" in text:
-                text = ""
-            else:
-                logger.warning("Could not replace variable '{}'".format(variable))
-                text = text.replace(whole_match, "")
+            logger.debug("from {}: replacing {} with {}".format(source, variable, repl))
+            if "{{ " in repl:
+                repl = transform_vars(repl, case, subgroup, overrides, default, values)
+
+        done[variable] = repl
+        out.append(repl)
+        out.append(tokens[idx + 1])
 
-    return text
+    return "".join(out)
 
 
 def wait_for_unlocked(filepath):
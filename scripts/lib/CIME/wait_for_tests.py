@@ -1,6 +1,4 @@
-# pylint: disable=import-error
-from six.moves import queue
-import os, time, threading, socket, signal, shutil, glob
+import os, time, socket, signal, shutil, glob
 
 # pylint: disable=import-error
 from distutils.spawn import find_executable
@@ -18,6 +16,9 @@ SIGNAL_RECEIVED = False
 E3SM_MAIN_CDASH = "E3SM"
 CDASH_DEFAULT_BUILD_GROUP = "ACME_Latest"
 SLEEP_INTERVAL_SEC = 0.1
+# A TestStatus file modified within this many seconds of being parsed is
+# parsed again, in case it was modified twice within the mtime resolution
+RACY_INTERVAL_SEC = 2.0
 
 ###############################################################################
 def signal_handler(*_):
@@ -546,80 +547,154 @@ CurlOptions: CURLOPT_SSL_VERIFYPEER_OFF;CURLOPT_SSL_VERIFYHOST_OFF
 
 
 ###############################################################################
-def wait_for_test(
-    test_path,
-    results,
-    wait,
-    check_throughput,
-    check_memory,
-    ignore_namelists,
-    ignore_memleak,
-    no_run,
-):
+class _TestStatusWatch(object):
     ###############################################################################
-    if os.path.isdir(test_path):
-        test_status_filepath = os.path.join(test_path, TEST_STATUS_FILENAME)
-    else:
-        test_status_filepath = test_path
+    """
+    The state of one TestStatus file watched by watch_tests
+    """
+
+    def __init__(self, test_path):
+        self.test_path = test_path
+        if os.path.isdir(test_path):
+            self.filepath = os.path.join(test_path, TEST_STATUS_FILENAME)
+        else:
+            self.filepath = test_path
 
-    logging.debug("Watching file: '{}'".format(test_status_filepath))
-    test_log_path = os.path.join(
-        os.path.dirname(test_status_filepath), ".internal_test_status.log"
-    )
+        logging.debug("Watching file: '{}'".format(self.filepath))
+        self.log_path = os.path.join(
+            os.path.dirname(self.filepath), ".internal_test_status.log"
+        )
 
-    # We don't want to make it a requirement that wait_for_tests has write access
-    # to all case directories
-    try:
-        fd = open(test_log_path, "w")
-        fd.close()
-    except (IOError, OSError):
-        test_log_path = "/dev/null"
-
-    prior_ts = None
-    with open(test_log_path, "w") as log_fd:
-        while True:
-            if os.path.exists(test_status_filepath):
-                ts = TestStatus(test_dir=os.path.dirname(test_status_filepath))
-                test_name = ts.get_name()
-                test_status, test_phase = ts.get_overall_test_status(
-                    wait_for_run=not no_run,  # Important
-                    no_run=no_run,
-                    check_throughput=check_throughput,
-                    check_memory=check_memory,
-                    ignore_namelists=ignore_namelists,
-                    ignore_memleak=ignore_memleak,
-                )
+        # We don't want to make it a requirement that wait_for_tests has write access
+        # to all case directories
+        try:
+            fd = open(self.log_path, "w")
+            fd.close()
+        except (IOError, OSError):
+            self.log_path = None
+
+        self._stat_key = None
+        self._parse_time = None
+        self._prior_ts = None
+        self._missing = False
+        self.result = None
+
+    def changed(self):
+        """
+        True if the file may have changed since it was last parsed. A file
+        modified around the time it was parsed counts as changed, a second
+        write within the mtime resolution of the filesystem would be missed.
+        """
+        try:
+            st = os.stat(self.filepath)
+        except OSError:
+            stat_key = None
+        else:
+            stat_key = (st.st_ino, st.st_size, st.st_mtime)
+
+        if self.result is None or stat_key != self._stat_key:
+            self._stat_key = stat_key
+            return True
 
-                if prior_ts is not None and prior_ts != ts:
-                    log_fd.write(ts.phase_statuses_dump())
-                    log_fd.write("OVERALL: {}\n\n".format(test_status))
+        return (
+            stat_key is not None
+            and abs(stat_key[2] - self._parse_time) < RACY_INTERVAL_SEC
+        )
+
+    def update(
+        self, check_throughput, check_memory, ignore_namelists, ignore_memleak, no_run
+    ):
+        """
+        Parse the file, sets and returns result, a tuple
+        (test_name, test_path, test_status, test_phase)
+        """
+        self._parse_time = time.time()
+        self._missing = not os.path.exists(self.filepath)
+        if self._missing:
+            test_name = os.path.abspath(self.filepath).split("/")[-2]
+            self.result = (
+                test_name,
+                self.test_path,
+                "File '{}' doesn't exist".format(self.filepath),
+                CREATE_NEWCASE_PHASE,
+            )
+            return self.result
+
+        ts = TestStatus(test_dir=os.path.dirname(self.filepath))
+        test_status, test_phase = ts.get_overall_test_status(
+            wait_for_run=not no_run,  # Important
+            no_run=no_run,
+            check_throughput=check_throughput,
+            check_memory=check_memory,
+            ignore_namelists=ignore_namelists,
+            ignore_memleak=ignore_memleak,
+        )
 
-                prior_ts = ts
+        if (
+            self.log_path is not None
+            and self._prior_ts is not None
+            and self._prior_ts != ts
+        ):
+            with open(self.log_path, "a") as log_fd:
+                log_fd.write(ts.phase_statuses_dump())
+                log_fd.write("OVERALL: {}\n\n".format(test_status))
 
-                if test_status == TEST_PEND_STATUS and (wait and not SIGNAL_RECEIVED):
-                    time.sleep(SLEEP_INTERVAL_SEC)
-                    logging.debug("Waiting for test to finish")
-                else:
-                    results.put((test_name, test_path, test_status, test_phase))
-                    break
+        self._prior_ts = ts
+        self.result = (ts.get_name(), self.test_path, test_status, test_phase)
+        return self.result
 
+    def is_pending(self):
+        return self._missing or self.result[2] == TEST_PEND_STATUS
+
+
+###############################################################################
+def watch_tests(
+    test_paths,
+    wait,
+    check_throughput=False,
+    check_memory=False,
+    ignore_namelists=False,
+    ignore_memleak=False,
+    no_run=False,
+):
+    ###############################################################################
+    """
+    Generator yielding (test_name, test_path, test_status, test_phase) for each
+    test as it completes. All TestStatus files are watched from this thread:
+    every SLEEP_INTERVAL_SEC, the files of the tests still pending are stat'ed
+    and only the ones that changed are parsed again. The tests that complete
+    in the same pass are yielded in order of test name.
+
+    If not wait, or once a signal is received, the tests still pending are
+    yielded with their current status.
+    """
+    watches = [_TestStatusWatch(test_path) for test_path in test_paths]
+    while watches:
+        waiting = wait and not SIGNAL_RECEIVED
+        completed = []
+        pending = []
+        for watch in watches:
+            if watch.changed():
+                watch.update(
+                    check_throughput,
+                    check_memory,
+                    ignore_namelists,
+                    ignore_memleak,
+                    no_run,
+                )
+
+            if waiting and watch.is_pending():
+                pending.append(watch)
             else:
-                if wait and not SIGNAL_RECEIVED:
-                    logging.debug(
-                        "File '{}' does not yet exist".format(test_status_filepath)
-                    )
-                    time.sleep(SLEEP_INTERVAL_SEC)
-                else:
-                    test_name = os.path.abspath(test_status_filepath).split("/")[-2]
-                    results.put(
-                        (
-                            test_name,
-                            test_path,
-                            "File '{}' doesn't exist".format(test_status_filepath),
-                            CREATE_NEWCASE_PHASE,
-                        )
-                    )
-                    break
+                completed.append(watch.result)
+
+        for result in sorted(completed, key=lambda result: str(result[0])):
+            yield result
+
+        watches = pending
+        if watches:
+            logging.debug("Waiting for {:d} tests to finish".format(len(watches)))
+            time.sleep(SLEEP_INTERVAL_SEC)
 
 
 ###############################################################################
@@ -631,34 +706,20 @@ def wait_for_tests_impl(
     ignore_namelists=False,
     ignore_memleak=False,
     no_run=False,
+    report_progress=False,
 ):
     ###############################################################################
-    results = queue.Queue()
-
-    for test_path in test_paths:
-        t = threading.Thread(
-            target=wait_for_test,
-            args=(
-                test_path,
-                results,
-                not no_wait,
-                check_throughput,
-                check_memory,
-                ignore_namelists,
-                ignore_memleak,
-                no_run,
-            ),
-        )
-        t.daemon = True
-        t.start()
-
-    while threading.active_count() > 1:
-        time.sleep(1)
-
     test_results = {}
     completed_test_paths = []
-    while not results.empty():
-        test_name, test_path, test_status, test_phase = results.get()
+    for test_name, test_path, test_status, test_phase in watch_tests(
+        test_paths,
+        not no_wait,
+        check_throughput,
+        check_memory,
+        ignore_namelists,
+        ignore_memleak,
+        no_run,
+    ):
         if test_name in test_results:
             prior_path, prior_status, _ = test_results[test_name]
             if test_status == prior_status:
@@ -681,6 +742,17 @@ def wait_for_tests_impl(
         test_results[test_name] = (test_path, test_status, test_phase)
         completed_test_paths.append(test_path)
 
+        if report_progress:
+            logging.info(
+                "Completed {:d} of {:d}: {} {} (phase {})".format(
+                    len(completed_test_paths),
+                    len(test_paths),
+                    test_name,
+                    test_status,
+                    test_phase,
+                )
+            )
+
     expect(
         set(test_paths) == set(completed_test_paths),
         "Missing results for test paths: {}".format(
@@ -721,6 +793,7 @@ def wait_for_tests(
             ignore_namelists,
             ignore_memleak,
             no_run,
+            report_progress=not no_wait,
         )
 
     all_pass = True
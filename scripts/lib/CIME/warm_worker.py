@@ -0,0 +1,258 @@
+"""
+A warm worker process for running CIME python scripts.
+
+create_test runs create_newcase, case.setup, case.build, case.submit and
+case.cmpgen_namelists for every test. Run as commands, each of them starts a
+new python interpreter that imports CIME and parses the config XML files all
+over again. The WarmWorker is forked once, before any test phase runs, and
+parses the config files once. Each script is then run in a fork of the
+worker, so it starts with CIME imported and the config files cached, and is
+still isolated from the other scripts and from create_test.
+"""
+from CIME.XML.standard_module_setup import *
+from CIME.XML.generic_xml import GenericXML
+from CIME.XML.files import Files
+from CIME.utils import run_cmd
+
+import multiprocessing, runpy, shlex, tempfile, threading, time, traceback
+
+logger = logging.getLogger(__name__)
+
+# Config files parsed by the worker before it runs anything
+_WARM_SPEC_FILES = (
+    "MACHINES_SPEC_FILE",
+    "BATCH_SPEC_FILE",
+    "GRIDS_SPEC_FILE",
+    "WORKFLOW_SPEC_FILE",
+    "INPUTDATA_SPEC_FILE",
+)
+_WARM_COMPONENT_SPEC_FILES = ("COMPSETS_SPEC_FILE", "PES_SPEC_FILE")
+
+
+def _warm_caches(comp_interface):
+    """
+    Parse the config files that every case needs into the GenericXML cache
+    """
+    try:
+        files = Files(comp_interface=comp_interface)
+        spec_files = [files.get_value(spec) for spec in _WARM_SPEC_FILES]
+        for spec in _WARM_COMPONENT_SPEC_FILES:
+            for component in files.get_components(spec):
+                spec_files.append(files.get_value(spec, {"component": component}))
+
+        for spec_file in spec_files:
+            if spec_file and os.path.isfile(spec_file):
+                GenericXML(spec_file)
+    except Exception as e:  # pylint: disable=broad-except
+        # Only costs time, the scripts parse what they need themselves
+        logger.debug("Could not warm the XML caches: {}".format(e))
+
+
+def _is_python_script(path):
+    try:
+        with open(path, "rb") as fd:
+            first_line = fd.readline()
+    except (OSError, IOError):
+        return False
+
+    return first_line.startswith(b"#!") and b"python" in first_line
+
+
+def _run_script(argv, from_dir, env, out_path, err_path):
+    """
+    Run the python script argv[0] as __main__ in this (forked) process, with
+    stdout and stderr written to out_path and err_path. Does not return.
+    """
+    rc = 1
+    try:
+        os.environ.clear()
+        os.environ.update(env)
+        if from_dir is not None:
+            os.chdir(from_dir)
+
+        sys.stdout.flush()
+        sys.stderr.flush()
+        with open(out_path, "w") as out_fd:
+            os.dup2(out_fd.fileno(), 1)
+        if err_path == out_path:
+            os.dup2(1, 2)
+        else:
+            with open(err_path, "w") as err_fd:
+                os.dup2(err_fd.fileno(), 2)
+        # sys.stdout and sys.stderr may not write to the file descriptors
+        sys.stdout = open(1, "w", buffering=1, closefd=False)
+        sys.stderr = open(2, "w", buffering=1, closefd=False)
+
+        # The script configures logging for itself
+        root_logger = logging.getLogger()
+        for handler in list(root_logger.handlers):
+            root_logger.removeHandler(handler)
+
+        # As in a new process, config files may be cached
+        GenericXML.DISABLE_CACHING = False
+
+        sys.argv = list(argv)
+        try:
+            runpy.run_path(argv[0], run_name="__main__")
+            rc = 0
+        except SystemExit as e:
+            if e.code is None:
+                rc = 0
+            elif isinstance(e.code, int):
+                rc = e.code
+            else:
+                print(e.code, file=sys.stderr)
+        except BaseException:  # pylint: disable=broad-except
+            traceback.print_exc()
+    finally:
+        try:
+            sys.stdout.flush()
+            sys.stderr.flush()
+        finally:
+            os._exit(rc)  # pylint: disable=protected-access
+
+
+def _serve(conn, comp_interface):
+    """
+    The main loop of the worker process. Each request is run in a fork of this
+    process, the exit status is sent back once the fork finishes.
+    """
+    _warm_caches(comp_interface)
+
+    children = {}  # pid -> request id
+    shutdown = False
+    while not shutdown or children:
+        if not shutdown and conn.poll(0.05):
+            try:
+                request = conn.recv()
+            except EOFError:
+                request = None
+
+            if request is None:
+                shutdown = True
+            else:
+                pid = os.fork()
+                if pid == 0:
+                    conn.close()
+                    _run_script(*request[1:])
+
+                children[pid] = request[0]
+        elif shutdown:
+            time.sleep(0.05)
+
+        while children:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+            if pid == 0:
+                break
+            rc = (
+                os.WEXITSTATUS(status) if os.WIFEXITED(status) else -os.WTERMSIG(status)
+            )
+            request_id = children.pop(pid, None)
+            if request_id is not None:
+                conn.send((request_id, rc))
+
+
+class WarmWorker(object):
+    """
+    Runs CIME python scripts in forks of a worker process that has the config
+    files already parsed. run_cmd can be called from multiple threads.
+
+    Create the worker before starting any threads and close it when done.
+    """
+
+    def __init__(self, comp_interface=None):
+        context = multiprocessing.get_context("fork")
+        self._conn, child_conn = context.Pipe()
+        self._process = context.Process(
+            target=_serve, args=(child_conn, comp_interface), daemon=True
+        )
+        self._process.start()
+        child_conn.close()
+
+        self._lock = threading.Lock()
+        self._next_id = 0
+        self._pending = {}  # request id -> [event, rc]
+        self._reader = threading.Thread(target=self._read_results)
+        self._reader.start()
+
+    def _read_results(self):
+        while True:
+            try:
+                request_id, rc = self._conn.recv()
+            except (EOFError, OSError):
+                break
+
+            with self._lock:
+                result = self._pending.pop(request_id)
+            result[1] = rc
+            result[0].set()
+
+        # The worker is gone, fail whatever is still waiting for it
+        with self._lock:
+            pending, self._pending = self._pending, None
+        for result in pending.values():
+            result[0].set()
+
+    def run_cmd(self, cmd, from_dir=None, combine_output=False):
+        """
+        Same as CIME.utils.run_cmd for a command that runs a python script, other
+        commands are passed on to CIME.utils.run_cmd.
+        """
+        argv = shlex.split(cmd)
+        if from_dir is None:
+            from_dir = os.getcwd()
+        if not argv or "/" not in argv[0] or any(char in cmd for char in "|&;<>$`"):
+            # Not a plain script invocation
+            script = None
+        else:
+            script = os.path.abspath(os.path.join(from_dir, argv[0]))
+        if script is None or not _is_python_script(script):
+            return run_cmd(cmd, from_dir=from_dir, combine_output=combine_output)
+
+        out_fd, out_path = tempfile.mkstemp(prefix="warm_worker.", suffix=".out")
+        os.close(out_fd)
+        if combine_output:
+            err_path = out_path
+        else:
+            err_fd, err_path = tempfile.mkstemp(prefix="warm_worker.", suffix=".err")
+            os.close(err_fd)
+
+        try:
+            result = [threading.Event(), 1]
+            with self._lock:
+                expect(self._pending is not None, "The warm worker has exited")
+                request_id = self._next_id
+                self._next_id += 1
+                self._pending[request_id] = result
+                self._conn.send(
+                    (
+                        request_id,
+                        [script] + argv[1:],
+                        from_dir,
+                        dict(os.environ),
+                        out_path,
+                        err_path,
+                    )
+                )
+
+            result[0].wait()
+            with open(out_path, "r", errors="ignore") as fd:
+                output = fd.read().strip()
+            errput = None
+            if not combine_output:
+                with open(err_path, "r", errors="ignore") as fd:
+                    errput = fd.read().strip()
+        finally:
+            os.remove(out_path)
+            if err_path != out_path:
+                os.remove(err_path)
+
+        return result[1], output, errput
+
+    def close(self):
+        with self._lock:
+            if self._pending is not None:
+                self._conn.send(None)
+        self._reader.join()
+        self._process.join()
+        self._conn.close()